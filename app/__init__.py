@@ -1,7 +1,77 @@
+import os
+
 from flask import Flask
 
-app = Flask(__name__)
+import app.database as database
+from app.extensions import db
+import app.migrations as migrations
+import app.ratings as ratings
+import app.page_cache as page_cache
+import app.passwords as passwords
+import app.rating_queue as rating_queue
+import app.search as game_search
+import app.suggest as suggest
+import app.images as images
+import app.assets as assets
+import app.catalogue as catalogue
+import app.hardware as hardware
+import app.metrics as metrics
+import app.diagnostics as diagnostics
+from app.routes import bp
+from app.api import api_v1
+
+basedir = os.path.abspath(os.path.dirname(__file__))
+
+
+# Builds a configured application; nothing runs at import, so servers,
+# the flask CLI and scripts each create their own
+# config: settings applied last, over the defaults and GAMES_ variables
+def create_app(config=None):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = \
+        "sqlite:///" + os.path.join(basedir, "games.db")
+    # Workers forked from one preloaded app share this key; set
+    # GAMES_SECRET_KEY when processes start separately
+    app.config["SECRET_KEY"] = os.urandom(12)
+    # Any setting can be overridden with a GAMES_ environment variable,
+    # e.g. GAMES_DATABASE_POOL_SIZE=20
+    app.config.from_prefixed_env("GAMES")
+    app.config.update(config or {})
+
+    database.configure(app)
+    db.init_app(app)
+    with app.app_context():
+        for engine in db.engines.values():
+            database.install(app, engine)
+    # Latency, SQL and template timings per route at /metrics
+    metrics.init_app(app)
+    # Slow-query log (SLOW_QUERY_SECONDS) and ?__profile=1 for admins
+    diagnostics.init_app(app)
+
+    app.register_blueprint(bp)
+    app.register_blueprint(api_v1)
+    app.cli.add_command(migrations.db_cli)
+    app.cli.add_command(ratings.ratings_cli)
+    app.cli.add_command(images.images_cli)
+    app.cli.add_command(assets.assets_cli)
+    app.cli.add_command(catalogue.games_cli)
+    app.cli.add_command(hardware.hardware_cli)
+
+    # Bring the schema up to date, then build the full-text search and
+    # autocomplete indexes
+    with app.app_context(), database.primary():
+        for engine in db.engines.values():
+            database.require_sqlite(engine)
+        migrations.upgrade()
+        game_search.ensure_index()
+        suggest.index.build()
 
-from app import routes  # noqa: F401, E402
+    # Fingerprinted, precompressed static files with long-lived caching
+    assets.init_app(app)
 
-app.run(debug=False)  # convert to False on finish
+    page_cache.cache.max_entries = app.config.get(
+        "PAGE_CACHE_SIZE", page_cache.DEFAULT_MAX_ENTRIES)
+    passwords.pool.configure(app.config)
+    rating_queue.writer.init_app(app)
+    suggest.index.init_app(app)
+    return app
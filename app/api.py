@@ -0,0 +1,324 @@
+import gzip
+from datetime import date, datetime
+
+from flask import Blueprint, abort, jsonify, request, url_for
+from sqlalchemy import select
+from sqlalchemy.orm import load_only
+from werkzeug.exceptions import HTTPException
+
+from app.extensions import db
+import app.routes as routes
+import app.models as models
+import app.pagination as pagination
+import app.search as game_search
+import app.hardware as hardware
+import app.facets as facets
+
+# Largest page a client may ask for with ?limit=
+MAX_LIMIT = 100
+
+# Responses smaller than this are sent uncompressed
+GZIP_MIN_BYTES = 512
+
+# ?sort= for game listings -> (cursor column, descending), as on /game/0
+GAME_SORTS = {
+    "id": ("GameID", False),
+    "name": ("GameName", False),
+    "rating": (models.GameRatingStats.RatingAverage, True),
+}
+
+# Read-only catalogue API; every list takes ?fields=, ?include=, ?limit= and
+# ?after=, and answers with {"data": ..., "next_cursor": ..., "next": ...}
+api_v1 = Blueprint("api_v1", __name__, url_prefix="/api/v1")
+
+
+@api_v1.errorhandler(HTTPException)
+def handle_api_errors(e):
+    return jsonify(error=e.description), e.code
+
+
+@api_v1.after_request
+def compress(response):
+    # gzip JSON for clients that accept it; small bodies aren't worth it
+    if response.direct_passthrough or response.status_code != 200 \
+            or "Content-Encoding" in response.headers \
+            or not request.accept_encodings["gzip"]:
+        return response
+    body = response.get_data()
+    if len(body) < GZIP_MIN_BYTES:
+        return response
+    response.set_data(gzip.compress(body, 6))
+    response.headers["Content-Encoding"] = "gzip"
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def column_names(model):
+    return [column.key for column in model.__mapper__.column_attrs]
+
+
+def requested_fields(model):
+    # ?fields=GameName,GameImage; the primary key is always included
+    primary_key = model.__mapper__.primary_key[0].key
+    fields = request.args.get("fields")
+    if not fields:
+        return column_names(model)
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = sorted(set(names) - set(column_names(model)))
+    if unknown:
+        abort(400, description=f"Unknown fields: {', '.join(unknown)}")
+    return [primary_key] + [name for name in names if name != primary_key]
+
+
+def requested_includes(allowed):
+    names = {name.strip() for name in request.args.get("include", "")
+             .split(",") if name.strip()}
+    unknown = sorted(names - set(allowed))
+    if unknown:
+        abort(400, description=f"Unknown includes: {', '.join(unknown)}; "
+                               f"choose from {', '.join(sorted(allowed))}")
+    return names
+
+
+def requested_limit():
+    limit = request.args.get("limit", pagination.GAMES_PER_PAGE, type=int)
+    return min(max(limit, 1), MAX_LIMIT)
+
+
+def requested_offset():
+    # ?after= for the offset-paged lists, as handed out in next_cursor
+    after = request.args.get("after", "0")
+    if not after.isdigit():
+        abort(400, description=f"Invalid cursor {after!r}")
+    return int(after)
+
+
+def serialize(row, fields):
+    record = {}
+    for name in fields:
+        value = getattr(row, name)
+        if isinstance(value, (date, datetime)):
+            value = value.isoformat()
+        record[name] = value
+    return record
+
+
+def linked(link_model, owner_column, target_model, target_name, owner_ids):
+    # {owner id: [{id, name}]} for every owner in one IN query through the
+    # link table, e.g. the platforms of a page of games
+    target_key = target_model.__mapper__.primary_key[0].key
+    target_id = getattr(target_model, target_key)
+    owner = getattr(link_model, owner_column)
+    rows = db.session.execute(
+        select(owner, target_id, getattr(target_model, target_name))
+        .join(target_model, getattr(link_model, target_key) == target_id)
+        .where(owner.in_(owner_ids)).order_by(owner, target_id))
+    related = {owner_id: [] for owner_id in owner_ids}
+    for owner_id, related_id, name in rows:
+        related[owner_id].append({target_key: related_id, target_name: name})
+    return related
+
+
+def rating_summaries(game_ids):
+    stats = models.GameRatingStats
+    rows = db.session.execute(
+        select(stats.GameID, stats.RatingAverage, stats.RatingCount)
+        .where(stats.GameID.in_(game_ids)))
+    summaries = {game_id: {"RatingAverage": 0, "RatingCount": 0}
+                 for game_id in game_ids}
+    for game_id, average, count in rows:
+        summaries[game_id] = {"RatingAverage": round(average, 2),
+                              "RatingCount": count}
+    return summaries
+
+
+# Related records each resource can embed -> loader for a batch of ids
+GAME_INCLUDES = {
+    "platforms": lambda ids: linked(models.GamePlatforms, "GameID",
+                                    models.Platforms, "PlatformName", ids),
+    "categories": lambda ids: linked(models.GameCategories, "GameID",
+                                     models.Categories, "CategoryName", ids),
+    "rating": rating_summaries,
+}
+PLATFORM_INCLUDES = {
+    "games": lambda ids: linked(models.GamePlatforms, "PlatformID",
+                                models.Games, "GameName", ids),
+}
+CATEGORY_INCLUDES = {
+    "games": lambda ids: linked(models.GameCategories, "CategoryID",
+                                models.Games, "GameName", ids),
+}
+
+
+def records(model, rows, fields, includes, loaders):
+    # Serialize rows and attach each include with one query per include
+    primary_key = model.__mapper__.primary_key[0].key
+    data = [serialize(row, fields) for row in rows]
+    ids = [record[primary_key] for record in data]
+    for name in sorted(includes):
+        related = loaders[name](ids) if ids else {}
+        for record in data:
+            record[name] = related[record[primary_key]]
+    return data
+
+
+def listing(model, loaders, cursor=None, descending=False):
+    fields = requested_fields(model)
+    includes = requested_includes(loaders)
+    # Only the requested columns are loaded, plus what the cursor needs
+    columns = set(fields)
+    if isinstance(cursor, str):
+        columns.add(cursor)
+    page = routes.execute_query(
+        model, options=[load_only(*[getattr(model, name)
+                                    for name in columns])],
+        per_page=requested_limit(), after=request.args.get("after"),
+        cursor=cursor, descending=descending)
+    next_cursor = next_url = None
+    if page.has_next:
+        next_cursor = str(page.next_cursor)
+        next_url = url_for(request.endpoint, **request.args.to_dict()
+                           | {"after": next_cursor})
+    return jsonify(data=records(model, page, fields, includes, loaders),
+                   next_cursor=next_cursor, next=next_url)
+
+
+def detail(model, id, loaders):
+    fields = requested_fields(model)
+    includes = requested_includes(loaders)
+    rows = routes.execute_query(model, id=id)  # 404 when missing
+    return jsonify(data=records(model, rows, fields, includes, loaders)[0])
+
+
+@api_v1.route("/games")
+def games():
+    sort = request.args.get("sort", "id")
+    if sort not in GAME_SORTS:
+        abort(400, description=f"sort must be one of "
+                               f"{', '.join(GAME_SORTS)}")
+    cursor, descending = GAME_SORTS[sort]
+    return listing(models.Games, GAME_INCLUDES, cursor, descending)
+
+
+@api_v1.route("/games/<int:id>")
+def game(id):
+    return detail(models.Games, id, GAME_INCLUDES)
+
+
+@api_v1.route("/platforms")
+def platforms():
+    return listing(models.Platforms, PLATFORM_INCLUDES)
+
+
+@api_v1.route("/platforms/<int:id>")
+def platform(id):
+    return detail(models.Platforms, id, PLATFORM_INCLUDES)
+
+
+@api_v1.route("/categories")
+def categories():
+    return listing(models.Categories, CATEGORY_INCLUDES)
+
+
+@api_v1.route("/categories/<int:id>")
+def category(id):
+    return detail(models.Categories, id, CATEGORY_INCLUDES)
+
+
+@api_v1.route("/search")
+def search():
+    # Ranked full-text search; the cursor is the offset of the next page
+    query = request.args.get("q", "").strip()
+    if not query:
+        abort(400, description="q is required")
+    fields = requested_fields(models.Games)
+    includes = requested_includes(GAME_INCLUDES)
+    limit = requested_limit()
+    offset = requested_offset()
+    found = game_search.search_games(query, limit=limit + 1, offset=offset)
+    next_cursor = str(offset + limit) if len(found) > limit else None
+    next_url = None
+    if next_cursor:
+        next_url = url_for(request.endpoint,
+                           **request.args.to_dict() | {"after": next_cursor})
+    return jsonify(data=records(models.Games, found[:limit], fields,
+                                includes, GAME_INCLUDES),
+                   next_cursor=next_cursor, next=next_url)
+
+
+@api_v1.route("/browse")
+def browse():
+    # Faceted filtering (see facets.requested_filters) with the count of
+    # games each facet value would give; the cursor is an offset
+    filters = facets.requested_filters()
+    fields = requested_fields(models.Games)
+    includes = requested_includes(GAME_INCLUDES)
+    limit = requested_limit()
+    offset = requested_offset()
+    matches, counts = facets.index.current().browse(**filters)
+    game_ids = facets.members(matches, offset=offset, limit=limit + 1)
+    next_cursor = next_url = None
+    if len(game_ids) > limit:
+        game_ids = game_ids[:limit]
+        next_cursor = str(offset + limit)
+        next_url = url_for(request.endpoint,
+                           **request.args.to_dict(flat=False)
+                           | {"after": next_cursor})
+    columns = [getattr(models.Games, name) for name in fields]
+    rows = db.session.scalars(
+        select(models.Games).options(load_only(*columns))
+        .where(models.Games.GameID.in_(game_ids))
+        .order_by(models.Games.GameID)).all()
+    return jsonify(total=matches.bit_count(), facets=counts,
+                   data=records(models.Games, rows, fields, includes,
+                                GAME_INCLUDES),
+                   next_cursor=next_cursor, next=next_url)
+
+
+def requested_spec():
+    # ?ram=16GB&storage=500GB&cpu=i7-9700K&gpu=RTX 2070; any may be left out
+    spec = {}
+    hardware.refresh_scores()
+    for name, column in [("ram", "ram_mb"), ("storage", "storage_mb")]:
+        if request.args.get(name):
+            spec[column] = hardware.parse_size_mb(request.args[name])
+            if spec[column] is None:
+                abort(400, description=f"{name} must be a size like 16GB")
+    for name in ["cpu", "gpu"]:
+        if request.args.get(name):
+            spec[f"{name}_score"] = hardware.score(name.upper(),
+                                                   request.args[name])
+            if spec[f"{name}_score"] is None:
+                abort(400, description=f"Unknown {name.upper()} "
+                                       f"{request.args[name]!r}")
+    if not spec:
+        abort(400, description="Give at least one of ram, storage, cpu "
+                               "or gpu")
+    return spec
+
+
+@api_v1.route("/compatibility")
+def compatibility():
+    # PC games whose Minimum and Recommended requirements the given
+    # hardware meets, answered from the parsed requirement columns; games
+    # whose requirements could not be parsed are listed by id under unknown
+    spec = requested_spec()
+    fields = requested_fields(models.Games)
+    includes = requested_includes(GAME_INCLUDES)
+    matches, unknown = hardware.compatible_games(**spec)
+    game_ids = set(matches["Minimum"]) | set(matches["Recommended"])
+    columns = [getattr(models.Games, name) for name in fields]
+    rows = db.session.scalars(
+        select(models.Games).options(load_only(*columns))
+        .where(models.Games.GameID.in_(game_ids))).all()
+    # A game deleted since the match was read is left out
+    games = {record["GameID"]: record for record in
+             records(models.Games, rows, fields, includes, GAME_INCLUDES)}
+    return jsonify(spec=spec,
+                   minimum=[games[game_id] for game_id in matches["Minimum"]
+                            if game_id in games],
+                   recommended=[games[game_id]
+                                for game_id in matches["Recommended"]
+                                if game_id in games],
+                   unknown={"minimum": unknown["Minimum"],
+                            "recommended": unknown["Recommended"]})
@@ -0,0 +1,192 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+
+import click
+from flask import abort, current_app, request, send_from_directory
+from flask.cli import AppGroup
+from werkzeug.security import safe_join
+
+import app.images as images
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip siblings are always written
+    brotli = None
+
+# Seconds browsers may reuse a fingerprinted file without asking again
+IMMUTABLE_MAX_AGE = 31536000
+
+# Files worth precompressing; images are already compressed
+COMPRESSIBLE = (".css", ".js", ".svg", ".json", ".txt", ".html")
+
+# Content-Encoding -> sibling file suffix, in order of preference
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+# Derived images already carry a content hash in their names
+HASHED_DIRS = ("images/derived/",)
+
+_digests = {}  # filename -> (mtime_ns, size, digest)
+_digests_lock = threading.Lock()
+build_id = None  # digest of every stylesheet and script, set by build()
+
+
+def file_digest(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:10]
+
+
+def digest(filename, static_folder=None):
+    # Content hash of a static file, recomputed only when it changes on disk
+    path = safe_join(static_folder or current_app.static_folder, filename)
+    try:
+        stat = os.stat(path)
+    except (OSError, TypeError):  # missing, or outside the static folder
+        return None
+    with _digests_lock:
+        cached = _digests.get(filename)
+    if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+    value = file_digest(path)
+    with _digests_lock:
+        _digests[filename] = (stat.st_mtime_ns, stat.st_size, value)
+    return value
+
+
+def static_files(static_folder):
+    for root, _, names in os.walk(static_folder):
+        for name in names:
+            if name.endswith((".gz", ".br", ".tmp")):
+                continue
+            path = os.path.join(root, name)
+            yield os.path.relpath(path, static_folder).replace(os.sep, "/")
+
+
+def write_sibling(path, suffix, data):
+    temp_path = f"{path}{suffix}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(data)
+    os.replace(temp_path, path + suffix)
+
+
+def compress(path):
+    # Write .gz (and .br) next to path unless they are already up to date
+    mtime = os.stat(path).st_mtime_ns
+    wanted = [(".gz", lambda data: gzip.compress(data, 9, mtime=0))]
+    if brotli is not None:
+        wanted.append((".br", lambda data: brotli.compress(data, quality=11)))
+    written = []
+    data = None
+    for suffix, encode in wanted:
+        sibling = path + suffix
+        if os.path.exists(sibling) and os.stat(sibling).st_mtime_ns >= mtime:
+            continue
+        if data is None:
+            with open(path, "rb") as file:
+                data = file.read()
+        write_sibling(path, suffix, encode(data))
+        written.append(sibling)
+    return written
+
+
+def build(static_folder=None):
+    # Fingerprint every static file and precompress the text ones; runs at
+    # startup and from `flask assets build`
+    global build_id
+    static_folder = static_folder or current_app.static_folder
+    written = []
+    combined = hashlib.sha1()
+    for filename in sorted(static_files(static_folder)):
+        value = digest(filename, static_folder)
+        if filename.endswith(COMPRESSIBLE):
+            written += compress(os.path.join(static_folder, filename))
+            combined.update(f"{filename}:{value}".encode())
+    build_id = combined.hexdigest()[:10]
+    # Every page loads the background, so its screen-sized copies are made
+    # here rather than waiting for `flask images backfill`
+    images.process_image(images.BACKGROUND)
+    return written
+
+
+def add_version(endpoint, values):
+    # url_defaults hook: url_for('static', ...) gains ?v=<content hash>
+    if endpoint != "static" or "v" in values:
+        return
+    filename = values.get("filename")
+    if not filename or filename.startswith(HASHED_DIRS):
+        return
+    value = digest(filename)
+    if value:
+        values["v"] = value
+
+
+def accepted_encoding(path):
+    # Best encoding the browser accepts with a sibling at least as new as path
+    accepted = request.accept_encodings
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None, ""
+    for encoding, suffix in ENCODINGS:
+        if not accepted[encoding]:
+            continue
+        try:
+            if os.stat(path + suffix).st_mtime_ns >= mtime:
+                return encoding, suffix
+        except OSError:
+            pass
+    return None, ""
+
+
+def send_static_file(filename):
+    # Replaces Flask's static view: precompressed siblings when the browser
+    # accepts them, and a year of caching for fingerprinted URLs
+    static_folder = current_app.static_folder
+    path = safe_join(static_folder, filename)
+    if path is None:
+        abort(404)
+    encoding, suffix = (None, "")
+    if filename.endswith(COMPRESSIBLE):
+        encoding, suffix = accepted_encoding(path)
+    mimetype = mimetypes.guess_type(filename)[0]
+    response = send_from_directory(static_folder, filename + suffix,
+                                   mimetype=mimetype)
+    if filename.endswith(COMPRESSIBLE):
+        response.vary.add("Accept-Encoding")
+    if encoding:
+        response.content_encoding = encoding
+
+    # Only the current hash is immutable; a stale ?v= must not pin new bytes
+    version = request.args.get("v")
+    current = version is not None and version == digest(filename)
+    if current or filename.startswith(HASHED_DIRS):
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+        response.cache_control.no_cache = None
+    return response
+
+
+def init_app(app):
+    app.url_defaults(add_version)
+    app.view_functions["static"] = send_static_file
+    with app.app_context():
+        build()
+
+
+assets_cli = AppGroup("assets", help="Manage fingerprinted static files.")
+
+
+@assets_cli.command("build")
+def build_command():
+    """Fingerprint static files and write .gz/.br siblings."""
+    written = build()
+    for path in written:
+        click.echo(f"Wrote {os.path.relpath(path)}")
+    click.echo(f"Build {build_id}, brotli "
+               + ("enabled" if brotli else "not installed"))
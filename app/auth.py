@@ -0,0 +1,110 @@
+import functools
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from flask import current_app, g, redirect, session
+
+import app.generations as generations
+import app.models as models
+
+# Seconds an account lookup is reused across requests (0 disables the cache).
+# Changes made through any server worker reach every worker straight away;
+# this bounds how long ones made outside it (the flask shell) take.
+DEFAULT_ACCOUNT_CACHE_TTL = 30
+
+# Accounts kept per process; the least recently used is dropped beyond this
+DEFAULT_ACCOUNT_CACHE_SIZE = 1024
+
+# The fields pages need about the logged-in account, detached from the session
+CurrentUser = namedtuple("CurrentUser",
+                         ["AccountID", "AccountUsername", "AccountIsAdmin"])
+
+# AccountID -> (expires at, CurrentUser or None), least recently used first
+_account_cache = OrderedDict()
+_account_cache_lock = threading.Lock()
+# generations.current("accounts") when the cache was last emptied
+_account_generation = None
+
+
+def cached_account(account_id, now):
+    global _account_generation
+    with _account_cache_lock:
+        # An account changed since the cache was last emptied, through this
+        # worker or another one: empty it again. Entries read before that
+        # change were stored under the old generation, so they go as well.
+        generation = generations.current("accounts")
+        if generation != _account_generation:
+            _account_cache.clear()
+            _account_generation = generation
+        cached = _account_cache.get(account_id)
+        if cached is None:
+            return None
+        if cached[0] <= now:  # Expired entries go as soon as they are seen
+            del _account_cache[account_id]
+            return None
+        _account_cache.move_to_end(account_id)
+        return cached
+
+
+def cache_account(account_id, expires, user):
+    size = current_app.config.get("ACCOUNT_CACHE_SIZE",
+                                  DEFAULT_ACCOUNT_CACHE_SIZE)
+    with _account_cache_lock:
+        _account_cache[account_id] = (expires, user)
+        _account_cache.move_to_end(account_id)
+        while len(_account_cache) > size:
+            _account_cache.popitem(last=False)
+
+
+def lookup_account(account_id):
+    ttl = current_app.config.get("ACCOUNT_CACHE_TTL",
+                                 DEFAULT_ACCOUNT_CACHE_TTL)
+    now = time.monotonic()
+    if ttl:
+        cached = cached_account(account_id, now)
+        if cached:
+            return cached[1]
+
+    row = models.Accounts.query.with_entities(
+        models.Accounts.AccountID, models.Accounts.AccountUsername,
+        models.Accounts.AccountIsAdmin,
+    ).filter(models.Accounts.AccountID == account_id).first()
+    user = CurrentUser(*row) if row else None
+
+    if ttl:
+        cache_account(account_id, now + ttl, user)
+    return user
+
+
+def invalidate_account(account_id):
+    # Called once an account change is committed, e.g. a delete; every
+    # worker empties its cache at its next lookup
+    with _account_cache_lock:
+        _account_cache.pop(account_id, None)
+    generations.bump("accounts")
+
+
+def current_user():
+    # Loaded at most once per request, then kept on flask.g
+    if "current_user" not in g:
+        account_id = session.get("AccountID")
+        g.current_user = lookup_account(account_id) if account_id else None
+    return g.current_user
+
+
+def is_admin():
+    user = current_user()
+    return bool(user and user.AccountIsAdmin)
+
+
+def admin_required(view):
+    # Guests go to the login page, regular users back to their dashboard
+    @functools.wraps(view)
+    def wrapped(*args, **kwargs):
+        if "AccountID" not in session:
+            return redirect("/login")
+        if not is_admin():
+            return redirect("/dashboard")
+        return view(*args, **kwargs)
+    return wrapped
@@ -0,0 +1,414 @@
+import csv
+import json
+import string
+import sys
+import time
+from contextlib import nullcontext
+from datetime import date
+from types import SimpleNamespace
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import func, select
+from werkzeug.exceptions import HTTPException
+from wtforms import ValidationError
+
+from app.extensions import db
+import app.routes as routes
+import app.models as models
+import app.database as database
+import app.conditional as conditional
+import app.search as game_search
+import app.hardware as hardware
+from app.forms import unit_validation
+
+# Games written per transaction on import and read per query on export
+BATCH_SIZE = 1000
+
+# PC (PlatformID 1) lists minimum and recommended specs, consoles one set
+PC_PLATFORM_ID = 1
+PC_REQUIREMENTS = {"Minimum": ("OS", "RAM", "CPU", "GPU", "Storage"),
+                   "Recommended": ("OS", "RAM", "CPU", "GPU", "Storage")}
+CONSOLE_REQUIREMENTS = {"Normal": ("OS", "Storage")}
+SIZE_FIELDS = ("RAM", "Storage")  # Checked with forms.unit_validation
+
+GAME_FIELDS = ("GameName", "GameDescription", "GameDeveloper", "GameImage")
+CSV_FIELDS = GAME_FIELDS + ("Categories", "Platforms")
+
+# Blank admin form fields are stored as these; feeds use null instead
+MISSING_TEXT = "N/A"
+MISSING_PRICE = -1
+MISSING_DATE = "1900-01-01"
+
+
+# SQLite's lower() folds ASCII letters only, so names are folded the same
+# way here before they are compared with lower(GameName)
+ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+class RecordError(ValueError):
+    pass
+
+
+def open_stream(path, mode):
+    # "-" is stdin/stdout (left open); the csv module needs newline=""
+    if path == "-":
+        return nullcontext(sys.stdin if mode == "r" else sys.stdout)
+    return open(path, mode, newline="", encoding="utf-8")
+
+
+def feed_format(path, fmt=None):
+    return fmt or ("csv" if path.lower().endswith(".csv") else "jsonl")
+
+
+def read_records(stream, fmt):
+    # Yields (line number, record or None, parse error or None), one at a
+    # time so memory use does not grow with the feed
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            try:
+                platforms = json.loads(row.get("Platforms") or "[]")
+            except ValueError:
+                yield reader.line_num, None, "Platforms is not valid JSON"
+                continue
+            categories = [name.strip() for name in
+                          (row.get("Categories") or "").split(";")
+                          if name.strip()]
+            yield reader.line_num, dict(row, Categories=categories,
+                                        Platforms=platforms), None
+        return
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line), None
+        except ValueError:
+            yield line_number, None, "Line is not valid JSON"
+
+
+def name_lookup(id_column, name_column):
+    return {name.lower(): row_id for row_id, name in db.session.execute(
+        select(id_column, name_column))}
+
+
+def text_value(value):
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        raise RecordError(f"Expected text, got {value!r}")
+    return value.strip() or None
+
+
+def validate_requirements(platform_id, requirements):
+    # Same rules as AdminGameForm: sizes need a number and a GB/TB/MB/KB unit
+    allowed = PC_REQUIREMENTS if platform_id == PC_PLATFORM_ID \
+        else CONSOLE_REQUIREMENTS
+    requirements = requirements or {}
+    unknown = set(requirements) - set(allowed)
+    if unknown:
+        raise RecordError(f"Unknown requirement type {sorted(unknown)[0]}")
+    rows = []
+    for requirement_type, fields in allowed.items():
+        given = requirements.get(requirement_type) or {}
+        extra = set(given) - set(fields)
+        if extra:
+            raise RecordError(f"{requirement_type} requirements cannot list "
+                              f"{sorted(extra)[0]}")
+        row = {"PlatformID": platform_id, "Type": requirement_type}
+        for field in ("OS", "RAM", "CPU", "GPU", "Storage"):
+            value = text_value(given.get(field))
+            if value and field in SIZE_FIELDS:
+                try:
+                    unit_validation(None, SimpleNamespace(data=value))
+                except ValidationError as error:
+                    raise RecordError(f"{requirement_type} {field}: {error}")
+            row[field] = value or MISSING_TEXT
+        rows.append(row)
+    return rows
+
+
+def validate_price(platform):
+    price = platform.get("Price")
+    if price in (None, ""):
+        price = MISSING_PRICE
+    else:
+        try:
+            price = round(float(price), 2)
+        except (TypeError, ValueError):
+            raise RecordError(f"Invalid price {price!r}")
+        if price < 0:
+            raise RecordError("Price cannot be negative")
+    release_date = platform.get("ReleaseDate") or MISSING_DATE
+    try:
+        release_date = date.fromisoformat(release_date).isoformat()
+    except (TypeError, ValueError):
+        raise RecordError(f"Release date {release_date!r} is not YYYY-MM-DD")
+    return {"Price": price, "ReleaseDate": release_date}
+
+
+def validate_record(record, categories, platforms):
+    # Returns (game row, category IDs, platform rows, requirement rows) with
+    # the same rules and placeholders the admin form uses
+    if not isinstance(record, dict):
+        raise RecordError("Record must be an object")
+    game = {field: text_value(record.get(field)) for field in GAME_FIELDS}
+    if not game["GameName"]:
+        raise RecordError("GameName is required")
+
+    category_ids = []
+    for name in record.get("Categories") or []:
+        category_id = categories.get(str(name).strip().lower())
+        if category_id is None:
+            raise RecordError(f"Unknown category {name!r}")
+        category_ids.append(category_id)
+    if not category_ids:
+        raise RecordError("At least one category is required")
+
+    platform_rows, requirement_rows = [], []
+    for platform in record.get("Platforms") or []:
+        if not isinstance(platform, dict):
+            raise RecordError("Each platform must be an object")
+        platform_id = platforms.get(str(platform.get("Platform")).lower())
+        if platform_id is None:
+            raise RecordError(f"Unknown platform {platform.get('Platform')!r}")
+        if any(row["PlatformID"] == platform_id for row in platform_rows):
+            raise RecordError(f"Platform {platform['Platform']} listed twice")
+        platform_rows.append({"PlatformID": platform_id}
+                             | validate_price(platform))
+        requirement_rows += validate_requirements(
+            platform_id, platform.get("Requirements"))
+    if not platform_rows:
+        raise RecordError("At least one platform is required")
+    return game, sorted(set(category_ids)), platform_rows, requirement_rows
+
+
+def write_batch(games):
+    # One transaction per batch: the games via INSERT ... RETURNING, then
+    # every dependent table with a single executemany each
+    with routes.UnitOfWork() as work:
+        game_ids = work.insert_many(models.Games, [game[0] for game in games],
+                                    returning=True)
+        work.insert_many(models.GameRatingStats,
+                         [{"GameID": game_id} for game_id in game_ids])
+        links, platforms, details, requirements = [], [], [], []
+        for game_id, (_, category_ids, platform_rows, requirement_rows) \
+                in zip(game_ids, games):
+            links += [{"GameID": game_id, "CategoryID": category_id}
+                      for category_id in category_ids]
+            platforms += [{"GameID": game_id, "PlatformID": row["PlatformID"]}
+                          for row in platform_rows]
+            details += [{"GameID": game_id} | row for row in platform_rows]
+            requirements += hardware.with_parsed(
+                [{"GameID": game_id} | row for row in requirement_rows])
+        work.insert_many(models.GameCategories, links)
+        work.insert_many(models.GamePlatforms, platforms)
+        work.insert_many(models.GamePlatformDetails, details)
+        work.insert_many(models.SystemRequirements, requirements)
+    return len(links) + len(platforms) + len(details) + len(requirements)
+
+
+def write_new(batch, report, category_ids, platform_ids):
+    # Write the games of {folded name: game} whose names are not taken yet;
+    # one IN query on ix_Games_GameName_lower finds those that are
+    folded = func.lower(models.Games.GameName)
+    taken = set(db.session.scalars(
+        select(folded).where(folded.in_(list(batch)))))
+    games = [game for name, game in batch.items() if name not in taken]
+    report["skipped"] += len(batch) - len(games)
+    if not games:
+        return
+    report["rows"] += write_batch(games) + len(games)
+    report["imported"] += len(games)
+    for _, game_category_ids, platform_rows, _ in games:
+        category_ids.update(game_category_ids)
+        platform_ids.update(row["PlatformID"] for row in platform_rows)
+
+
+def import_records(records, batch_size=BATCH_SIZE, on_error=None):
+    # Validate and write a stream of (line, record, error) tuples; names that
+    # already exist (case-insensitive, as in the admin form) are skipped.
+    # Each batch commits before the next is checked, so a name repeated
+    # later in the feed is found in the database.
+    categories = name_lookup(models.Categories.CategoryID,
+                             models.Categories.CategoryName)
+    platforms = name_lookup(models.Platforms.PlatformID,
+                            models.Platforms.PlatformName)
+    db.session.commit()
+    report = {"imported": 0, "rows": 0, "skipped": 0, "rejected": 0}
+    category_ids, platform_ids = set(), set()
+    batch = {}  # Folded name -> validated game
+    for line_number, record, error in records:
+        try:
+            if error:
+                raise RecordError(error)
+            game = validate_record(record, categories, platforms)
+        except RecordError as reason:
+            report["rejected"] += 1
+            if on_error:
+                on_error(line_number, reason)
+            continue
+        name = game[0]["GameName"].translate(ASCII_LOWER)
+        if name in batch:
+            report["skipped"] += 1
+            continue
+        batch[name] = game
+        if len(batch) >= batch_size:
+            write_new(batch, report, category_ids, platform_ids)
+            batch = {}
+    if batch:
+        write_new(batch, report, category_ids, platform_ids)
+
+    if report["imported"]:
+        # Listings showing the new games get new versions, then search
+        # picks them all up in one pass. Running servers see the new
+        # UpdatedAt stamps and catch their facet index up on the next
+        # request and their suggest index within SUGGEST_REFRESH_INTERVAL,
+        # with no restart.
+        conditional.touch(models.Categories, category_ids, commit=False)
+        conditional.touch(models.Platforms, platform_ids, commit=False)
+        game_search.rebuild_index()
+    return report
+
+
+def export_records(batch_size=BATCH_SIZE):
+    # Yields one nested record per game, reading batch_size games at a time
+    # with one query per table
+    last_id = 0
+    while True:
+        games = db.session.execute(
+            select(models.Games.GameID,
+                   *[getattr(models.Games, field) for field in GAME_FIELDS])
+            .where(models.Games.GameID > last_id)
+            .order_by(models.Games.GameID).limit(batch_size)).all()
+        if not games:
+            return
+        game_ids = [game.GameID for game in games]
+        last_id = game_ids[-1]
+
+        categories = {}
+        for game_id, name in db.session.execute(
+                select(models.GameCategories.GameID,
+                       models.Categories.CategoryName)
+                .join(models.Categories, models.Categories.CategoryID ==
+                      models.GameCategories.CategoryID)
+                .where(models.GameCategories.GameID.in_(game_ids))
+                .order_by(models.Categories.CategoryName)):
+            categories.setdefault(game_id, []).append(name)
+
+        # Plain rows rather than ORM objects; a batch has thousands of these
+        requirements = {}
+        table = models.SystemRequirements.__table__
+        for row in db.session.execute(
+                select(table).where(table.c.GameID.in_(game_ids))
+                .order_by(table.c.RequirementsID)).mappings():
+            allowed = PC_REQUIREMENTS if row["PlatformID"] == PC_PLATFORM_ID \
+                else CONSOLE_REQUIREMENTS
+            fields = {field: row[field]
+                      for field in allowed.get(row["Type"], ())
+                      if row[field] not in (None, MISSING_TEXT)}
+            if fields:
+                key = (row["GameID"], row["PlatformID"])
+                requirements.setdefault(key, {})[row["Type"]] = fields
+
+        details = models.GamePlatformDetails
+        platforms = {}
+        for game_id, platform_id, name, price, release_date in \
+                db.session.execute(
+                    select(models.GamePlatforms.GameID,
+                           models.GamePlatforms.PlatformID,
+                           models.Platforms.PlatformName, details.Price,
+                           details.ReleaseDate)
+                    .join(models.Platforms, models.Platforms.PlatformID ==
+                          models.GamePlatforms.PlatformID)
+                    .outerjoin(details, (details.GameID ==
+                                         models.GamePlatforms.GameID)
+                               & (details.PlatformID ==
+                                  models.GamePlatforms.PlatformID))
+                    .where(models.GamePlatforms.GameID.in_(game_ids))
+                    .order_by(models.GamePlatforms.PlatformID)):
+            platforms.setdefault(game_id, []).append({
+                "Platform": name,
+                "Price": None if price in (None, MISSING_PRICE) else price,
+                "ReleaseDate": None if release_date in (None, MISSING_DATE)
+                else release_date,
+                "Requirements": requirements.get((game_id, platform_id), {}),
+            })
+        db.session.commit()
+
+        for game in games:
+            record = {field: getattr(game, field) for field in GAME_FIELDS}
+            record["Categories"] = categories.get(game.GameID, [])
+            record["Platforms"] = platforms.get(game.GameID, [])
+            yield record
+
+
+def write_records(records, stream, fmt):
+    count = 0
+    if fmt == "csv":
+        writer = csv.DictWriter(stream, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+    for record in records:
+        if fmt == "csv":
+            writer.writerow(record | {
+                "Categories": ";".join(record["Categories"]),
+                "Platforms": json.dumps(record["Platforms"])})
+        else:
+            stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+        count += 1
+    return count
+
+
+games_cli = AppGroup("games", help="Bulk import and export the catalogue.")
+
+
+@games_cli.command("import")
+@click.argument("path")
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]),
+              help="Defaults to csv for .csv files, jsonl otherwise.")
+@click.option("--batch-size", default=BATCH_SIZE, show_default=True,
+              help="Games written per transaction.")
+def import_command(path, fmt, batch_size):
+    """Load games from a CSV or JSONL feed ("-" reads stdin)."""
+    def report_error(line_number, reason):
+        click.echo(f"Line {line_number}: {reason}", err=True)
+
+    started = time.perf_counter()
+    # The existing-name check must see the primary, not a lagging replica
+    with open_stream(path, "r") as stream, database.primary():
+        records = read_records(stream, feed_format(path, fmt))
+        try:
+            report = import_records(records, batch_size,
+                                    on_error=report_error)
+        except HTTPException as error:
+            raise click.ClickException(f"Import stopped: {error.description}")
+    elapsed = time.perf_counter() - started
+    summary = f"Imported {report['imported']} games ({report['rows']} rows) " \
+        f"in {elapsed:.2f}s"
+    if report["imported"]:
+        summary += f", {report['imported'] / elapsed:.0f} games/s"
+    click.echo(f"{summary}; skipped {report['skipped']} existing, "
+               f"rejected {report['rejected']} lines")
+    # A feed where every line was rejected is an error for scripts, not an
+    # empty success
+    if report["rejected"] and not report["imported"] \
+            and not report["skipped"]:
+        raise click.ClickException(
+            f"All {report['rejected']} records were rejected")
+
+
+@games_cli.command("export")
+@click.argument("path", default="-")
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]),
+              help="Defaults to csv for .csv files, jsonl otherwise.")
+@click.option("--batch-size", default=BATCH_SIZE, show_default=True,
+              help="Games read per query.")
+def export_command(path, fmt, batch_size):
+    """Write every game with its categories, platforms and requirements."""
+    started = time.perf_counter()
+    with open_stream(path, "w") as stream:
+        count = write_records(export_records(batch_size), stream,
+                              feed_format(path, fmt))
+    elapsed = time.perf_counter() - started
+    click.echo(f"Exported {count} games in {elapsed:.2f}s, "
+               f"{count / elapsed:.0f} games/s", err=True)
@@ -0,0 +1,121 @@
+import hashlib
+
+from flask import Response, make_response, request, session
+from sqlalchemy import and_, func, update
+from werkzeug.http import is_resource_modified
+
+from app.extensions import db
+import app.models as models
+import app.images as images
+import app.assets as assets
+
+
+def weak_etag(*parts):
+    # Fingerprint of the entity versions (and viewer) a page is built from,
+    # plus the cover images and stylesheet/script versions it links to
+    parts += (images.manifest.version(), assets.build_id)
+    return hashlib.sha1(repr(parts).encode()).hexdigest()[:24]
+
+
+def newest(*timestamps):
+    return max((stamp for stamp in timestamps if stamp), default=None)
+
+
+def not_modified(etag, last_modified=None, public=False):
+    # True when the browser's copy is still current, checked before any
+    # template runs. Pending flash messages always need a fresh render of a
+    # page; public documents never show them or read the session.
+    if request.method not in ("GET", "HEAD"):
+        return False
+    if not public and "_flashes" in session:
+        return False
+    return not is_resource_modified(request.environ, etag=etag,
+                                    last_modified=last_modified)
+
+
+def validated(response, etag, last_modified=None, public=False):
+    # Attach validators; browsers keep the page but revalidate on each visit.
+    # public: the same for every visitor, so shared caches may keep it too
+    response = make_response(response)
+    response.set_etag(etag, weak=True)
+    if last_modified:
+        response.last_modified = last_modified
+    if public:
+        response.headers["Cache-Control"] = "public, no-cache"
+    else:
+        response.headers["Cache-Control"] = "private, no-cache"
+        response.vary.add("Cookie")
+    return response
+
+
+def not_modified_response(etag, last_modified=None, public=False):
+    return validated(Response(status=304), etag, last_modified, public)
+
+
+def touch(model, ids, commit=True):
+    # Bump UpdatedAt on rows whose rendered pages changed without their own
+    # columns changing (e.g. a category gaining a game)
+    ids = list(ids)
+    if not ids:
+        return
+    primary_key = getattr(model, model.__mapper__.primary_key[0].key)
+    db.session.execute(update(model).where(primary_key.in_(ids))
+                       .values(UpdatedAt=models.utcnow()))
+    if commit:
+        db.session.commit()
+
+
+def game_versions(game_id, platform_id):
+    # UpdatedAt of everything the game page shows, in one indexed lookup
+    details = models.GamePlatformDetails
+    return db.session.query(
+        models.Games.UpdatedAt, models.GameRatingStats.UpdatedAt,
+        details.UpdatedAt,
+    ).outerjoin(models.GameRatingStats).outerjoin(details, and_(
+        details.GameID == models.Games.GameID,
+        details.PlatformID == platform_id,
+    )).filter(models.Games.GameID == game_id).first()
+
+
+def game_platform_versions(game_id):
+    # UpdatedAt of a game and of its newest per-platform details, or None
+    # when the game does not exist
+    details = models.GamePlatformDetails
+    return db.session.query(
+        models.Games.UpdatedAt, func.max(details.UpdatedAt),
+    ).outerjoin(details, details.GameID == models.Games.GameID).filter(
+        models.Games.GameID == game_id).group_by(models.Games.GameID).first()
+
+
+def row_versions(rows):
+    # (id, UpdatedAt) pairs for a rendered listing, including rating stats
+    versions = []
+    for row in rows:
+        identity = row.__mapper__.primary_key_from_instance(row)
+        stats = getattr(row, "rating_stats", None)
+        versions.append((*identity, row.UpdatedAt,
+                         stats.UpdatedAt if stats else None))
+    return versions
+
+
+def entity_version(model, entity_id):
+    primary_key = getattr(model, model.__mapper__.primary_key[0].key)
+    return db.session.query(model.UpdatedAt).filter(
+        primary_key == entity_id).scalar()
+
+
+def listing_etag(rows):
+    # ETag for a listing page from the rows it shows and who is viewing
+    return weak_etag(request.full_path, session.get("AccountUsername"),
+                     row_versions(rows))
+
+
+def respond(etag, last_modified, render, public=False):
+    # 304 without running render() when the browser's copy is current.
+    # Pages that differ per viewer (their name, rating or admin controls)
+    # pass last_modified=None: a timestamp cannot tell viewers apart, and a
+    # browser sending only If-Modified-Since would get a 304 for a page
+    # rendered for someone else, so they validate on the ETag alone
+    if not_modified(etag, last_modified, public):
+        return not_modified_response(etag, last_modified, public)
+    return validated(render(), etag, last_modified, public)
@@ -0,0 +1,188 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import current_app, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Select, TextClause, event
+from sqlalchemy.engine import make_url
+
+# Run on every new SQLite connection; SQLITE_PRAGMAS entries override these
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",  # Readers keep reading while a write commits
+    "synchronous": "NORMAL",  # With WAL, fsync at checkpoints only
+    "foreign_keys": "ON",  # Enforce the ON DELETE CASCADE declarations
+    "busy_timeout": 5000,  # Milliseconds a writer waits for another writer
+    "cache_size": -65536,  # Negative means KiB: 64MB of pages per connection
+    "mmap_size": 268435456,  # Read up to 256MB of the file through mmap
+    "temp_store": "MEMORY",
+}
+
+# Connections kept open per process, and how many more may open under load
+DEFAULT_POOL_SIZE = 10
+DEFAULT_MAX_OVERFLOW = 10
+DEFAULT_POOL_TIMEOUT = 30  # Seconds a request waits for a free connection
+
+# Bind key of the engine SELECTs go to when DATABASE_REPLICA_URI is set
+REPLICA = "replica"
+
+# Seconds a user's reads stay on the primary after they wrote something,
+# long enough for the replica to catch up so they see their own change
+DEFAULT_STICKY_SECONDS = 5
+
+# Flask session key holding the time until which reads stay on the primary
+STICKY_KEY = "_read_primary_until"
+
+_primary_only = ContextVar("primary_only", default=False)
+
+
+def pragmas(app):
+    return DEFAULT_PRAGMAS | app.config.get("SQLITE_PRAGMAS", {})
+
+
+def is_memory(url):
+    return url.database in (None, "", ":memory:") \
+        or url.query.get("mode") == "memory"
+
+
+def engine_options(app, uri):
+    url = make_url(uri)
+    options = {}
+    if not is_memory(url):
+        options.update(
+            pool_size=app.config.get("DATABASE_POOL_SIZE", DEFAULT_POOL_SIZE),
+            max_overflow=app.config.get("DATABASE_MAX_OVERFLOW",
+                                        DEFAULT_MAX_OVERFLOW),
+            pool_timeout=app.config.get("DATABASE_POOL_TIMEOUT",
+                                        DEFAULT_POOL_TIMEOUT),
+        )
+    # The driver's own busy handler, in seconds, matches busy_timeout
+    busy_timeout = pragmas(app)["busy_timeout"]
+    options["connect_args"] = {"timeout": busy_timeout / 1000}
+    return options
+
+
+def configure(app):
+    # Fill the engine settings before db.init_app creates the engines;
+    # options already set in the config win. SQLALCHEMY_DATABASE_URI is the
+    # primary (a SQLite file, or sqlite:// in memory), and
+    # DATABASE_REPLICA_URI adds a read-only engine for SELECTs.
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(
+        app, app.config["SQLALCHEMY_DATABASE_URI"]) | app.config.get(
+        "SQLALCHEMY_ENGINE_OPTIONS", {})
+    replica_uri = app.config.get("DATABASE_REPLICA_URI")
+    if replica_uri:
+        binds = app.config.setdefault("SQLALCHEMY_BINDS", {})
+        binds[REPLICA] = {"url": replica_uri,
+                          **engine_options(app, replica_uri)}
+
+
+def require_sqlite(engine):
+    # Migrations track the schema in PRAGMA user_version and /search is an
+    # FTS5 table, so every engine must be SQLite; fail at startup rather
+    # than on the first DDL statement or search
+    if engine.dialect.name != "sqlite":
+        raise RuntimeError(
+            f"{engine.url.render_as_string(hide_password=True)}: only SQLite "
+            f"databases are supported, not {engine.dialect.name}")
+
+
+def install(app, engine):
+    # Apply the pragmas to each connection the pool opens from now on
+    settings = pragmas(app)
+
+    @event.listens_for(engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in settings.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+
+@contextmanager
+def primary():
+    # Send every read in the block to the primary, e.g. checks that must see
+    # rows another process just wrote
+    token = _primary_only.set(True)
+    try:
+        yield
+    finally:
+        _primary_only.reset(token)
+
+
+def reads_pinned():
+    # Forms read then write (e.g. the user's existing rating), so POSTs read
+    # from the primary too, as does a user who wrote in the last few seconds
+    if _primary_only.get():
+        return True
+    if not has_request_context():
+        return False
+    return request.method not in ("GET", "HEAD") or \
+        session.get(STICKY_KEY, 0) > time.time()
+
+
+class RoutingSession(Session):
+    # SELECTs go to the replica engine, everything else to the primary. Once
+    # a transaction writes, its remaining reads stay on the primary so they
+    # see the uncommitted rows; after it commits, the session and the user's
+    # later requests read from the primary for DATABASE_STICKY_SECONDS.
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or not self.is_read(clause):
+                self.info["wrote"] = True
+            else:
+                # Without a replica, never touch the Flask session here
+                replica = self._db.engines.get(REPLICA)
+                if replica is not None and self.reads_from_replica():
+                    return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind,
+                                **kwargs)
+
+    def reads_from_replica(self):
+        return not self.info.get("wrote") and not reads_pinned() and \
+            self.info.get(STICKY_KEY, 0) <= time.time()
+
+    @staticmethod
+    def is_read(clause):
+        if isinstance(clause, Select):
+            return True
+        return isinstance(clause, TextClause) and \
+            clause.text.lstrip().upper().startswith("SELECT")
+
+
+def pin_reads(extra_seconds=0):
+    # Keep the current user's reads on the primary for the sticky window,
+    # plus extra_seconds for writes another thread has yet to commit
+    if not current_app.config.get("DATABASE_REPLICA_URI"):
+        return
+    session[STICKY_KEY] = time.time() + extra_seconds + \
+        current_app.config.get("DATABASE_STICKY_SECONDS",
+                               DEFAULT_STICKY_SECONDS)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def stick_to_primary(db_session):
+    if not db_session.info.pop("wrote", False) or \
+            REPLICA not in db_session._db.engines:
+        return
+    db_session.info[STICKY_KEY] = time.time() + current_app.config.get(
+        "DATABASE_STICKY_SECONDS", DEFAULT_STICKY_SECONDS)
+    if has_request_context():
+        pin_reads()
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def forget_writes(db_session):
+    db_session.info.pop("wrote", None)
+
+
+def sync_replica(primary_engine, replica_engine):
+    # Local stand-in for replication: copy a SQLite primary into a SQLite
+    # replica with the online backup API
+    source = primary_engine.raw_connection()
+    target = replica_engine.raw_connection()
+    try:
+        source.driver_connection.backup(target.driver_connection)
+    finally:
+        target.close()
+        source.close()
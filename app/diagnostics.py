@@ -0,0 +1,203 @@
+import cProfile
+import functools
+import io
+import logging
+import os
+import pstats
+import re
+import secrets
+import time
+from contextvars import ContextVar
+from datetime import datetime
+
+from flask import (current_app, g, has_app_context, has_request_context,
+                   request)
+from sqlalchemy import event
+
+from app.extensions import db
+import app.auth as auth
+
+try:
+    from pyinstrument import Profiler
+except ImportError:  # pyinstrument is optional; cProfile is always there
+    Profiler = None
+
+# Slow execute_query calls go here; SLOW_QUERY_LOG also writes them to a file
+logger = logging.getLogger("games.slow_queries")
+
+# Lines of the cProfile report written next to the .prof dump
+PROFILE_REPORT_LINES = 60
+
+# Statements sent during the execute_query call running now, if any
+_statements = ContextVar("statements", default=None)
+
+
+def slow_query_seconds():
+    # SLOW_QUERY_SECONDS turns the slow-query log on; unset leaves it off
+    if not has_app_context():
+        return None
+    return current_app.config.get("SLOW_QUERY_SECONDS")
+
+
+def describe_call(model, operation, kwargs):
+    # "Games.SELECT id=3 filters={'GameID': [1, 2]}", leaving out rows
+    # being written
+    arguments = " ".join(f"{name}={value!r}" for name, value in
+                         sorted(kwargs.items())
+                         if value is not None and name != "data")
+    return f"{model.__name__}.{operation} {arguments}".rstrip()
+
+
+def bound_sql(statement, parameters):
+    # The statement with its parameters shown inline, for reading only
+    if isinstance(parameters, (list, tuple)) and parameters \
+            and isinstance(parameters[0], (list, tuple, dict)):
+        parameters = parameters[0]  # executemany: show the first row
+    values = iter(parameters) if isinstance(parameters, (list, tuple)) \
+        else iter(())
+    return re.sub(r"\?", lambda _: repr(next(values, "?")), statement)
+
+
+def query_plan(statement, parameters):
+    # EXPLAIN QUERY PLAN, run on a separate connection once the call has
+    # finished
+    if isinstance(parameters, list) and parameters \
+            and isinstance(parameters[0], (list, tuple, dict)):
+        parameters = parameters[0]
+    try:
+        with db.engine.connect() as conn:
+            if not isinstance(parameters, dict):
+                parameters = tuple(parameters or ())
+            rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement,
+                                        parameters)
+            return [str(row[-1]) for row in rows]
+    except Exception as error:  # e.g. a DDL statement
+        return [f"(no plan: {error})"]
+
+
+def logged(function):
+    # Decorates execute_query: calls slower than SLOW_QUERY_SECONDS are
+    # logged with their arguments, each statement's SQL and its query plan
+    @functools.wraps(function)
+    def wrapper(model, operation="SELECT", *args, **kwargs):
+        threshold = slow_query_seconds()
+        if threshold is None:
+            return function(model, operation, *args, **kwargs)
+        statements = []
+        token = _statements.set(statements)
+        started = time.perf_counter()
+        try:
+            return function(model, operation, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            _statements.reset(token)
+            if elapsed >= threshold:
+                log_slow_call(model, operation, kwargs, elapsed, statements)
+    return wrapper
+
+
+def log_slow_call(model, operation, kwargs, elapsed, statements):
+    lines = [f"Slow query {elapsed * 1000:.1f}ms: "
+             f"{describe_call(model, operation, kwargs)}"]
+    if has_request_context():
+        lines[0] += f" during {request.method} {request.full_path.rstrip('?')}"
+    for statement, parameters, seconds in statements:
+        lines.append(f"  {seconds * 1000:.1f}ms "
+                     f"{bound_sql(statement, parameters)}")
+        plan = query_plan(statement, parameters)
+        lines += [f"    {step}" for step in plan]
+    logger.warning("\n".join(lines))
+
+
+def install(engine):
+    # Record the statements an execute_query call sends while it is logged
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_statement(conn, cursor, statement, parameters, context,
+                        executemany):
+        if _statements.get() is not None:
+            conn.info.setdefault("diagnostics_started", []).append(
+                time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def end_statement(conn, cursor, statement, parameters, context,
+                      executemany):
+        statements = _statements.get()
+        started = conn.info.get("diagnostics_started")
+        if statements is None or not started:
+            return
+        statements.append((statement, parameters,
+                           time.perf_counter() - started.pop()))
+
+    @event.listens_for(engine, "handle_error")
+    def abandon_statement(context):
+        # A failed statement never reaches after_cursor_execute
+        if context.connection is None:
+            return
+        started = context.connection.info.get("diagnostics_started")
+        if started:
+            started.pop()
+
+
+def profile_path(app, suffix):
+    # PROFILE_DIR/20250101-120000-games.game-1a2b3c4d.prof, by default in
+    # the instance folder
+    folder = app.config.get("PROFILE_DIR") or os.path.join(app.instance_path,
+                                                           "profiles")
+    os.makedirs(folder, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    name = f"{stamp}-{request.endpoint or 'unmatched'}-{secrets.token_hex(4)}"
+    return os.path.join(folder, name + suffix)
+
+
+def start_profile():
+    # ?__profile=1 from an admin profiles the rest of the request
+    if request.args.get("__profile") != "1" or not auth.is_admin():
+        return
+    if Profiler is not None:
+        g.profiler = Profiler()
+        g.profiler.start()
+    else:
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+
+def finish_profile(response):
+    profiler = g.pop("profiler", None)
+    if profiler is None:
+        return response
+    app = current_app._get_current_object()
+    if Profiler is not None and isinstance(profiler, Profiler):
+        profiler.stop()
+        path = profile_path(app, ".html")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(profiler.output_html())
+    else:
+        profiler.disable()
+        path = profile_path(app, ".prof")
+        profiler.dump_stats(path)
+        # Readable summary beside the dump, heaviest calls first
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats(
+            "cumulative").print_stats(PROFILE_REPORT_LINES)
+        with open(path[:-len(".prof")] + ".txt", "w",
+                  encoding="utf-8") as file:
+            file.write(report.getvalue())
+    app.logger.info("Profile of %s written to %s",
+                    request.full_path.rstrip("?"), path)
+    response.headers["X-Profile"] = os.path.basename(path)
+    return response
+
+
+def init_app(app):
+    path = app.config.get("SLOW_QUERY_LOG")
+    if path and not any(getattr(handler, "baseFilename", None) ==
+                        os.path.abspath(path) for handler in logger.handlers):
+        handler = logging.FileHandler(path)
+        handler.setFormatter(logging.Formatter(
+            "%(asctime)s %(process)d %(message)s"))
+        logger.addHandler(handler)
+    with app.app_context():
+        for engine in db.engines.values():
+            install(engine)
+    app.before_request(start_profile)
+    app.after_request(finish_profile)
@@ -0,0 +1,8 @@
+from flask_sqlalchemy import SQLAlchemy
+
+import app.database as database
+
+# Unbound until create_app() calls init_app, so importing it has no side
+# effects. The routing session sends SELECTs to the DATABASE_REPLICA_URI
+# engine when one is configured.
+db = SQLAlchemy(session_options={"class_": database.RoutingSession})
@@ -0,0 +1,305 @@
+import bisect
+import re
+import threading
+
+from flask import abort, request
+from sqlalchemy import func, select
+
+from app.extensions import db
+import app.models as models
+
+# Price bands counted in the browse sidebar: (label, low, high), both ends
+# inclusive and None for open-ended
+PRICE_BANDS = [
+    ("Free", 0, 0),
+    ("Under $10", 0.01, 9.99),
+    ("$10 to $30", 10, 29.99),
+    ("$30 to $60", 30, 59.99),
+    ("$60 and up", 60, None),
+]
+
+# Price and release date the admin form stores for a blank field
+NO_PRICE = -1
+NO_RELEASE_DATE = "1900-01-01"
+
+# Range bitsets kept per snapshot, so paging through one filter reuses them
+RANGE_CACHE_SIZE = 256
+
+
+def bitset(game_ids):
+    # Set of GameIDs as an int with bit GameID set; & and | intersect and
+    # combine whole sets at C speed, and int.bit_count() counts them
+    game_ids = list(game_ids)
+    if not game_ids:
+        return 0
+    bits = bytearray(max(game_ids) // 8 + 1)
+    for game_id in game_ids:
+        bits[game_id >> 3] |= 1 << (game_id & 7)
+    return int.from_bytes(bits, "little")
+
+
+def members(bits, offset=0, limit=None):
+    # GameIDs in a bitset, lowest first, skipping the first offset of them
+    digits = bin(bits)[:1:-1]  # Bit 0 first
+    game_ids = []
+    position = -1
+    while limit is None or len(game_ids) < limit:
+        position = digits.find("1", position + 1)
+        if position < 0:
+            break
+        if offset:
+            offset -= 1
+        else:
+            game_ids.append(position)
+    return game_ids
+
+
+class Offers:
+    # One platform's priced and dated releases, sorted for range lookups
+    def __init__(self, rows):
+        priced = sorted((price, game_id) for game_id, price, _ in rows
+                        if price is not None and price != NO_PRICE)
+        dated = sorted((released, game_id) for game_id, _, released in rows
+                       if released and released != NO_RELEASE_DATE
+                       and released[:4].isdigit())
+        self.prices = [price for price, _ in priced]
+        self.priced_ids = [game_id for _, game_id in priced]
+        self.dates = [released for released, _ in dated]
+        self.dated_ids = [game_id for _, game_id in dated]
+        self.years = {}
+        for released, game_id in dated:
+            self.years.setdefault(int(released[:4]), []).append(game_id)
+        self.years = {year: bitset(game_ids)
+                      for year, game_ids in self.years.items()}
+        self.bands = [self.price_range(low, high)
+                      for _, low, high in PRICE_BANDS]
+
+    @staticmethod
+    def between(keys, game_ids, low, high):
+        start = 0 if low is None else bisect.bisect_left(keys, low)
+        end = len(keys) if high is None else bisect.bisect_right(keys, high)
+        return bitset(game_ids[start:end])
+
+    def price_range(self, low, high):
+        return self.between(self.prices, self.priced_ids, low, high)
+
+    def date_range(self, low, high):
+        return self.between(self.dates, self.dated_ids, low, high)
+
+
+class Snapshot:
+    # Bitsets for one version of the catalogue; they never change once
+    # built, so requests read them without locking
+    def __init__(self, version, game_ids, categories, platforms, links,
+                 offers):
+        self.version = version
+        self.all = bitset(game_ids)
+        self.categories = {category_id: name
+                           for category_id, name in categories}
+        self.platforms = {platform_id: name
+                          for platform_id, name in platforms}
+        grouped = {}
+        for kind, owner_id, game_id in links:
+            grouped.setdefault((kind, owner_id), []).append(game_id)
+        self.category_games = {category_id: bitset(
+            grouped.get(("category", category_id), []))
+            for category_id in self.categories}
+        self.platform_games = {platform_id: bitset(
+            grouped.get(("platform", platform_id), []))
+            for platform_id in self.platforms}
+        rows = {}
+        for game_id, platform_id, price, released in offers:
+            rows.setdefault(platform_id, []).append((game_id, price,
+                                                     released))
+        self.offers = {platform_id: Offers(rows.get(platform_id, []))
+                       for platform_id in self.platforms}
+        self._ranges = {}
+
+    def in_range(self, platform_id, kind, low, high):
+        key = (platform_id, kind, low, high)
+        if key not in self._ranges:
+            if len(self._ranges) >= RANGE_CACHE_SIZE:
+                self._ranges.clear()
+            offers = self.offers[platform_id]
+            self._ranges[key] = offers.price_range(low, high) \
+                if kind == "price" else offers.date_range(low, high)
+        return self._ranges[key]
+
+    def offered(self, platform_id, price, released):
+        # Games released on the platform whose price and release date there
+        # fall in the ranges; (None, None) leaves a range out
+        bits = self.platform_games[platform_id]
+        if price != (None, None):
+            bits &= self.in_range(platform_id, "price", *price)
+        if released != (None, None):
+            bits &= self.in_range(platform_id, "released", *released)
+        return bits
+
+    def browse(self, category_ids=(), platform_ids=(), price=(None, None),
+               released=(None, None)):
+        # (matching GameIDs bitset, facet counts). Values within a facet are
+        # alternatives and facets narrow each other; each count is what the
+        # results would be with that value chosen instead, so one facet's
+        # own choices never hide its other values.
+        category_ids = [id for id in category_ids if id in self.categories]
+        platform_ids = [id for id in platform_ids if id in self.platforms]
+        chosen_platforms = platform_ids or list(self.platforms)
+        ranged = price != (None, None) or released != (None, None)
+
+        in_categories = self.all
+        if category_ids:
+            in_categories = 0
+            for category_id in category_ids:
+                in_categories |= self.category_games[category_id]
+        offered = {platform_id: self.offered(platform_id, price, released)
+                   for platform_id in self.platforms}
+        on_platforms = self.all
+        if platform_ids or ranged:
+            on_platforms = 0
+            for platform_id in chosen_platforms:
+                on_platforms |= offered[platform_id]
+        matches = in_categories & on_platforms
+
+        def counted(bits_for_platform):
+            # Count per value of a range facet over the chosen platforms
+            total = 0
+            for platform_id in chosen_platforms:
+                total |= bits_for_platform(platform_id)
+            return (in_categories & total).bit_count()
+
+        years = sorted({year for offers in self.offers.values()
+                        for year in offers.years}, reverse=True)
+        counts = {
+            "categories": [
+                {"id": category_id, "name": name,
+                 "count": (on_platforms & self.category_games[category_id])
+                 .bit_count()}
+                for category_id, name in self.categories.items()],
+            "platforms": [
+                {"id": platform_id, "name": name,
+                 "count": (in_categories & offered[platform_id]).bit_count()}
+                for platform_id, name in self.platforms.items()],
+            "prices": [
+                {"label": label, "min": low, "max": high,
+                 "count": counted(lambda platform_id, band=band: self.offered(
+                     platform_id, (None, None), released)
+                     & self.offers[platform_id].bands[band])}
+                for band, (label, low, high) in enumerate(PRICE_BANDS)],
+            "years": [
+                {"year": year,
+                 "count": counted(lambda platform_id, year=year: self.offered(
+                     platform_id, price, (None, None))
+                     & self.offers[platform_id].years.get(year, 0))}
+                for year in years],
+        }
+        return matches, counts
+
+
+def catalogue_version():
+    # Every write that adds, edits or removes a game touches the UpdatedAt
+    # of its categories and platforms, both tiny tables; the newest GameID
+    # (a primary key lookup) catches games added without either
+    return db.session.execute(select(
+        select(func.max(models.Categories.UpdatedAt)).scalar_subquery(),
+        select(func.max(models.Platforms.UpdatedAt)).scalar_subquery(),
+        select(func.max(models.Games.GameID)).scalar_subquery(),
+    )).one()
+
+
+def requested_ids(name):
+    # ?category=1,2 or ?category=1&category=2, as checkboxes submit it
+    values = [value for arg in request.args.getlist(name)
+              for value in arg.split(",") if value.strip()]
+    try:
+        return sorted({int(value) for value in values})
+    except ValueError:
+        abort(400, description=f"{name} must be a list of ids")
+
+
+def requested_price(name):
+    value = request.args.get(name, "").strip()
+    if not value:
+        return None
+    try:
+        price = float(value)
+    except ValueError:
+        price = -1
+    if price < 0:
+        abort(400, description=f"{name} must be a price of 0 or more")
+    return price
+
+
+def requested_date(name, year_suffix):
+    # YYYY-MM-DD, or a bare year completed with year_suffix ("-01-01" for
+    # the start of a range, "-12-31" for the end)
+    value = request.args.get(name, "").strip()
+    if not value:
+        return None
+    if re.fullmatch(r"\d{4}", value):
+        return value + year_suffix
+    if not re.fullmatch(r"\d{4}-\d{2}-\d{2}", value):
+        abort(400, description=f"{name} must be a date like 2020-12-31")
+    return value
+
+
+def requested_filters():
+    # Keyword arguments for Snapshot.browse() from the query string:
+    # category, platform, min_price, max_price, released_from, released_to
+    return {
+        "category_ids": requested_ids("category"),
+        "platform_ids": requested_ids("platform"),
+        "price": (requested_price("min_price"),
+                  requested_price("max_price")),
+        "released": (requested_date("released_from", "-01-01"),
+                     requested_date("released_to", "-12-31")),
+    }
+
+
+class FacetIndex:
+    # In-memory bitsets per category, platform, price band and release year,
+    # rebuilt whenever catalogue_version() moves on, so every worker process
+    # follows writes made by the others
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self.builds = 0
+
+    def build(self, version=None):
+        version = version or catalogue_version()
+        game_ids = db.session.scalars(select(models.Games.GameID)).all()
+        categories = db.session.execute(select(
+            models.Categories.CategoryID, models.Categories.CategoryName)
+            .order_by(models.Categories.CategoryName)).all()
+        platforms = db.session.execute(select(
+            models.Platforms.PlatformID, models.Platforms.PlatformName)
+            .order_by(models.Platforms.PlatformID)).all()
+        links = db.session.execute(
+            select(db.literal("category"), models.GameCategories.CategoryID,
+                   models.GameCategories.GameID)
+            .union_all(select(db.literal("platform"),
+                              models.GamePlatforms.PlatformID,
+                              models.GamePlatforms.GameID))).all()
+        details = models.GamePlatformDetails
+        offers = db.session.execute(select(
+            details.GameID, details.PlatformID, details.Price,
+            details.ReleaseDate)).all()
+        self._snapshot = Snapshot(tuple(version), game_ids, categories,
+                                  platforms, links, offers)
+        self.builds += 1
+        return self._snapshot
+
+    def current(self):
+        # One small query per call to notice writes; requests arriving
+        # together after a write wait for a single rebuild
+        version = tuple(catalogue_version())
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.version != version:
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot is None or snapshot.version != version:
+                    snapshot = self.build(version)
+        return snapshot
+
+
+# Process-wide index used by /browse and /api/v1/browse
+index = FacetIndex()
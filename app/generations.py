@@ -0,0 +1,22 @@
+import multiprocessing
+
+# Counters in memory shared by every process forked after this module is
+# imported, which with gunicorn's preload_app is each of its workers. A
+# write bumps its counter once committed; every worker compares the counter
+# with the value it last saw and drops its in-memory copy when it moved,
+# without asking the database. Processes started on their own (the flask
+# CLI, a server without preload_app) share nothing, so the caches using
+# these keep a slower database check for writes made there.
+NAMES = ("accounts", "catalogue")
+
+_values = multiprocessing.RawArray("Q", len(NAMES))
+_lock = multiprocessing.Lock()
+
+
+def current(name):
+    return _values[NAMES.index(name)]
+
+
+def bump(name):
+    with _lock:
+        _values[NAMES.index(name)] += 1
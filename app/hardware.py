@@ -0,0 +1,250 @@
+import functools
+import re
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import bindparam, func, or_, select, update
+from sqlalchemy.dialects import sqlite
+
+from app.extensions import db
+import app.models as models
+
+# Bytes-per-unit multipliers for sizes like "16GB", in MB
+SIZE_UNITS = {"KB": 1 / 1024, "MB": 1, "GB": 1024, "TB": 1024 * 1024}
+
+# Words dropped before matching model names, so "Intel Core i5-3470" and
+# "i5 3470" look the same
+IGNORED_WORDS = {"intel", "amd", "nvidia", "geforce", "core", "radeon",
+                 "graphics", "processor", "or", "better", "equivalent"}
+
+# Reference benchmark scores (PassMark CPU Mark and G3D Mark, rounded),
+# seeded into HardwareScores. Family names like "i5" score as their oldest
+# common member, so a vague requirement is never stricter than it says.
+BENCHMARKS = [
+    ("CPU", "Core 2 Duo", 1000), ("CPU", "Core 2 Duo E7400", 1100),
+    ("CPU", "Core 2 Duo E8400", 1250), ("CPU", "Core 2 Quad Q9450", 2900),
+    ("CPU", "Q9450", 2900),
+    ("CPU", "i3", 1900), ("CPU", "i3-530", 1900), ("CPU", "i3-3210", 2600),
+    ("CPU", "i3-3225", 2700), ("CPU", "i3-4150", 3300),
+    ("CPU", "i3-6300", 4300), ("CPU", "i3-10100", 8800),
+    ("CPU", "i5", 2700), ("CPU", "i5-750", 2700), ("CPU", "i5-2400", 3800),
+    ("CPU", "i5-2500K", 4100), ("CPU", "i5-3300", 4000),
+    ("CPU", "i5-3470", 4700), ("CPU", "i5-3570K", 5000),
+    ("CPU", "i5-4460", 4800), ("CPU", "i5-4690", 5500),
+    ("CPU", "i5-6600K", 6200), ("CPU", "i5-7300U", 3500),
+    ("CPU", "i5-8400", 9200), ("CPU", "i5-9400F", 9600),
+    ("CPU", "i5-10400", 12000), ("CPU", "i5-11400", 17000),
+    ("CPU", "i5-12400", 19500), ("CPU", "i5-13600K", 38000),
+    ("CPU", "i7", 5000), ("CPU", "i7-3770", 6400), ("CPU", "i7-4770K", 7100),
+    ("CPU", "i7-4790", 7200), ("CPU", "i7-4790K", 8000),
+    ("CPU", "i7-8700K", 13800), ("CPU", "i7-9700K", 14500),
+    ("CPU", "i7-9800X", 18000), ("CPU", "i7-10700K", 19500),
+    ("CPU", "i7-11700K", 24800), ("CPU", "i7-12700K", 34000),
+    ("CPU", "i7-13700K", 46000),
+    ("CPU", "i9", 15000), ("CPU", "i9-9900K", 18000),
+    ("CPU", "i9-10900K", 22800), ("CPU", "i9-12900K", 41000),
+    ("CPU", "i9-13900K", 59000),
+    ("CPU", "FX-8370", 7100),
+    ("CPU", "Ryzen 3", 7000), ("CPU", "Ryzen 3 3200G", 7200),
+    ("CPU", "Ryzen 5", 10000), ("CPU", "Ryzen 5 1600", 12300),
+    ("CPU", "Ryzen 5 2600X", 13000), ("CPU", "Ryzen 5 3600X", 17800),
+    ("CPU", "Ryzen 5 5600X", 21900), ("CPU", "Ryzen 5 7600", 27000),
+    ("CPU", "Ryzen 7", 15000), ("CPU", "Ryzen 7 3700X", 22600),
+    ("CPU", "Ryzen 7 5800X", 28000), ("CPU", "Ryzen 7 7800X3D", 34500),
+    ("CPU", "Ryzen 9", 25000), ("CPU", "Ryzen 9 5900X", 39000),
+    ("GPU", "DirectX 9", 100), ("GPU", "Intel HD 3000", 420),
+    ("GPU", "Intel HD 4000", 550), ("GPU", "Intel UHD 630", 1400),
+    ("GPU", "GeForce 8600", 600), ("GPU", "GeForce 9600GT", 900),
+    ("GPU", "GeForce 700 Series", 900), ("GPU", "GTX 600 Series", 1850),
+    ("GPU", "GT 640", 1300), ("GPU", "GT 730", 900), ("GPU", "GT 1030", 2600),
+    ("GPU", "GTX 560", 3200), ("GPU", "GTX 650", 1850),
+    ("GPU", "GTX 660", 4100), ("GPU", "GTX 750 Ti", 3900),
+    ("GPU", "GTX 760", 4950), ("GPU", "GTX 770", 6000),
+    ("GPU", "GTX 780", 8000), ("GPU", "GTX 960", 6000),
+    ("GPU", "GTX 970", 9600), ("GPU", "GTX 980", 11000),
+    ("GPU", "GTX 1050 Ti", 6000), ("GPU", "GTX 1060", 10000),
+    ("GPU", "GTX 1070", 13500), ("GPU", "GTX 1080", 15400),
+    ("GPU", "GTX 1080 Ti", 18500), ("GPU", "GTX 1650", 7800),
+    ("GPU", "GTX 1660", 11500), ("GPU", "GTX 1660 Super", 12700),
+    ("GPU", "GTX 1660 Ti", 11800),
+    ("GPU", "RTX 2060", 14000), ("GPU", "RTX 2060 Super", 16500),
+    ("GPU", "RTX 2070", 16000), ("GPU", "RTX 2070 Super", 18000),
+    ("GPU", "RTX 2080", 18500), ("GPU", "RTX 2080 Ti", 21500),
+    ("GPU", "RTX 3050", 12800), ("GPU", "RTX 3060", 17000),
+    ("GPU", "RTX 3060 Ti", 20500), ("GPU", "RTX 3070", 22300),
+    ("GPU", "RTX 3070 Ti", 23500), ("GPU", "RTX 3080", 24500),
+    ("GPU", "RTX 3090", 26500), ("GPU", "RTX 4060", 19500),
+    ("GPU", "RTX 4070", 26800), ("GPU", "RTX 4080", 34500),
+    ("GPU", "RTX 4090", 38500),
+    ("GPU", "RX 570", 7000), ("GPU", "RX 580", 8700),
+    ("GPU", "RX 5700", 14000), ("GPU", "RX 6600", 15400),
+    ("GPU", "RX 6700 XT", 19500), ("GPU", "RX 6800 XT", 24700),
+    ("GPU", "RX 7900 XTX", 31000),
+]
+
+
+def parse_size_mb(text):
+    # "16GB" -> 16384; None for "N/A", blanks and anything unparseable
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMGT]B)\s*",
+                         (text or "").upper())
+    if not match:
+        return None
+    return round(float(match.group(1)) * SIZE_UNITS[match.group(2)])
+
+
+def tokens(text):
+    # "Intel Core i7-9700K" -> ("i", "7", "9700", "k")
+    text = re.sub(r"(?<=[a-z])(?=\d)|(?<=\d)(?=[a-z])", " ",
+                  (text or "").lower())
+    return tuple(word for word in re.split(r"[^a-z0-9]+", text)
+                 if word and word not in IGNORED_WORDS)
+
+
+def contains(words, key):
+    return any(words[start:start + len(key)] == key
+               for start in range(len(words) - len(key) + 1))
+
+
+# {kind: [(model tokens, score)]}, most specific model first; loaded from
+# HardwareScores on first use, after seed() or rescore(), and by
+# refresh_scores() once the table changes under another process
+_scores = None
+_scores_version = None
+
+
+def scores_version(conn=None):
+    # Moves whenever a score is added, removed or edited; the table has a
+    # few hundred rows, so this is cheap enough to run per write or lookup
+    table = models.HardwareScores
+    return tuple((conn or db.session).execute(select(
+        func.count(), func.max(table.HardwareID), func.total(table.Score),
+        func.total(func.length(table.Model)))).one())
+
+
+def load_scores(conn=None):
+    global _scores, _scores_version
+    table = {}
+    query = select(models.HardwareScores.Kind, models.HardwareScores.Model,
+                   models.HardwareScores.Score)
+    for kind, model, value in (conn or db.session).execute(query):
+        table.setdefault(kind, []).append((tokens(model), value))
+    for entries in table.values():
+        entries.sort(key=lambda entry: -len(entry[0]))
+    _scores_version = scores_version(conn)
+    _scores = table
+    score.cache_clear()
+
+
+def refresh_scores():
+    # Pick up scores edited elsewhere, e.g. `flask hardware rescore` run
+    # while the server is up
+    if _scores is None or scores_version() != _scores_version:
+        load_scores()
+
+
+@functools.lru_cache(maxsize=4096)
+def score(kind, text):
+    # Benchmark score of the most specific known model named in text
+    if _scores is None:
+        load_scores()
+    words = tokens(text)
+    for key, value in _scores.get(kind, []):
+        if key and contains(words, key):
+            return value
+    return None
+
+
+def parsed_columns(row):
+    # The numeric columns for one requirement row; None where the text is
+    # missing ("N/A") or could not be parsed, so it is never read as a
+    # requirement every PC meets
+    return {
+        "RAMMB": parse_size_mb(row.get("RAM")),
+        "StorageMB": parse_size_mb(row.get("Storage")),
+        "CPUScore": score("CPU", row.get("CPU")),
+        "GPUScore": score("GPU", row.get("GPU")),
+    }
+
+
+def with_parsed(rows):
+    # Requirement rows about to be written, plus their numeric columns
+    refresh_scores()
+    return [row | parsed_columns(row) for row in rows]
+
+
+def seed(conn):
+    # Add any BENCHMARKS entries the table lacks; edited scores are kept
+    insert = sqlite.insert(models.HardwareScores)
+    conn.execute(insert.on_conflict_do_nothing(),
+                 [{"Kind": kind, "Model": model, "Score": value}
+                  for kind, model, value in BENCHMARKS])
+    load_scores(conn)
+
+
+def rescore(conn):
+    # Re-derive every row's numeric columns, e.g. after editing scores;
+    # returns the CPU/GPU names that matched nothing
+    requirements = models.SystemRequirements.__table__
+    load_scores(conn)
+    rows = conn.execute(select(
+        requirements.c.RequirementsID, requirements.c.RAM,
+        requirements.c.Storage, requirements.c.CPU, requirements.c.GPU))
+    changes, unmatched = [], set()
+    for row in rows.mappings().all():
+        columns = parsed_columns(row)
+        for kind in ("CPU", "GPU"):
+            if row[kind] not in (None, "", "N/A") and \
+                    columns[f"{kind}Score"] is None:
+                unmatched.add(f"{kind}: {row[kind]}")
+        changes.append({"id": row["RequirementsID"], **columns})
+    if changes:
+        conn.execute(update(requirements).where(
+            requirements.c.RequirementsID == bindparam("id")), changes)
+    return sorted(unmatched)
+
+
+def compatible_games(ram_mb=None, storage_mb=None, cpu_score=None,
+                     gpu_score=None):
+    # ({"Minimum": [game ids], "Recommended": [game ids]}, unknown) for PC
+    # games whose requirements the spec meets. unknown has the same shape
+    # and lists games that pass every checked part that could be parsed but
+    # name RAM, storage or hardware that could not. One range scan of the
+    # covering ix_SystemRequirements_Match index; omitted parts of the spec
+    # are not checked.
+    requirements = models.SystemRequirements
+    limits = [(column, limit) for column, limit in [
+        (requirements.GPUScore, gpu_score),
+        (requirements.CPUScore, cpu_score),
+        (requirements.RAMMB, ram_mb),
+        (requirements.StorageMB, storage_mb)] if limit is not None]
+    rows = db.session.execute(
+        select(requirements.Type, requirements.GameID,
+               *[column for column, _ in limits])
+        .where(requirements.PlatformID == 1,
+               requirements.Type.in_(["Minimum", "Recommended"]),
+               *[or_(column.is_(None), column <= limit)
+                 for column, limit in limits])
+        .order_by(requirements.Type, requirements.GameID))
+    matches = {"Minimum": [], "Recommended": []}
+    unknown = {"Minimum": [], "Recommended": []}
+    for requirement_type, game_id, *values in rows:
+        found = unknown if None in values else matches
+        found[requirement_type].append(game_id)
+    return matches, unknown
+
+
+hardware_cli = AppGroup("hardware",
+                        help="Maintain parsed system requirements.")
+
+
+@hardware_cli.command("rescore")
+def rescore_command():
+    """Add missing benchmark scores and re-parse every requirement row."""
+    seed(db.session.connection())
+    unmatched = rescore(db.session.connection())
+    db.session.commit()
+    count = db.session.execute(select(func.count()).select_from(
+        models.SystemRequirements)).scalar()
+    click.echo(f"Re-parsed {count} requirement rows")
+    for name in unmatched:
+        click.echo(f"No benchmark score for {name}")
@@ -0,0 +1,199 @@
+import hashlib
+import json
+import os
+import threading
+
+import click
+from flask.cli import AppGroup
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional; pages fall back to the originals
+    Image = None
+
+IMAGES_DIR = os.path.join(os.path.dirname(__file__), "static", "images")
+DERIVED_DIR = os.path.join(IMAGES_DIR, "derived")
+MANIFEST_PATH = os.path.join(DERIVED_DIR, "manifest.json")
+
+# Widths generated for every cover; 300 is the grid size, 600 its 2x
+WIDTHS = (150, 300, 600)
+
+# Full-screen images get screen-sized copies instead
+BACKGROUND = "bg.jpg"
+SCREEN_WIDTHS = {BACKGROUND: (960, 1280, 1920)}
+
+# Output format -> (file extension, Pillow save options)
+FORMATS = {
+    "webp": ("webp", {"quality": 80, "method": 6}),
+    "jpeg": ("jpg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+SOURCE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".gif")
+
+
+class Manifest:
+    # original filename -> {"hash", "width", "height", "webp": {width: name},
+    # "jpeg": {width: name}}, reloaded when another process rewrites it
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = path
+        self._entries = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            self._entries, self._mtime = {}, None
+            return
+        if mtime != self._mtime:
+            with open(self.path) as file:
+                self._entries = json.load(file)
+            self._mtime = mtime
+
+    def version(self):
+        # Changes whenever derivatives are added, so pages embedding their
+        # URLs can be re-rendered
+        with self._lock:
+            self._refresh()
+            return self._mtime
+
+    def get(self, filename):
+        with self._lock:
+            self._refresh()
+            return self._entries.get(filename)
+
+    def set(self, filename, entry):
+        with self._lock:
+            self._refresh()
+            self._entries[filename] = entry
+            # Write then rename so readers never see a half-written file
+            temp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(temp_path, "w") as file:
+                json.dump(self._entries, file, indent=1, sort_keys=True)
+            os.replace(temp_path, self.path)
+            self._mtime = os.stat(self.path).st_mtime_ns
+
+
+def content_hash(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def target_widths(width, widths=WIDTHS):
+    # Never upscale; an image between two targets also keeps its own width
+    largest = min(width, widths[-1])
+    return [target for target in widths if target < largest] + [largest]
+
+
+def flatten(image):
+    # JPEG has no alpha channel, so composite transparent images onto white
+    if image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def process_image(filename, force=False):
+    # Write the resized WebP and JPEG copies of static/images/<filename>;
+    # names carry the content hash, so a re-upload gets fresh URLs. None
+    # when Pillow is missing or the file is absent or not an image.
+    if Image is None or not filename:
+        return None
+    source = os.path.join(IMAGES_DIR, filename)
+    if not os.path.isfile(source):
+        return None
+    digest = content_hash(source)
+    previous = manifest.get(filename)
+    if previous and previous["hash"] == digest and not force:
+        return previous
+
+    try:
+        with Image.open(source) as original:
+            image = ImageOps.exif_transpose(original)
+            image.load()
+    except (OSError, Image.DecompressionBombError):  # Unreadable image
+        return None
+    os.makedirs(DERIVED_DIR, exist_ok=True)
+    stem = os.path.splitext(filename)[0]
+    entry = {"hash": digest, "width": image.width, "height": image.height}
+    widths = SCREEN_WIDTHS.get(filename, WIDTHS)
+    for fmt, (extension, options) in FORMATS.items():
+        converted = flatten(image) if fmt == "jpeg" else image
+        entry[fmt] = {}
+        for width in target_widths(image.width, widths):
+            name = f"{stem}-{digest}-{width}.{extension}"
+            height = max(round(image.height * width / image.width), 1)
+            resized = converted if width == image.width else \
+                converted.resize((width, height), Image.LANCZOS)
+            resized.save(os.path.join(DERIVED_DIR, name), fmt.upper(),
+                         **options)
+            entry[fmt][str(width)] = name
+    manifest.set(filename, entry)
+    if previous and previous["hash"] != digest:
+        remove_variants(previous)
+    return entry
+
+
+def remove_variants(entry):
+    for fmt in FORMATS:
+        for name in entry.get(fmt, {}).values():
+            try:
+                os.remove(os.path.join(DERIVED_DIR, name))
+            except FileNotFoundError:
+                pass
+
+
+def variants(filename, fmt):
+    # [(static path, width)] smallest first, empty until the image is processed
+    entry = manifest.get(filename) if filename else None
+    if not entry:
+        return []
+    return sorted((("images/derived/" + name, int(width))
+                   for width, name in entry[fmt].items()),
+                  key=lambda item: item[1])
+
+
+def variant(filename, fmt, width):
+    # Smallest derivative at least width wide, falling back to the largest
+    sizes = variants(filename, fmt)
+    if not sizes:
+        return None
+    return next((path for path, size in sizes if size >= width),
+                sizes[-1][0])
+
+
+def source_images():
+    return sorted(name for name in os.listdir(IMAGES_DIR)
+                  if name.lower().endswith(SOURCE_EXTENSIONS)
+                  and os.path.isfile(os.path.join(IMAGES_DIR, name)))
+
+
+# Process-wide view of the derivative manifest
+manifest = Manifest()
+
+images_cli = AppGroup("images", help="Manage resized cover images.")
+
+
+@images_cli.command("backfill")
+@click.option("--force", is_flag=True, help="Regenerate unchanged images.")
+def backfill_command(force):
+    """Generate thumbnails for every image in static/images."""
+    if Image is None:
+        raise click.ClickException("Pillow is not installed")
+    skipped = 0
+    for filename in source_images():
+        entry = process_image(filename, force=force)
+        if entry is None:
+            skipped += 1
+            click.echo(f"{filename}: skipped, not a readable image")
+            continue
+        sizes = ", ".join(sorted(entry["webp"], key=int))
+        click.echo(f"{filename}: {sizes}")
+    if skipped:
+        click.echo(f"Skipped {skipped} unreadable images")
@@ -0,0 +1,390 @@
+import atexit
+import functools
+import glob
+import hmac
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+
+from flask import (Response, abort, before_render_template, current_app, g,
+                   has_request_context, request, template_rendered)
+from sqlalchemy import event
+
+from app.extensions import db
+import app.auth as auth
+
+# Histogram bucket upper bounds; +Inf is added when exported
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1, 2.5, 5, 10)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+# Least seconds between writes of this process's numbers to METRICS_DIR
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+# Statements run outside execute_query are labelled "<verb> <table>"
+STATEMENT_TABLE = re.compile(r'^\s*(\w+)\b.*?\b(?:FROM|INTO|UPDATE)\s+"?(\w+)',
+                             re.IGNORECASE | re.DOTALL)
+
+# "Model.OPERATION" of the execute_query call running now, if any
+_query_label = ContextVar("query_label", default=None)
+
+
+class Histogram:
+    # Cumulative bucket counts, sum and count per label set, rendered in the
+    # Prometheus text format
+    def __init__(self, name, help, labels, buckets):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+
+    def observe(self, value, *label_values):
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series.setdefault(
+                label_values, [0] * (len(self.buckets) + 2))
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[index] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def merge(self, label_values, values):
+        series = self._series.setdefault(
+            label_values, [0] * (len(self.buckets) + 2))
+        for index, value in enumerate(values):
+            series[index] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}",
+                 f"# TYPE {self.name} histogram"]
+        for label_values, series in sorted(self._series.items()):
+            labels = format_labels(self.labels, label_values)
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{labels}le="{bound}"}} '
+                             f'{count}')
+            lines.append(f'{self.name}_bucket{{{labels}le="+Inf"}} '
+                         f'{series[-1]}')
+            lines.append(f"{self.name}_sum{{{labels.rstrip(',')}}} "
+                         f"{round(series[-2], 6)}")
+            lines.append(f"{self.name}_count{{{labels.rstrip(',')}}} "
+                         f"{series[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help, labels):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._series = {}
+
+    def inc(self, *label_values):
+        self._series[label_values] = self._series.get(label_values, 0) + 1
+
+    def merge(self, label_values, value):
+        self._series[label_values] = self._series.get(label_values, 0) + value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}",
+                 f"# TYPE {self.name} counter"]
+        for label_values, value in sorted(self._series.items()):
+            labels = format_labels(self.labels, label_values).rstrip(",")
+            lines.append(f"{self.name}{{{labels}}} {value}")
+        return lines
+
+
+def format_labels(names, values):
+    # 'endpoint="games.game",' with quotes and backslashes escaped
+    labels = ""
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"')
+        labels += f'{name}="{value}",'
+    return labels
+
+
+class RequestMetrics:
+    # Per-route latency, SQL and template timings and response sizes. Each
+    # process counts its own; with a directory set, every process writes
+    # its numbers there and /metrics reports the sum of all of them, so a
+    # scrape answered by any server worker sees the whole server
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.directory = None
+        self.flush_interval = DEFAULT_FLUSH_INTERVAL
+        self._flushed = 0.0
+        self._path = None
+        self._pid = None
+        self.requests = Counter(
+            "games_requests_total", "Requests served",
+            ("endpoint", "method", "status"))
+        self.latency = Histogram(
+            "games_request_duration_seconds", "Time to build a response",
+            ("endpoint", "method"), SECONDS_BUCKETS)
+        self.statements = Histogram(
+            "games_request_sql_statements", "SQL statements per request",
+            ("endpoint",), STATEMENT_BUCKETS)
+        self.sql_time = Histogram(
+            "games_request_sql_duration_seconds",
+            "Time spent in SQL per request", ("endpoint",), SECONDS_BUCKETS)
+        self.queries = Histogram(
+            "games_sql_duration_seconds",
+            "Time per SQL statement, by route and query",
+            ("endpoint", "query"), SECONDS_BUCKETS)
+        self.templates = Histogram(
+            "games_template_render_seconds", "Time to render each template",
+            ("template",), SECONDS_BUCKETS)
+        self.sizes = Histogram(
+            "games_response_bytes", "Response body size as sent",
+            ("endpoint",), BYTES_BUCKETS)
+
+    def metrics(self):
+        return (self.requests, self.latency, self.statements, self.sql_time,
+                self.queries, self.templates, self.sizes)
+
+    def snapshot(self):
+        # {metric name: [[label values, value or series], ...]} as JSON
+        with self._lock:
+            return {metric.name: [[list(label_values), value] for
+                                  label_values, value in
+                                  metric._series.items()]
+                    for metric in self.metrics()}
+
+    def flush(self, force=False):
+        # Write this process's numbers to its own file in the directory,
+        # at most every flush_interval seconds unless forced. Files stay
+        # after their process exits so the totals never go backwards.
+        if self.directory is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._flushed < self.flush_interval:
+            return
+        self._flushed = now
+        if self._pid != os.getpid():
+            # A reused pid must not overwrite an earlier process's file
+            self._pid = os.getpid()
+            self._path = os.path.join(
+                self.directory, f"{self._pid}-{uuid.uuid4().hex[:8]}.json")
+        os.makedirs(self.directory, exist_ok=True)
+        handle, temporary = tempfile.mkstemp(dir=self.directory,
+                                             suffix=".tmp")
+        with os.fdopen(handle, "w") as file:
+            json.dump(self.snapshot(), file)
+        os.replace(temporary, self._path)
+
+    def render(self):
+        if self.directory is None:
+            with self._lock:
+                lines = [line for metric in self.metrics()
+                         for line in metric.render()]
+            return "\n".join(lines) + "\n"
+        self.flush(force=True)
+        merged = RequestMetrics()
+        by_name = {metric.name: metric for metric in merged.metrics()}
+        for path in sorted(glob.glob(os.path.join(self.directory,
+                                                  "*.json"))):
+            try:
+                with open(path) as file:
+                    snapshot = json.load(file)
+            except (OSError, ValueError):
+                continue  # Removed or cut short meanwhile
+            for name, series in snapshot.items():
+                if name in by_name:
+                    for label_values, value in series:
+                        by_name[name].merge(tuple(label_values), value)
+        return merged.render()
+
+    def observe_request(self, timing, endpoint, method, status, size):
+        elapsed = time.perf_counter() - timing.started
+        with self._lock:
+            self.requests.inc(endpoint, method, status)
+            self.latency.observe(elapsed, endpoint, method)
+            self.statements.observe(timing.statement_count, endpoint)
+            self.sql_time.observe(timing.sql_seconds, endpoint)
+            for query, seconds in timing.statement_seconds:
+                self.queries.observe(seconds, endpoint, query)
+            for template, seconds in timing.template_seconds:
+                self.templates.observe(seconds, template)
+            self.sizes.observe(size, endpoint)
+        self.flush()
+        return elapsed
+
+
+class RequestTiming:
+    # What one request spent its time on, kept on flask.g
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.statement_seconds = []  # (query label, seconds) in run order
+        self.template_seconds = []  # (template name, seconds)
+        self.render_seconds = 0.0  # templates rendered from views, not nested
+        self._rendering = []  # start times of templates being rendered
+
+    @property
+    def statement_count(self):
+        return len(self.statement_seconds)
+
+    @property
+    def sql_seconds(self):
+        return sum(seconds for _, seconds in self.statement_seconds)
+
+
+def current_timing():
+    if not has_request_context():
+        return None
+    return g.get("request_timing")
+
+
+def query_label(statement):
+    # The execute_query call running the statement, else its verb and table
+    # ("render: SELECT Platforms" for lazy loads while a template renders)
+    label = _query_label.get()
+    if not label:
+        match = STATEMENT_TABLE.match(statement)
+        label = f"{match[1].upper()} {match[2]}" if match else "other"
+    timing = current_timing()
+    if timing is not None and timing._rendering:
+        label = "render: " + label
+    return label
+
+
+def labelled(function):
+    # Decorates execute_query so the SQL it sends is reported as, e.g.,
+    # "Games.SELECT" in /metrics and the Server-Timing header
+    @functools.wraps(function)
+    def wrapper(model, operation="SELECT", *args, **kwargs):
+        token = _query_label.set(f"{model.__name__}.{operation}")
+        try:
+            return function(model, operation, *args, **kwargs)
+        finally:
+            _query_label.reset(token)
+    return wrapper
+
+
+def install(engine):
+    # Time every statement the engine runs during a request
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_statement(conn, cursor, statement, parameters, context,
+                        executemany):
+        if current_timing() is not None:
+            conn.info.setdefault("statement_started", []).append(
+                time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def end_statement(conn, cursor, statement, parameters, context,
+                      executemany):
+        timing = current_timing()
+        started = conn.info.get("statement_started")
+        if timing is None or not started:
+            return
+        timing.statement_seconds.append(
+            (query_label(statement), time.perf_counter() - started.pop()))
+
+    @event.listens_for(engine, "handle_error")
+    def abandon_statement(context):
+        # A failed statement never reaches after_cursor_execute; drop its
+        # start time so the next statement on the connection isn't timed
+        # from it
+        if context.connection is None:
+            return
+        started = context.connection.info.get("statement_started")
+        if started:
+            started.pop()
+
+
+def start_template(sender, template, context, **extra):
+    timing = current_timing()
+    if timing is not None:
+        timing._rendering.append(time.perf_counter())
+
+
+def end_template(sender, template, context, **extra):
+    timing = current_timing()
+    if timing is None or not timing._rendering:
+        return
+    seconds = time.perf_counter() - timing._rendering.pop()
+    timing.template_seconds.append((template.name or "string", seconds))
+    if not timing._rendering:
+        timing.render_seconds += seconds
+
+
+def server_timing(timing, elapsed):
+    # Server-Timing header value: totals, then each query label's time
+    per_query = {}
+    for label, seconds in timing.statement_seconds:
+        count, total = per_query.get(label, (0, 0.0))
+        per_query[label] = (count + 1, total + seconds)
+    entries = [
+        f"app;dur={elapsed * 1000:.2f}",
+        f'sql;dur={timing.sql_seconds * 1000:.2f};'
+        f'desc="{timing.statement_count} statements"',
+        f"render;dur={timing.render_seconds * 1000:.2f}",
+    ]
+    for index, (label, (count, total)) in enumerate(
+            sorted(per_query.items(), key=lambda item: -item[1][1])):
+        entries.append(f'q{index};dur={total * 1000:.2f};'
+                       f'desc="{label} x{count}"')
+    return ", ".join(entries)
+
+
+def metrics_view():
+    # Prometheus scrape target, for scrapers sending "Authorization: Bearer
+    # <METRICS_TOKEN>" and for admins; METRICS_PUBLIC opens it to everyone
+    if not current_app.config.get("METRICS_PUBLIC", False) \
+            and not auth.is_admin():
+        token = current_app.config.get("METRICS_TOKEN")
+        given = request.headers.get("Authorization", "")
+        if not token or not hmac.compare_digest(given, f"Bearer {token}"):
+            abort(401)
+    return Response(collector.render(),
+                    mimetype="text/plain; version=0.0.4")
+
+
+def init_app(app):
+    # METRICS_SERVER_TIMING adds a Server-Timing header to every response;
+    # METRICS_DIR shares the numbers between server worker processes
+    server_timing_enabled = app.config.get("METRICS_SERVER_TIMING", False)
+    collector.directory = app.config.get("METRICS_DIR")
+    collector.flush_interval = app.config.get("METRICS_FLUSH_INTERVAL",
+                                              DEFAULT_FLUSH_INTERVAL)
+
+    @app.before_request
+    def start_request():
+        g.request_timing = RequestTiming()
+
+    @app.after_request
+    def record_request(response):
+        timing = g.pop("request_timing", None)
+        if timing is None or request.endpoint == "metrics":
+            return response
+        endpoint = request.endpoint or "unmatched"
+        size = response.content_length
+        if size is None and not response.direct_passthrough \
+                and not response.is_streamed:
+            size = len(response.get_data())
+        elapsed = collector.observe_request(
+            timing, endpoint, request.method, response.status_code,
+            size or 0)
+        if server_timing_enabled:
+            response.headers["Server-Timing"] = server_timing(timing, elapsed)
+        return response
+
+    before_render_template.connect(start_template, app)
+    template_rendered.connect(end_template, app)
+    with app.app_context():
+        for engine in db.engines.values():
+            install(engine)
+    app.add_url_rule("/metrics", "metrics", metrics_view)
+
+
+# Process-wide collector, reported at /metrics
+collector = RequestMetrics()
+
+# Keep the last requests of a worker that exits cleanly
+atexit.register(lambda: collector.flush(force=True))
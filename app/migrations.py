@@ -0,0 +1,334 @@
+import re
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import inspect
+
+from app.extensions import db
+import app.models as models
+import app.database as database
+import app.hardware as hardware
+
+# Ordered (version, description, step) entries; PRAGMA user_version stores
+# the last version applied to the database file
+MIGRATIONS = []
+
+
+def migration(version, description):
+    def register(step):
+        MIGRATIONS.append((version, description, step))
+        return step
+    return register
+
+
+def run_script(conn, script):
+    for statement in script.split(";"):
+        if statement.strip():
+            conn.exec_driver_sql(statement)
+
+
+@migration(1, "Give GamePlatformDetails its (GameID, PlatformID) primary key")
+def add_platform_details_primary_key(conn):
+    # SQLite cannot add a primary key in place, so rebuild the table; the
+    # newest row wins when a game has duplicate rows for one platform
+    run_script(conn, """
+        CREATE TABLE GamePlatformDetails_new (
+            GameID INTEGER NOT NULL
+                REFERENCES Games (GameID) ON DELETE CASCADE,
+            PlatformID INTEGER NOT NULL
+                REFERENCES Platforms (PlatformID) ON DELETE CASCADE,
+            Price REAL,
+            ReleaseDate TEXT,
+            PRIMARY KEY (GameID, PlatformID)
+        );
+        INSERT OR REPLACE INTO GamePlatformDetails_new
+            SELECT GameID, PlatformID, Price, ReleaseDate
+              FROM GamePlatformDetails
+             WHERE GameID IS NOT NULL AND PlatformID IS NOT NULL
+             ORDER BY rowid;
+        DROP TABLE GamePlatformDetails;
+        ALTER TABLE GamePlatformDetails_new RENAME TO GamePlatformDetails
+    """)
+
+
+@migration(2, "Unique index on Reviews (UserID, GameID)")
+def add_reviews_index(conn):
+    # A user has one rating per game, keep the latest if duplicates exist
+    run_script(conn, """
+        DELETE FROM Reviews
+         WHERE ReviewID NOT IN (SELECT max(ReviewID) FROM Reviews
+                                 GROUP BY UserID, GameID);
+        CREATE UNIQUE INDEX ix_Reviews_UserID_GameID
+            ON Reviews (UserID, GameID)
+    """)
+
+
+@migration(3, "Unique index on SystemRequirements (GameID, PlatformID, Type)")
+def add_requirements_index(conn):
+    run_script(conn, """
+        DELETE FROM SystemRequirements
+         WHERE RequirementsID NOT IN (
+               SELECT max(RequirementsID) FROM SystemRequirements
+                GROUP BY GameID, PlatformID, Type);
+        CREATE UNIQUE INDEX ix_SystemRequirements_GameID_PlatformID_Type
+            ON SystemRequirements (GameID, PlatformID, Type)
+    """)
+
+
+@migration(4, "Reverse lookup indexes for category and platform pages")
+def add_link_table_indexes(conn):
+    run_script(conn, """
+        CREATE INDEX ix_GameCategories_CategoryID_GameID
+            ON GameCategories (CategoryID, GameID);
+        CREATE INDEX ix_GamePlatforms_PlatformID_GameID
+            ON GamePlatforms (PlatformID, GameID)
+    """)
+
+
+@migration(5, "Precomputed rating aggregates per game")
+def add_rating_stats(conn):
+    run_script(conn, """
+        CREATE TABLE GameRatingStats (
+            GameID INTEGER NOT NULL PRIMARY KEY
+                REFERENCES Games (GameID) ON DELETE CASCADE,
+            RatingSum INTEGER NOT NULL DEFAULT 0,
+            RatingCount INTEGER NOT NULL DEFAULT 0,
+            Rating1 INTEGER NOT NULL DEFAULT 0,
+            Rating2 INTEGER NOT NULL DEFAULT 0,
+            Rating3 INTEGER NOT NULL DEFAULT 0,
+            Rating4 INTEGER NOT NULL DEFAULT 0,
+            Rating5 INTEGER NOT NULL DEFAULT 0,
+            RatingAverage FLOAT NOT NULL DEFAULT 0
+        );
+        CREATE INDEX ix_GameRatingStats_RatingAverage_GameID
+            ON GameRatingStats (RatingAverage, GameID);
+        INSERT INTO GameRatingStats
+            SELECT Games.GameID,
+                   coalesce(sum(Reviews.Rating), 0),
+                   count(Reviews.Rating),
+                   coalesce(sum(Reviews.Rating = 1), 0),
+                   coalesce(sum(Reviews.Rating = 2), 0),
+                   coalesce(sum(Reviews.Rating = 3), 0),
+                   coalesce(sum(Reviews.Rating = 4), 0),
+                   coalesce(sum(Reviews.Rating = 5), 0),
+                   coalesce(avg(Reviews.Rating), 0)
+              FROM Games
+              LEFT JOIN Reviews ON Reviews.GameID = Games.GameID
+             GROUP BY Games.GameID
+    """)
+
+
+@migration(6, "UpdatedAt version columns for HTTP validators")
+def add_updated_at(conn):
+    now = models.utcnow().isoformat(" ")
+    for table in ["Games", "Platforms", "Categories", "GamePlatformDetails",
+                  "GameRatingStats"]:
+        conn.exec_driver_sql(
+            f"ALTER TABLE {table} ADD COLUMN UpdatedAt DATETIME")
+        conn.exec_driver_sql(f"UPDATE {table} SET UpdatedAt = ?", (now,))
+
+
+@migration(7, "Parsed hardware columns on SystemRequirements")
+def add_hardware_columns(conn):
+    run_script(conn, """
+        CREATE TABLE HardwareScores (
+            HardwareID INTEGER NOT NULL PRIMARY KEY,
+            Kind VARCHAR(3) NOT NULL,
+            Model VARCHAR(100) NOT NULL,
+            Score INTEGER NOT NULL,
+            UNIQUE (Kind, Model)
+        );
+        ALTER TABLE SystemRequirements
+            ADD COLUMN RAMMB INTEGER;
+        ALTER TABLE SystemRequirements
+            ADD COLUMN StorageMB INTEGER;
+        ALTER TABLE SystemRequirements
+            ADD COLUMN CPUScore INTEGER;
+        ALTER TABLE SystemRequirements
+            ADD COLUMN GPUScore INTEGER;
+        CREATE INDEX ix_SystemRequirements_Match
+            ON SystemRequirements (PlatformID, Type, GPUScore, CPUScore,
+                                   RAMMB, StorageMB, GameID)
+    """)
+    hardware.seed(conn)
+    hardware.rescore(conn)
+
+
+@migration(8, "Index on Games.UpdatedAt for cache version checks")
+def add_games_updated_index(conn):
+    conn.exec_driver_sql(
+        "CREATE INDEX ix_Games_UpdatedAt ON Games (UpdatedAt)")
+
+
+@migration(9, "NULL rather than 0 for unparseable hardware requirements")
+def allow_unknown_hardware(conn):
+    # 0 read as "no requirement", so rows naming hardware without a score
+    # matched every PC. Databases that ran version 7 before it added these
+    # columns as nullable have NOT NULL, which SQLite cannot drop in place,
+    # so rebuild the table from its own definition minus those constraints
+    table_sql = conn.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'table'"
+        " AND name = 'SystemRequirements'").scalar()
+    index_sql = conn.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'index'"
+        " AND tbl_name = 'SystemRequirements' AND sql IS NOT NULL").scalars()
+    index_sql = index_sql.all()
+    table_sql = re.sub(
+        r'("?)(RAMMB|StorageMB|CPUScore|GPUScore)\1 INTEGER NOT NULL'
+        r'(?: DEFAULT \'?0\'?)?', r"\1\2\1 INTEGER", table_sql)
+    table_sql = re.sub(r'^CREATE TABLE "?SystemRequirements"?',
+                       "CREATE TABLE SystemRequirements_new", table_sql)
+    conn.exec_driver_sql(table_sql)
+    conn.exec_driver_sql(
+        "INSERT INTO SystemRequirements_new SELECT * FROM SystemRequirements")
+    conn.exec_driver_sql("DROP TABLE SystemRequirements")
+    conn.exec_driver_sql(
+        "ALTER TABLE SystemRequirements_new RENAME TO SystemRequirements")
+    for sql in index_sql:
+        conn.exec_driver_sql(sql)
+    hardware.rescore(conn)
+
+
+@migration(10, "Index on lower(GameName) for duplicate name checks")
+def add_games_name_index(conn):
+    conn.exec_driver_sql(
+        "CREATE INDEX ix_Games_GameName_lower ON Games (lower(GameName))")
+
+
+def latest_version():
+    return max(version for version, _, _ in MIGRATIONS)
+
+
+def current_version(conn):
+    return conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def upgrade(engine=None):
+    # Bring the database up to date, one transaction per migration
+    engine = engine or db.engine
+    database.require_sqlite(engine)
+    applied = []
+    with engine.connect() as conn:
+        # A brand new database gets the current schema straight from models
+        if not inspect(conn).has_table("Games"):
+            db.metadata.create_all(conn)
+            hardware.seed(conn)
+            conn.exec_driver_sql(f"PRAGMA user_version = {latest_version()}")
+            conn.commit()
+            return applied
+        version = current_version(conn)
+        conn.rollback()
+
+        # Table rebuilds drop and rename tables other rows point at, so
+        # foreign keys are off while migrating and checked before each commit
+        # (the pragma cannot change inside a transaction)
+        foreign_keys = conn.exec_driver_sql("PRAGMA foreign_keys").scalar()
+        conn.exec_driver_sql("PRAGMA foreign_keys = OFF")
+        try:
+            for target, description, step in sorted(MIGRATIONS):
+                if target <= version:
+                    continue
+                # Explicit BEGIN so SQLite runs the DDL inside the transaction
+                conn.exec_driver_sql("BEGIN")
+                try:
+                    step(conn)
+                    violations = conn.exec_driver_sql(
+                        "PRAGMA foreign_key_check").fetchall()
+                    if violations:
+                        raise RuntimeError(f"Migration {target} leaves broken"
+                                           f" foreign keys: {violations[:5]}")
+                    conn.exec_driver_sql(f"PRAGMA user_version = {target}")
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                applied.append((target, description))
+        finally:
+            conn.exec_driver_sql(f"PRAGMA foreign_keys = {foreign_keys}")
+            conn.commit()
+    return applied
+
+
+# Hot lookups paired with the index each one is expected to use
+INDEXED_QUERIES = [
+    ("SELECT * FROM Reviews WHERE UserID = 1 AND GameID = 1",
+     "ix_Reviews_UserID_GameID"),
+    ("SELECT * FROM SystemRequirements"
+     " WHERE GameID = 1 AND PlatformID = 1 AND Type = 'Minimum'",
+     "ix_SystemRequirements_GameID_PlatformID_Type"),
+    ("SELECT * FROM GamePlatformDetails WHERE GameID = 1 AND PlatformID = 1",
+     "sqlite_autoindex_GamePlatformDetails_1"),
+    ("SELECT GameID FROM GameCategories WHERE CategoryID = 1",
+     "ix_GameCategories_CategoryID_GameID"),
+    ("SELECT GameID FROM GamePlatforms WHERE PlatformID = 1",
+     "ix_GamePlatforms_PlatformID_GameID"),
+    ("SELECT GameID FROM SystemRequirements WHERE PlatformID = 1"
+     " AND Type IN ('Minimum', 'Recommended')"
+     " AND (GPUScore IS NULL OR GPUScore <= 5000)"
+     " AND (CPUScore IS NULL OR CPUScore <= 5000)"
+     " AND (RAMMB IS NULL OR RAMMB <= 8192)"
+     " AND (StorageMB IS NULL OR StorageMB <= 65536)",
+     "ix_SystemRequirements_Match"),
+    ("SELECT max(UpdatedAt) FROM Games", "ix_Games_UpdatedAt"),
+    ("SELECT lower(GameName) FROM Games"
+     " WHERE lower(GameName) IN ('portal', 'tetris')",
+     "ix_Games_GameName_lower"),
+]
+
+
+def query_plan(conn, sql):
+    rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql).fetchall()
+    return [row[-1] for row in rows]
+
+
+def verify_indexes(engine=None):
+    # Returns (sql, expected index, plan) for every lookup that would scan
+    engine = engine or db.engine
+    problems = []
+    with engine.connect() as conn:
+        for sql, index_name in INDEXED_QUERIES:
+            plan = query_plan(conn, sql)
+            if not any(index_name in step for step in plan):
+                problems.append((sql, index_name, plan))
+    return problems
+
+
+db_cli = AppGroup("db", help="Manage the games.db schema.")
+
+
+@db_cli.command("upgrade")
+def upgrade_command():
+    """Apply any pending schema migrations."""
+    applied = upgrade()
+    for version, description in applied:
+        click.echo(f"Applied {version}: {description}")
+    if not applied:
+        click.echo("Database is up to date")
+
+
+@db_cli.command("version")
+def version_command():
+    """Show the schema version of the database."""
+    with db.engine.connect() as conn:
+        click.echo(f"{current_version(conn)} (latest {latest_version()})")
+
+
+@db_cli.command("verify")
+def verify_command():
+    """Check hot lookups use their indexes with EXPLAIN QUERY PLAN."""
+    problems = verify_indexes()
+    for sql, index_name, plan in problems:
+        click.echo(f"Not using {index_name}: {sql}\n  " + "\n  ".join(plan))
+    if problems:
+        raise SystemExit(1)
+    click.echo("All indexed lookups use their indexes")
+
+
+@db_cli.command("sync-replica")
+def sync_replica_command():
+    """Copy the primary database into the read replica."""
+    replica = db.engines.get(database.REPLICA)
+    if replica is None:
+        raise click.ClickException("DATABASE_REPLICA_URI is not set")
+    database.sync_replica(db.engine, replica)
+    click.echo(f"Copied {db.engine.url.database} to {replica.url.database}")
@@ -1,4 +1,11 @@
-from app.routes import db
+from datetime import datetime, timezone
+
+from app.extensions import db
+
+
+# Naive UTC timestamps for the UpdatedAt version columns
+def utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
 
 # Many-to-many Relationship Table
 # PizzaTopping = db.Table("PizzaTopping",
@@ -9,35 +16,53 @@ from app.routes import db
 
 class GameCategories(db.Model):
     __tablename__ = "GameCategories"
+    __table_args__ = (
+        db.Index("ix_GameCategories_CategoryID_GameID", "CategoryID", "GameID"),
+    )
     GameID = db.Column("GameID", db.Integer, db.ForeignKey("Games.GameID", ondelete="CASCADE"), primary_key=True)
     CategoryID = db.Column("CategoryID", db.Integer, db.ForeignKey("Categories.CategoryID", ondelete="CASCADE"), primary_key=True)
 
 
 class GamePlatforms(db.Model):
     __tablename__ = "GamePlatforms"
+    __table_args__ = (
+        db.Index("ix_GamePlatforms_PlatformID_GameID", "PlatformID", "GameID"),
+    )
     GameID = db.Column("GameID", db.Integer, db.ForeignKey("Games.GameID", ondelete="CASCADE"), primary_key=True)
     PlatformID = db.Column("PlatformID", db.Integer, db.ForeignKey("Platforms.PlatformID", ondelete="CASCADE"), primary_key=True)
 
 
 class Games(db.Model):
     __tablename__ = "Games"
+    __table_args__ = (
+        # Newest edit, read by the in-memory indexes to notice other processes' writes
+        db.Index("ix_Games_UpdatedAt", "UpdatedAt"),
+    )
 
     GameID = db.Column(db.Integer, primary_key=True, autoincrement=True)
     GameName = db.Column(db.String(255), nullable=False)
     GameDescription = db.Column(db.String(255))
     GameDeveloper = db.Column(db.String(255))
     GameImage = db.Column(db.String(255))
+    UpdatedAt = db.Column(db.DateTime, default=utcnow, onupdate=utcnow)  # Version for HTTP validators
 
     categories = db.relationship("Categories", secondary="GameCategories", back_populates="games")
     platforms = db.relationship("Platforms", secondary="GamePlatforms", back_populates="games")
     system_requirements = db.relationship("SystemRequirements", back_populates="games", cascade="all, delete-orphan")
     game_platform_details = db.relationship("GamePlatformDetails", back_populates="games", cascade="all, delete-orphan")
     reviews = db.relationship("Reviews", back_populates="games", cascade="all, delete-orphan")
+    # Always joined so listings can show averages without an extra query per game
+    rating_stats = db.relationship("GameRatingStats", back_populates="games", uselist=False, lazy="joined",
+                                   cascade="all, delete-orphan")
 
     def __repr__(self):
         return f"<Game {self.GameName}>"
 
 
+# Case-insensitive name lookups, e.g. the duplicate check of `flask games import`
+db.Index("ix_Games_GameName_lower", db.func.lower(Games.GameName))
+
+
 class Categories(db.Model):
     __tablename__ = "Categories"
 
@@ -45,6 +70,7 @@ class Categories(db.Model):
     CategoryName = db.Column(db.String(100), nullable=False)
     CategoryDescription = db.Column(db.Text)
     CategoryImage = db.Column(db.String(255))
+    UpdatedAt = db.Column(db.DateTime, default=utcnow, onupdate=utcnow)  # Bumped when its game list changes
 
     games = db.relationship("Games", secondary="GameCategories", back_populates="categories")
 
@@ -59,6 +85,7 @@ class Platforms(db.Model):
     PlatformName = db.Column(db.String(100), nullable=False)
     PlatformDescription = db.Column(db.String(255))
     PlatformImage = db.Column(db.String(255))
+    UpdatedAt = db.Column(db.DateTime, default=utcnow, onupdate=utcnow)  # Bumped when its game list changes
 
     games = db.relationship("Games", secondary="GamePlatforms", back_populates="platforms")
     game_platform_details = db.relationship("GamePlatformDetails", back_populates="platforms", cascade="all, delete-orphan")
@@ -70,6 +97,11 @@ class Platforms(db.Model):
 
 class SystemRequirements(db.Model):
     __tablename__ = "SystemRequirements"
+    __table_args__ = (
+        db.Index("ix_SystemRequirements_GameID_PlatformID_Type", "GameID", "PlatformID", "Type", unique=True),
+        # Covers "which games can this PC run" range queries without touching the table
+        db.Index("ix_SystemRequirements_Match", "PlatformID", "Type", "GPUScore", "CPUScore", "RAMMB", "StorageMB", "GameID"),
+    )
 
     RequirementsID = db.Column(db.Integer, primary_key=True, autoincrement=True)
     GameID = db.Column(db.Integer, db.ForeignKey("Games.GameID", ondelete="CASCADE"), nullable=False)
@@ -80,6 +112,12 @@ class SystemRequirements(db.Model):
     CPU = db.Column(db.String(100))
     GPU = db.Column(db.String(100))
     Storage = db.Column(db.String(50))
+    # Parsed from the text columns above by app.hardware when rows are written; NULL when the text is
+    # missing or names hardware without a known score
+    RAMMB = db.Column(db.Integer)
+    StorageMB = db.Column(db.Integer)
+    CPUScore = db.Column(db.Integer)
+    GPUScore = db.Column(db.Integer)
 
     games = db.relationship("Games", back_populates="system_requirements")
     platforms = db.relationship("Platforms", back_populates="system_requirements")
@@ -98,6 +136,7 @@ class GamePlatformDetails(db.Model):
     PlatformID = db.Column(db.Integer, db.ForeignKey("Platforms.PlatformID", ondelete="CASCADE"), nullable=False, primary_key=True)
     Price = db.Column(db.Float)
     ReleaseDate = db.Column(db.String(10))
+    UpdatedAt = db.Column(db.DateTime, default=utcnow, onupdate=utcnow)
 
     games = db.relationship("Games", back_populates="game_platform_details")
     platforms = db.relationship("Platforms", back_populates="game_platform_details")
@@ -110,6 +149,7 @@ class Reviews(db.Model):
     __tablename__ = "Reviews"
     __table_args__ = (
         db.CheckConstraint("Rating BETWEEN 1 AND 5", name="check_rating_between_1_and_5"),
+        db.Index("ix_Reviews_UserID_GameID", "UserID", "GameID", unique=True),
     )
 
     ReviewID = db.Column(db.Integer, primary_key=True, autoincrement=True)
@@ -124,6 +164,50 @@ class Reviews(db.Model):
         return f"<Reviews {self.GameID} {self.ReviewID} for {self.GameID}"
 
 
+class GameRatingStats(db.Model):
+    __tablename__ = "GameRatingStats"
+    __table_args__ = (
+        db.Index("ix_GameRatingStats_RatingAverage_GameID", "RatingAverage", "GameID"),
+    )
+
+    # One row per game, kept in step with Reviews by app.ratings
+    GameID = db.Column(db.Integer, db.ForeignKey("Games.GameID", ondelete="CASCADE"), primary_key=True)
+    RatingSum = db.Column(db.Integer, nullable=False, default=0)
+    RatingCount = db.Column(db.Integer, nullable=False, default=0)
+    Rating1 = db.Column(db.Integer, nullable=False, default=0)
+    Rating2 = db.Column(db.Integer, nullable=False, default=0)
+    Rating3 = db.Column(db.Integer, nullable=False, default=0)
+    Rating4 = db.Column(db.Integer, nullable=False, default=0)
+    Rating5 = db.Column(db.Integer, nullable=False, default=0)
+    RatingAverage = db.Column(db.Float, nullable=False, default=0)  # 0 when unrated
+    UpdatedAt = db.Column(db.DateTime, default=utcnow, onupdate=utcnow)
+
+    games = db.relationship("Games", back_populates="rating_stats")
+
+    @property
+    def histogram(self):
+        # Vote counts from 5 stars down to 1
+        return [(star, getattr(self, f"Rating{star}")) for star in range(5, 0, -1)]
+
+    def __repr__(self):
+        return f"<GameRatingStats {self.GameID} {self.RatingAverage:.2f} from {self.RatingCount}>"
+
+
+class HardwareScores(db.Model):
+    __tablename__ = "HardwareScores"
+    __table_args__ = (
+        db.UniqueConstraint("Kind", "Model"),
+    )
+
+    HardwareID = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    Kind = db.Column(db.String(3), nullable=False)  # "CPU" or "GPU"
+    Model = db.Column(db.String(100), nullable=False)
+    Score = db.Column(db.Integer, nullable=False)  # Benchmark score, higher is faster
+
+    def __repr__(self):
+        return f"<HardwareScore {self.Kind} {self.Model}: {self.Score}>"
+
+
 class Accounts(db.Model):
     __tablename__ = "Accounts"
     __table_args__ = (
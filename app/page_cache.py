@@ -0,0 +1,120 @@
+import threading
+from collections import OrderedDict
+
+from flask import render_template, session
+from markupsafe import escape
+
+import app.assets as assets
+import app.images as images
+
+# Default number of rendered pages kept per process
+DEFAULT_MAX_ENTRIES = 512
+
+# Placeholder left in cached bodies where per-user markup goes
+SLOT = "<!--slot:{}-->"
+
+
+class PageCache:
+    # LRU of rendered page bodies; each entry carries tags naming the
+    # entities it shows, so a write can drop every page displaying them
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (body, tags)
+        self._tags = {}  # tag -> keys of entries carrying it
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, body, tags=()):
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (body, tuple(tags))
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._discard(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, *tags):
+        # Frees this process's copies now. Other workers never serve theirs
+        # either: callers key pages by the UpdatedAt versions they show, so
+        # a write elsewhere makes the next request look up a new key.
+        with self._lock:
+            for tag in tags:
+                for key in self._tags.pop(tag, ()):
+                    self._discard(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[1]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+def cacheable():
+    # Flashed messages are per user and consumed on render, so skip the cache
+    return "_flashes" not in session
+
+
+def fill(body, **slots):
+    # Put the per-user fragments into a shared body; the nav bar name is
+    # filled for every page
+    slots.setdefault("nav_user", escape(session.get("AccountUsername", "")))
+    for name, markup in slots.items():
+        body = body.replace(SLOT.format(name), str(markup))
+    return body
+
+
+def cached_page(key, template, load, **slots):
+    # Render template at most once per key with slot placeholders in place of
+    # per-user markup, then fill the slots for the current visitor. load()
+    # runs only on a miss and returns (template context, cache tags).
+    # Bodies embed cover image URLs and the versioned stylesheet and script
+    # URLs, so new derivatives or a new asset build start a new entry.
+    key = (key, images.manifest.version(), assets.build_id)
+    body = cache.get(key)
+    if body is None:
+        context, tags = load()
+        body = render_template(template, cache_render=True, **context)
+        cache.set(key, body, tags)
+    return fill(body, **slots)
+
+
+# Process-wide cache shared by the game, platform and category pages
+cache = PageCache()
@@ -0,0 +1,104 @@
+from urllib.parse import urlencode
+
+from flask import abort, request
+from sqlalchemy import and_, or_
+
+# Default page sizes for the listing routes
+GAMES_PER_PAGE = 24
+PLATFORMS_PER_PAGE = 24
+CATEGORIES_PER_PAGE = 24
+
+
+class Page(list):
+    # A list of records plus what the templates need for next/previous links
+    def __init__(self, items, per_page, page=None, has_next=False,
+                 next_cursor=None):
+        super().__init__(items)
+        self.per_page = per_page
+        self.page = page  # None when the page was fetched with a cursor
+        self.has_next = has_next
+        self.next_cursor = next_cursor
+
+    @property
+    def has_prev(self):
+        return self.page is not None and self.page > 1
+
+
+def parse_cursor(after, column, tiebreak):
+    # "value" for unique columns, "value:id" when ties are broken by the id
+    try:
+        if tiebreak is None:
+            return column.type.python_type(after)
+        value, _, last_id = after.rpartition(":")
+        return column.type.python_type(value), int(last_id)
+    except (TypeError, ValueError):
+        return None
+
+
+def paginate_query(query, column, per_page, page=None, after=None,
+                   descending=False, tiebreak=None):
+    # Keyset mode (after=) seeks straight to the cursor through the column's
+    # index, so every page costs the same; page= falls back to LIMIT/OFFSET.
+    # Non-unique columns need a unique tiebreak column (the primary key).
+    order = column.desc() if descending else column
+    query = query.order_by(order) if tiebreak is None \
+        else query.order_by(order, tiebreak)
+
+    position = parse_cursor(after, column, tiebreak) if after else None
+    if after and position is None:
+        # Not a cursor this listing handed out; quietly showing page 1
+        # instead would repeat rows for a client walking next_cursor
+        abort(400, description=f"Invalid cursor {after!r}")
+    if position is not None:
+        value = position if tiebreak is None else position[0]
+        beyond = column < value if descending else column > value
+        if tiebreak is not None:
+            beyond = or_(beyond, and_(column == value,
+                                      tiebreak > position[1]))
+        query = query.filter(beyond)
+        page = None
+    else:
+        page = max(page or 1, 1)
+        query = query.offset((page - 1) * per_page)
+
+    # Fetch one extra row to learn whether a next page exists
+    rows = query.limit(per_page + 1).all()
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    next_cursor = None
+    if has_next:
+        next_cursor = cursor_value(rows[-1], column)
+        if tiebreak is not None:
+            next_cursor = f"{next_cursor}:{cursor_value(rows[-1], tiebreak)}"
+    return Page(rows, per_page, page=page, has_next=has_next,
+                next_cursor=next_cursor)
+
+
+def cursor_value(row, column):
+    # The column may live on a one-to-one related record (e.g. rating stats)
+    if isinstance(row, column.class_):
+        return getattr(row, column.key)
+    for relationship in type(row).__mapper__.relationships:
+        if relationship.mapper.class_ is column.class_:
+            return getattr(getattr(row, relationship.key), column.key)
+    raise ValueError(f"Cannot read {column} from {row!r}")
+
+
+def paginate_list(rows, per_page, page):
+    # Wrap rows fetched with LIMIT per_page + 1 at offset (page - 1) * per_page
+    return Page(rows[:per_page], per_page, page=page,
+                has_next=len(rows) > per_page)
+
+
+def page_url(**params):
+    # Current URL with some query parameters replaced (None removes them);
+    # repeated parameters such as ?category=1&category=2 are kept
+    args = request.args.to_dict(flat=False)
+    args.pop("page", None)
+    args.pop("after", None)
+    for key, value in params.items():
+        if value is None:
+            args.pop(key, None)
+        else:
+            args[key] = [value]
+    return request.path + ("?" + urlencode(args, doseq=True) if args else "")
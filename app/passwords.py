@@ -0,0 +1,144 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import bcrypt
+from flask import abort
+
+# bcrypt cost (log2 of the rounds); BCRYPT_LOG_ROUNDS overrides it and
+# accounts are re-hashed at their next login when it changes
+DEFAULT_ROUNDS = 12
+
+# Processes hashing passwords; 0 hashes on the request thread instead
+DEFAULT_WORKERS = 2
+
+# Hashes allowed to run or wait at once, and the seconds a request waits for
+# a place before it gets a 503
+DEFAULT_QUEUE_SIZE = 16
+DEFAULT_QUEUE_TIMEOUT = 5
+
+# How the pool starts its processes. Forking a server worker that has
+# threads (the rating writer, suggest refresher, database pools) can copy a
+# lock another thread holds, so children come from a clean forkserver, or
+# are spawned where that is unavailable (Windows)
+START_METHOD = "forkserver" \
+    if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+# bcrypt only reads the first 72 bytes; older versions cut the rest silently
+MAX_PASSWORD_BYTES = 72
+
+
+def encode(password):
+    return password.encode("utf-8")[:MAX_PASSWORD_BYTES]
+
+
+# Run inside the pool's processes, so they stay plain module-level functions
+def generate(password, rounds):
+    return bcrypt.hashpw(encode(password), bcrypt.gensalt(rounds)).decode()
+
+
+def verify(hashed, password):
+    try:
+        return bcrypt.checkpw(encode(password), hashed.encode())
+    except ValueError:  # not a bcrypt hash
+        return False
+
+
+class PasswordPool:
+    # Bounded pool of processes doing bcrypt work, so a burst of logins uses
+    # spare cores instead of blocking the threads serving pages
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self.configure({})
+
+    def configure(self, config):
+        with self._lock:
+            self.rounds = config.get("BCRYPT_LOG_ROUNDS", DEFAULT_ROUNDS)
+            self.workers = config.get("PASSWORD_WORKERS", DEFAULT_WORKERS)
+            self.queue_size = config.get("PASSWORD_QUEUE_SIZE",
+                                         DEFAULT_QUEUE_SIZE)
+            self.queue_timeout = config.get("PASSWORD_QUEUE_TIMEOUT",
+                                            DEFAULT_QUEUE_TIMEOUT)
+            self._slots = threading.BoundedSemaphore(self.queue_size)
+            self.in_flight = self.peak_in_flight = 0
+            self.completed = self.rejected = 0
+            self.busy_seconds = 0.0
+            executor, self._executor = self._executor, None
+        if executor is not None and self._pid == os.getpid():
+            executor.shutdown(wait=False)
+
+    def executor(self):
+        # Started on first use in each process; forked server workers
+        # must not reuse their parent's pool
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    self.workers,
+                    mp_context=multiprocessing.get_context(START_METHOD))
+                self._pid = os.getpid()
+            return self._executor
+
+    def run(self, function, *args):
+        slots = self._slots
+        if not slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self.rejected += 1
+            abort(503, description="Too many sign-ins at once, please try "
+                                   "again in a moment")
+        started = time.perf_counter()
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            if not self.workers:
+                return function(*args)
+            return self.executor().submit(function, *args).result()
+        finally:
+            slots.release()
+            with self._lock:
+                self.in_flight -= 1
+                self.completed += 1
+                self.busy_seconds += time.perf_counter() - started
+
+    def stats(self):
+        with self._lock:
+            return {
+                "rounds": self.rounds,
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "in_flight": self.in_flight,
+                "waiting": max(self.in_flight - max(self.workers, 1), 0),
+                "peak_in_flight": self.peak_in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "average_seconds": self.busy_seconds / self.completed
+                if self.completed else 0.0,
+            }
+
+
+def hash_password(password):
+    return pool.run(generate, password, pool.rounds)
+
+
+def check_password(hashed, password):
+    return pool.run(verify, hashed, password)
+
+
+def cost(hashed):
+    # "$2b$12$..." -> 12
+    try:
+        return int(hashed.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def needs_rehash(hashed):
+    return cost(hashed) != pool.rounds
+
+
+# Process-wide pool, sized from the app config by create_app()
+pool = PasswordPool()
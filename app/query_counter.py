@@ -0,0 +1,36 @@
+from sqlalchemy import event
+
+from app.extensions import db
+
+
+class QueryCounter:
+    # Records every SQL statement an engine sends while the block is active
+    def __init__(self, engine=None):
+        self.engine = engine
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context,
+                executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        if self.engine is None:
+            self.engine = db.engine
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+def count_request_queries(client, url, method="GET", **kwargs):
+    # Issue one request through a Flask test client and count its statements
+    with client.application.app_context():
+        engine = db.engine
+    with QueryCounter(engine) as counter:
+        response = client.open(url, method=method, **kwargs)
+    return response, counter
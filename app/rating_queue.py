@@ -0,0 +1,287 @@
+import atexit
+import os
+import threading
+import time
+
+from flask import session
+from sqlalchemy import and_, bindparam, select
+
+from app.extensions import db
+import app.models as models
+import app.database as database
+import app.ratings as ratings
+import app.page_cache as page_cache
+
+# Seconds ratings wait so repeated clicks collapse into one write
+DEFAULT_FLUSH_INTERVAL = 0.5
+
+# Most (user, game) ratings written per transaction
+DEFAULT_BATCH_SIZE = 500
+
+# Flask session key holding the user's queued ratings, {"user:game":
+# [rating, time it is dropped]}, so a page served by another worker process,
+# whose queue does not have them, still shows them until they are written
+SESSION_KEY = "_queued_ratings"
+
+# Seconds past the flush interval a rating stays in the session, for a
+# writer still busy with earlier batches
+SESSION_GRACE = 5
+
+# Database reads projected_stats makes before settling for one that raced a
+# commit
+PROJECTION_ATTEMPTS = 3
+
+
+class RatingWriter:
+    # Ratings from the JSON API wait here, last click wins per (user, game),
+    # and a background thread writes them in batched transactions. Pages show
+    # the aggregates as they will be once everything queued is written.
+    def __init__(self):
+        self._lock = threading.Lock()
+        # One flush at a time, so the background thread and flush_all never
+        # diff the same rating against the same stored row
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pending = {}  # (user_id, game_id) -> rating, None clears it
+        self._writing = {}  # the batch being committed, same shape
+        # Odd while a batch is committing, bumped on both sides of it, so
+        # projected_stats can tell a database read raced a commit
+        self._generation = 0
+        self._thread = None
+        self._pid = None
+        self.app = None
+        self.flush_interval = DEFAULT_FLUSH_INTERVAL
+        self.batch_size = DEFAULT_BATCH_SIZE
+        self.submitted = self.coalesced = self.written = 0
+        self.batches = self.dropped = 0
+
+    def init_app(self, app):
+        self.app = app
+        self.flush_interval = app.config.get("RATING_FLUSH_INTERVAL",
+                                             DEFAULT_FLUSH_INTERVAL)
+        self.batch_size = app.config.get("RATING_BATCH_SIZE",
+                                         DEFAULT_BATCH_SIZE)
+
+    def _start(self):
+        # One writer thread per process, started with the first rating
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        self._pending, self._writing = {}, {}
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name="rating-writer")
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            # Let a burst of clicks collect before writing
+            time.sleep(self.flush_interval)
+            while self.flush():
+                pass
+
+    def submit(self, user_id, game_id, rating):
+        with self._lock:
+            self._start()
+            key = (user_id, game_id)
+            if key in self._pending:
+                self.coalesced += 1
+            self._pending[key] = rating
+            self.submitted += 1
+        self._wake.set()
+
+    def pending_rating(self, user_id, game_id, default=None):
+        with self._lock:
+            for queue in (self._pending, self._writing):
+                if (user_id, game_id) in queue:
+                    return queue[(user_id, game_id)]
+        return default
+
+    def remember(self, user_id, game_id, rating):
+        # Called with submit() while handling the request that queued it
+        now = time.time()
+        queued = {key: entry for key, entry in
+                  session.get(SESSION_KEY, {}).items() if entry[1] > now}
+        queued[f"{user_id}:{game_id}"] = [
+            rating, now + self.flush_interval + SESSION_GRACE]
+        session[SESSION_KEY] = queued
+
+    def forget(self, user_id, game_id):
+        # The rating was written some other way, so the session must not
+        # show the queued one over it
+        queued = session.get(SESSION_KEY, {})
+        if f"{user_id}:{game_id}" in queued:
+            queued.pop(f"{user_id}:{game_id}")
+            session[SESSION_KEY] = queued
+
+    def queued_rating(self, user_id, game_id, default=None):
+        # The rating the user last queued through any worker, else one in
+        # this process's queue, else default (the stored rating)
+        entry = session.get(SESSION_KEY, {}).get(f"{user_id}:{game_id}")
+        if entry and entry[1] > time.time():
+            return entry[0]
+        return self.pending_rating(user_id, game_id, default)
+
+    def projected_stats(self, game_id):
+        # The game's aggregates with every queued rating for it applied,
+        # diffed against the ratings stored now as the writer does. The
+        # overlay is copied under the lock and the database read outside it;
+        # a read that raced a commit could count a batch twice or not at all,
+        # so it is retried, and after that the last read is close enough
+        for _ in range(PROJECTION_ATTEMPTS):
+            with self._lock:
+                generation = self._generation
+                queued = {user_id: rating
+                          for queue in (self._writing, self._pending)
+                          for (user_id, queued_game), rating in queue.items()
+                          if queued_game == game_id}
+            counts, stored = stored_ratings(game_id, queued)
+            if generation % 2 == 0 and generation == self._generation:
+                break
+        for user_id, new in queued.items():
+            old = stored.get(user_id)
+            if old:
+                counts[old] -= 1
+            if new:
+                counts[new] += 1
+        total = sum(counts.values())
+        rating_sum = sum(star * votes for star, votes in counts.items())
+        return {
+            "count": total,
+            "average": round(rating_sum / total, 2) if total else 0,
+            "histogram": [[star, counts[star]] for star in
+                          reversed(ratings.STARS)],
+        }
+
+    def flush(self):
+        # Write up to batch_size queued ratings; returns how many were taken
+        with self._flush_lock:
+            return self._flush()
+
+    def _flush(self):
+        with self._lock:
+            keys = list(self._pending)[:self.batch_size]
+            self._writing = {key: self._pending.pop(key) for key in keys}
+            batch = dict(self._writing)
+        if not batch:
+            return 0
+        with self.app.app_context(), database.primary():
+            try:
+                write_ratings(batch)
+                self._commit(batch)
+            except Exception:
+                db.session.rollback()
+                # One bad entry (e.g. a game deleted meanwhile) must not
+                # lose the rest, so retry them one at a time
+                for key, rating in batch.items():
+                    try:
+                        write_ratings({key: rating})
+                        self._commit([key])
+                    except Exception:
+                        db.session.rollback()
+                        self.app.logger.exception(
+                            "Dropped rating %s for game %s", *key)
+                        with self._lock:
+                            self.dropped += 1
+                            self._writing.pop(key, None)
+        page_cache.cache.invalidate(*{f"rating:{game_id}"
+                                      for _, game_id in batch})
+        return len(batch)
+
+    def _commit(self, keys):
+        # The commit runs outside the lock so page renders reading the
+        # overlay never wait on the database; the generation brackets it
+        with self._lock:
+            self._generation += 1
+        try:
+            db.session.commit()
+        except Exception:
+            with self._lock:
+                self._generation += 1
+            raise
+        # Committed ratings leave the overlay as the generation settles
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                self._writing.pop(key, None)
+            self.written += len(keys)
+            self.batches += 1
+
+    def flush_all(self):
+        while self.flush():
+            pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                "submitted": self.submitted,
+                "coalesced": self.coalesced,
+                "written": self.written,
+                "batches": self.batches,
+                "dropped": self.dropped,
+            }
+
+
+def stored_ratings(game_id, user_ids):
+    # The game's committed {star: votes} and {user_id: rating} for user_ids
+    stats = models.GameRatingStats
+    reviews = models.Reviews.__table__
+    with database.primary():
+        row = db.session.execute(
+            select(*[getattr(stats, f"Rating{star}")
+                     for star in ratings.STARS])
+            .where(stats.GameID == game_id)).first()
+        stored = {}
+        if user_ids:
+            stored = dict(db.session.execute(
+                select(reviews.c.UserID, reviews.c.Rating)
+                .where(reviews.c.GameID == game_id,
+                       reviews.c.UserID.in_(list(user_ids)))).all())
+    counts = dict(zip(ratings.STARS, row or [0] * len(ratings.STARS)))
+    return counts, stored
+
+
+def write_ratings(batch):
+    # Apply {(user_id, game_id): rating} to Reviews and the rating stats,
+    # diffing against the ratings stored now rather than when queued
+    reviews = models.Reviews.__table__
+    user_ids = {user_id for user_id, _ in batch}
+    game_ids = {game_id for _, game_id in batch}
+    stored = {(user_id, game_id): rating for user_id, game_id, rating in
+              db.session.execute(select(
+                  reviews.c.UserID, reviews.c.GameID, reviews.c.Rating)
+                  .where(reviews.c.UserID.in_(user_ids),
+                         reviews.c.GameID.in_(game_ids)))}
+    inserts, updates, deletes = [], [], []
+    for (user_id, game_id), new_rating in batch.items():
+        old_rating = stored.get((user_id, game_id))
+        if old_rating == new_rating:
+            continue
+        row = {"user": user_id, "game": game_id, "rating": new_rating}
+        if new_rating is None:
+            deletes.append(row)
+        elif old_rating is None:
+            inserts.append({"UserID": user_id, "GameID": game_id,
+                            "Rating": new_rating})
+        else:
+            updates.append(row)
+        ratings.apply_rating_change(game_id, old_rating, new_rating)
+
+    match = and_(reviews.c.UserID == bindparam("user"),
+                 reviews.c.GameID == bindparam("game"))
+    if inserts:
+        db.session.execute(reviews.insert(), inserts)
+    if updates:
+        db.session.execute(reviews.update().where(match).values(
+            Rating=bindparam("rating")), updates)
+    if deletes:
+        db.session.execute(reviews.delete().where(match), deletes)
+
+
+# Process-wide queue, configured by create_app()
+writer = RatingWriter()
+
+# Write whatever is still queued when the process exits cleanly
+atexit.register(lambda: writer.app is not None and writer.flush_all())
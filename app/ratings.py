@@ -0,0 +1,89 @@
+import click
+from flask.cli import AppGroup
+from sqlalchemy import (DateTime, Float, case, cast, delete, func, insert,
+                        literal, select, update)
+
+from app.extensions import db
+import app.models as models
+
+STARS = range(1, 6)
+
+
+def apply_rating_change(game_id, old_rating, new_rating):
+    # Adjust one game's aggregates for a review being added (old_rating None),
+    # changed, or cleared (new_rating None). Runs in the caller's transaction.
+    if old_rating == new_rating:
+        return
+    stats = models.GameRatingStats
+    sum_delta = (new_rating or 0) - (old_rating or 0)
+    count_delta = (new_rating is not None) - (old_rating is not None)
+    new_sum = stats.RatingSum + sum_delta
+    new_count = stats.RatingCount + count_delta
+
+    # Relative updates so concurrent writers never lose each other's votes
+    values = {"RatingSum": new_sum, "RatingCount": new_count,
+              "RatingAverage": case((new_count > 0,
+                                     cast(new_sum, Float) / new_count),
+                                    else_=0),
+              "UpdatedAt": models.utcnow()}
+    for star in STARS:
+        star_delta = (new_rating == star) - (old_rating == star)
+        if star_delta:
+            column = getattr(stats, f"Rating{star}")
+            values[f"Rating{star}"] = column + star_delta
+    result = db.session.execute(
+        update(stats).where(stats.GameID == game_id).values(values))
+
+    # Games created before their stats row existed start from zero
+    if result.rowcount == 0:
+        db.session.execute(insert(stats).values(
+            GameID=game_id, RatingSum=sum_delta, RatingCount=count_delta,
+            RatingAverage=sum_delta / count_delta if count_delta > 0 else 0,
+            UpdatedAt=models.utcnow(),
+            **{f"Rating{star}": int(new_rating == star) for star in STARS}))
+
+
+def remove_account_ratings(account_id):
+    # Take a deleted account's votes out of every game it rated
+    reviews = db.session.execute(
+        select(models.Reviews.GameID, models.Reviews.Rating)
+        .where(models.Reviews.UserID == account_id)).all()
+    for game_id, rating in reviews:
+        apply_rating_change(game_id, rating, None)
+
+
+def rebuild_rating_stats(connection=None):
+    # Recompute every game's aggregates from Reviews in one INSERT ... SELECT
+    connection = connection or db.session
+    stats = models.GameRatingStats
+    reviews = models.Reviews
+    star_counts = [func.coalesce(func.sum(
+        case((reviews.Rating == star, 1), else_=0)), 0) for star in STARS]
+    source = (
+        select(models.Games.GameID,
+               func.coalesce(func.sum(reviews.Rating), 0),
+               func.count(reviews.Rating),
+               *star_counts,
+               func.coalesce(func.avg(reviews.Rating), 0),
+               literal(models.utcnow(), DateTime))
+        .outerjoin(reviews, reviews.GameID == models.Games.GameID)
+        .group_by(models.Games.GameID)
+    )
+    columns = ["GameID", "RatingSum", "RatingCount",
+               *[f"Rating{star}" for star in STARS], "RatingAverage",
+               "UpdatedAt"]
+    connection.execute(delete(stats))
+    connection.execute(insert(stats).from_select(columns, source))
+
+
+ratings_cli = AppGroup("ratings", help="Maintain precomputed rating stats.")
+
+
+@ratings_cli.command("rebuild")
+def rebuild_command():
+    """Recompute GameRatingStats from the Reviews table."""
+    rebuild_rating_stats()
+    db.session.commit()
+    count = db.session.execute(select(func.count()).select_from(
+        models.GameRatingStats)).scalar()
+    click.echo(f"Rebuilt rating stats for {count} games")
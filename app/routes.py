@@ -1,38 +1,77 @@
 from datetime import datetime
 from werkzeug.exceptions import HTTPException
 from werkzeug.utils import secure_filename
-from app import app
-from flask import render_template, abort, redirect, session, request, flash
-from flask_sqlalchemy import SQLAlchemy
+from flask import Blueprint, render_template, abort, redirect, session, request, flash, jsonify
 import os
-from flask_bcrypt import Bcrypt
+import sqlalchemy as sa
 from sqlalchemy import exc
-
-basedir = os.path.abspath(os.path.dirname(__file__))
-db = SQLAlchemy()
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(basedir, "games.db")
-db.init_app(app)
-bcrypt = Bcrypt()
-app.secret_key = os.urandom(12)
-
-
-import app.models as models  # noqa: E402
-from app.forms import AdminGameForm, LoginForm, RegisterForm  # noqa: E402
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.orm import selectinload
+from app.extensions import db
+import app.models as models
+import app.ratings as ratings
+import app.auth as auth
+import app.page_cache as page_cache
+import app.conditional as conditional
+import app.search as game_search
+import app.suggest as suggest
+import app.pagination as pagination
+import app.images as images
+import app.passwords as passwords
+import app.rating_queue as rating_queue
+import app.database as database
+import app.hardware as hardware
+import app.facets as facets
+import app.metrics as metrics
+import app.diagnostics as diagnostics
+from app.forms import AdminGameForm, LoginForm, RegisterForm
+
+# Every page of the site; create_app() registers it on the application
+bp = Blueprint("games", __name__)
+
+# Lets templates build next/previous links that keep the current filters
+bp.add_app_template_global(pagination.page_url, "page_url")
+
+# Resized cover images for the cover_image.html macro
+bp.add_app_template_global(images.variants, "image_variants")
+bp.add_app_template_global(images.variant, "image_variant")
 
 
 # Helper function for querying data
-def execute_query(model, operation='SELECT', id=None, data=None, filters=None, search_fields=None):
+# options: loader options such as selectinload(models.Platforms.games) applied to SELECTs
+# per_page: return a pagination.Page of that size, either by page number or after a keyset cursor
+# cursor: column (or column name) ordering the pages, defaults to the primary key; descending reverses it
+# commit: False leaves INSERT/UPDATE/DELETE pending so the caller can commit several changes together
+@metrics.labelled
+@diagnostics.logged
+def execute_query(model, operation='SELECT', id=None, data=None, filters=None, search_fields=None, options=None,
+                  per_page=None, page=None, after=None, cursor=None, descending=False, commit=True):
     try:
         # SELECT OPERATION
         if operation == "SELECT":
+            # Eager-load requested relationships instead of one lazy query per row
+            base_query = model.query.options(*options) if options else model.query
+
+            # Return results a page at a time when a page size is given
+            def fetch(query):
+                if not per_page:
+                    return query.all() or []
+                primary_key = getattr(model, model.__mapper__.primary_key[0].key)
+                column = getattr(model, cursor) if isinstance(cursor, str) else cursor or primary_key
+                if column.class_ is not model:  # Ordered by a column of a one-to-one related table
+                    query = query.join(column.class_)
+                tiebreak = None if column is primary_key else primary_key  # Keeps keyset order unique
+                return pagination.paginate_query(query, column, per_page, page=page, after=after,
+                                                 descending=descending, tiebreak=tiebreak)
+
             # Case 1: Fetch single records by ID
             if id is not None and id != 0:
-                record = model.query.get(id)  # Auto-404 if none found
+                record = base_query.get(id)  # Auto-404 if none found
                 return [record] if record else abort(404, description="Data not found")  # Return as list for display in HTML
 
             # Case 2: Exact filtering, case-insensitive
             elif filters:  # Get queried results based on input
-                query = model.query
+                query = base_query
                 for column_name, value in filters.items():
                     column = getattr(model, column_name)
                     if isinstance(value, list):  # Match any in list
@@ -41,19 +80,19 @@ def execute_query(model, operation='SELECT', id=None, data=None, filters=None, s
                         query = query.filter(column.ilike(f"{value}"))
                     else:  # Exact match
                         query = query.filter(column == value)
-                return query.all() or []
+                return fetch(query)
 
             # Case 3: Partial search
             elif search_fields:  # Get all results with input in query
-                query = model.query
+                query = base_query
                 for column_name, value in search_fields.items():
                     column = getattr(model, column_name)
                     query = query.filter(column.ilike(f"%{value}%"))  # Partial case-insensitive match
-                return query.all() or []
+                return fetch(query)
 
             # Case 4: Get all
             else:
-                return model.query.all() or []
+                return fetch(base_query)
 
         # INSERT OPERATION
         elif operation == "INSERT":
@@ -61,7 +100,7 @@ def execute_query(model, operation='SELECT', id=None, data=None, filters=None, s
                 abort(404, description="Cannot insert data")
             record = model(**data)  # Create new record
             db.session.add(record)
-            db.session.commit()
+            db.session.commit() if commit else db.session.flush()
             return [record]  # Return new record
 
         # UPDATE OPERATION
@@ -79,7 +118,7 @@ def execute_query(model, operation='SELECT', id=None, data=None, filters=None, s
                 abort(404, description="No ID or filters provided")
             for key, value in data.items():
                 setattr(record, key, value)  # Update each field
-            db.session.commit()
+            db.session.commit() if commit else db.session.flush()
             return [record]  # Return updated record
 
         # DELETE OPERATION
@@ -100,7 +139,7 @@ def execute_query(model, operation='SELECT', id=None, data=None, filters=None, s
                     else:
                         query = query.filter(column == value)
                 query.delete(synchronize_session=False)
-            db.session.commit()
+            db.session.commit() if commit else db.session.flush()
             return []  # Returns empty list, indicates data deleted
 
         else:
@@ -125,12 +164,122 @@ def execute_query(model, operation='SELECT', id=None, data=None, filters=None, s
         abort(500, description="Internal server error")
 
 
+# Unit of work for writes spanning many rows and models: everything staged inside the with block is sent as
+# executemany/RETURNING statements and committed once on exit, or rolled back together if anything fails
+# filters: column=value, or column=[values] to match any
+class UnitOfWork:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            db.session.commit()
+            return False
+        db.session.rollback()
+        if issubclass(exc_type, exc.SQLAlchemyError):
+            abort(500, description="Database operation failed")
+        return False  # Re-raise anything else, including explicit HTTP errors
+
+    @staticmethod
+    def where(model, filters):
+        return [getattr(model, column_name).in_(value) if isinstance(value, (list, set, tuple))
+                else getattr(model, column_name) == value
+                for column_name, value in filters.items()]
+
+    # Insert one row and return its generated primary key without re-selecting it
+    def insert(self, model, data):
+        primary_key = model.__mapper__.primary_key[0]
+        return db.session.execute(sa.insert(model).values(**data).returning(primary_key)).scalar_one()
+
+    # Insert rows of one model in a single executemany; returning=True gives their generated keys in row order.
+    # Goes through the table rather than the ORM mapper, which would build a persistence command per row.
+    def insert_many(self, model, rows, returning=False):
+        if not rows:
+            return []
+        if not returning:
+            db.session.execute(sa.insert(model.__table__), rows)
+            return []
+        primary_key = model.__mapper__.primary_key[0]
+        statement = sa.insert(model.__table__).returning(primary_key, sort_by_parameter_order=True)
+        return db.session.execute(statement, rows).scalars().all()
+
+    # Insert rows, or update the existing row sharing their keys (a unique index or the primary key)
+    def upsert_many(self, model, rows, keys):
+        if not rows:
+            return
+        statement = sqlite.insert(model)
+        columns = [column for column in rows[0] if column not in keys]
+        if "UpdatedAt" in model.__table__.c:
+            columns.append("UpdatedAt")
+        db.session.execute(statement.on_conflict_do_update(
+            index_elements=keys, set_={column: statement.excluded[column] for column in columns}), rows)
+
+    def update(self, model, data, **filters):
+        db.session.execute(sa.update(model).where(*self.where(model, filters)).values(**data))
+
+    def delete(self, model, **filters):
+        db.session.execute(sa.delete(model).where(*self.where(model, filters)))
+
+
+# System requirement rows the admin form describes for one platform (PC has minimum and recommended)
+def requirement_rows(form, game_id, platform_id):
+    base_game_data = {"GameID": game_id, "PlatformID": platform_id}
+    if platform_id == 1:
+        rows = [base_game_data | {"Type": "Minimum",
+                                  "OS": form.min_pc_os.data or "N/A",
+                                  "RAM": form.min_pc_ram.data or "N/A",
+                                  "CPU": form.min_pc_cpu.data or "N/A",
+                                  "GPU": form.min_pc_gpu.data or "N/A",
+                                  "Storage": form.min_pc_storage.data or "N/A"},
+                base_game_data | {"Type": "Recommended",
+                                  "OS": form.rec_pc_os.data or "N/A",
+                                  "RAM": form.rec_pc_ram.data or "N/A",
+                                  "CPU": form.rec_pc_cpu.data or "N/A",
+                                  "GPU": form.rec_pc_gpu.data or "N/A",
+                                  "Storage": form.rec_pc_storage.data or "N/A"}]
+    else:
+        # Console platforms only list OS and storage
+        rows = [base_game_data | {"Type": "Normal",
+                                  "OS": (form.ps_os.data if platform_id == 2 else form.xb_os.data) or "N/A",
+                                  "RAM": "N/A",
+                                  "CPU": "N/A",
+                                  "GPU": "N/A",
+                                  "Storage": (form.ps_storage.data if platform_id == 2 else form.xb_storage.data) or "N/A"}]
+    # Numeric RAM/storage/CPU/GPU columns for the compatibility search
+    return hardware.with_parsed(rows)
+
+
+# Price and release date row for one platform, -1 and 1900-01-01 when left blank
+def price_row(form, game_id, platform_id):
+    # Get raw data using ternary operations for PlatformID
+    raw_price = (form.pc_price.data if platform_id == 1 else
+                 form.ps_price.data if platform_id == 2 else
+                 form.xb_price.data)
+    raw_release_date = (form.pc_release_date.data if platform_id == 1 else
+                        form.ps_release_date.data if platform_id == 2 else
+                        form.xb_release_date.data)
+
+    # Load into dictionary of proper data type
+    return {
+        "GameID": game_id,
+        "PlatformID": platform_id,
+        "Price": float(raw_price) if raw_price not in [None, ""] else -1,
+        "ReleaseDate": raw_release_date.isoformat() if raw_release_date else "1900-01-01"
+    }
+
+
 # All errors use the same render template, but their code, title, and message are different when rendered
-@app.errorhandler(HTTPException)
+@bp.app_errorhandler(HTTPException)
 def handle_http_errors(e):
+    # Anything under /api/ is read by scripts, so it gets JSON rather than the error page
+    if request.path.startswith("/api/"):
+        return jsonify(error=e.description), e.code
+
     error_responses = {
+        400: {"title": "Bad Request", "message": "The request could not be understood"},
         404: {"title": "Page Not Found", "message": "Page Not Found"},
-        500: {"title": "Internal Server Error", "message": "An unexpected error occurred"}
+        500: {"title": "Internal Server Error", "message": "An unexpected error occurred"},
+        503: {"title": "Service Unavailable", "message": "The server is busy, please try again shortly"}
     }
 
     # Get the response for the specific error code or use a default
@@ -143,7 +292,7 @@ def handle_http_errors(e):
     return render_template("error.html", code=e.code, title=response["title"], message=response["message"]), e.code
 
 
-@app.route('/login', methods=['GET', 'POST'])
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
     form = LoginForm()
     if form.validate_on_submit():
@@ -153,8 +302,12 @@ def login():
         # Usernames are unique so get first or get none
         user = users[0] if users else None
 
-        # Check if password matches hashed version
-        if user and bcrypt.check_password_hash(user.AccountPassword, form.password.data):
+        # Check if password matches hashed version (hashing runs in the password pool, off the request thread)
+        if user and passwords.check_password(user.AccountPassword, form.password.data):
+            # Re-hash while the plain password is at hand if the bcrypt cost has changed since it was stored
+            if passwords.needs_rehash(user.AccountPassword):
+                execute_query(models.Accounts, operation="UPDATE", id=user.AccountID,
+                              data={"AccountPassword": passwords.hash_password(form.password.data)})
             session['AccountID'] = user.AccountID  # Logs user in
             session['AccountUsername'] = user.AccountUsername
             return redirect("/dashboard")
@@ -165,7 +318,7 @@ def login():
     return render_template('login.html', form=form)
 
 
-@app.route('/register', methods=['GET', 'POST'])
+@bp.route('/register', methods=['GET', 'POST'])
 def register():
     form = RegisterForm()
     if form.validate_on_submit():
@@ -173,7 +326,7 @@ def register():
         temp_password = form.password.data
 
         # Hash password, salt built-in
-        hashed_password = bcrypt.generate_password_hash(temp_password).decode('utf-8')
+        hashed_password = passwords.hash_password(temp_password)
         data = {
             "AccountUsername": temp_username,
             "AccountPassword": hashed_password
@@ -193,77 +346,78 @@ def register():
     return render_template('register.html', form=form)
 
 
-@app.route('/logout')
+@bp.route('/logout')
 def logout():
     session.clear()
     return redirect('/game/0')
 
 
-@app.route('/delete')
+@bp.route('/delete')
 def delete():
     user_id = session.get("AccountID")
     if user_id is None:
         return redirect('/game/0')
 
     try:
+        # Take the account's votes out of the rating stats in the same commit as the delete
+        ratings.remove_account_ratings(user_id)
         execute_query(models.Accounts, operation="DELETE", id=user_id)
     except Exception as e:  # noqa F841
         print("An error occurred, please try again later")
     else:
+        auth.invalidate_account(user_id)
         session.clear()
     return redirect('/game/0')
 
 
-@app.route('/dashboard')
+@bp.route('/dashboard')
 def dashboard():
-    if "AccountID" in session:
-        account = execute_query(models.Accounts, operation="SELECT", filters={"AccountID": session["AccountID"]})
-        if account:
-            account = account[0]
-            username = account.AccountUsername
-            is_admin = account.AccountIsAdmin
+    account = auth.current_user()
+    if account:
+        if account.AccountIsAdmin:
+            return redirect("/admin")
 
-            if is_admin:
-                return redirect("/admin")
-
-            return render_template('dashboard.html', username=username, is_admin=is_admin)
+        return render_template('dashboard.html', username=account.AccountUsername, is_admin=account.AccountIsAdmin)
     else:
         return redirect('/login')
 
 
-@app.route('/admin')
+@bp.route('/admin')
+@auth.admin_required
 def admin():
-    if "AccountID" in session:
-        account = execute_query(models.Accounts, operation="SELECT", filters={"AccountID": session["AccountID"]})
-        if account:
-            account = account[0]
-            username = account.AccountUsername
-            is_admin = account.AccountIsAdmin
-
-            if not is_admin:
-                return redirect("/dashboard")
+    account = auth.current_user()
+    return render_template('dashboard.html', username=account.AccountUsername, is_admin=account.AccountIsAdmin)
 
-            return render_template('dashboard.html', username=username, is_admin=is_admin)
 
-    return redirect('/login')
+# Paging arguments for the games grid: ?page=N, ?after=<cursor>, and ?sort=name|rating
+def listing_page_args():
+    sort = request.args.get("sort")
+    if sort == "name":
+        cursor, descending = "GameName", False
+    elif sort == "rating":  # Highest average first, read from the precomputed stats
+        cursor, descending = models.GameRatingStats.RatingAverage, True
+    else:
+        cursor, descending = "GameID", False
+    return {"per_page": pagination.GAMES_PER_PAGE, "page": request.args.get("page", type=int),
+            "after": request.args.get("after"), "cursor": cursor, "descending": descending}
 
 
 # Home Page Route
-@app.route('/')
+@bp.route('/')
 def home_page():
     return redirect('/game/0')
     # return render_template('home.html')
 
 
 # About Page Route
-@app.route('/about')
+@bp.route('/about')
 def about():
     return render_template('about.html')
 
 
 # Displays platforms, allows id=0 for redirecting
-@app.route('/platform/', defaults={'id': None})
-@app.route('/platform/<int:id>')
+@bp.route('/platform/', defaults={'id': None})
+@bp.route('/platform/<int:id>')
 def platform(id):
     platforms = None
     if id is None:
@@ -271,27 +425,70 @@ def platform(id):
 
     if id == 0:  # Template all if id is 0 else individual
         # Query data via helper function
-        platforms = execute_query(models.Platforms, operation="SELECT", id=0)
-        return render_template('all_platforms.html', platforms=platforms)
+        platforms = execute_query(models.Platforms, operation="SELECT", id=0,
+                                  per_page=pagination.PLATFORMS_PER_PAGE,
+                                  page=request.args.get("page", type=int),
+                                  after=request.args.get("after"))
+        return conditional.respond(conditional.listing_etag(platforms), None,
+                                   lambda: render_template('all_platforms.html', platforms=platforms))
     else:
-        platform = execute_query(models.Platforms, operation="SELECT", id=id)
-        games = platform[0].games  # Returns all games under specific category
-        return render_template('individual_platforms.html', platform=platform[0], games=games)
+        # Same page for every visitor, so it is rendered once and served from the page cache
+        def load():
+            # Load the platform and its games together (2 queries regardless of game count)
+            platform = execute_query(models.Platforms, operation="SELECT", id=id,
+                                     options=[selectinload(models.Platforms.games)])
+            games = platform[0].games  # Returns all games under specific category
+            tags = [f"platform:{id}"] + [f"game:{game.GameID}" for game in games]
+            return {"platform": platform[0], "games": games}, tags
+
+        # UpdatedAt is bumped whenever the platform's game list changes
+        version = conditional.entity_version(models.Platforms, id)
+        etag = conditional.weak_etag("platform", id, version, session.get("AccountUsername"))
+
+        def render():
+            if not page_cache.cacheable():
+                return render_template('individual_platforms.html', **load()[0])
+            return page_cache.cached_page(("platform", id, version), 'individual_platforms.html', load)
+        return conditional.respond(etag, None, render)
+
+
+# Platforms offered on the game page, and the requirement columns each one shows
+PLATFORM_IDS = {"PC": 1, "PlayStation": 2, "Xbox": 3}
+PLATFORM_REQUIREMENT_TYPES = {"PC": ["Minimum", "Recommended"], "PlayStation": ["Normal"], "Xbox": ["Normal"]}
+
+
+# Every platform's price, release date and system requirements for one game, keyed like the platform dropdown;
+# embedded in the game page and served by /api/games/<id>/platforms so switching platforms needs no request
+def platform_document(game_id):
+    details = execute_query(models.GamePlatformDetails, filters={"GameID": game_id})
+    requirements = execute_query(models.SystemRequirements, filters={"GameID": game_id})
+    platforms = {}
+    for name, platform_id in PLATFORM_IDS.items():
+        types = PLATFORM_REQUIREMENT_TYPES[name]
+        platforms[name] = {
+            "details": [{"Price": row.Price, "ReleaseDate": str(row.ReleaseDate)}
+                        for row in details if row.PlatformID == platform_id],
+            "requirements": sorted(({"Type": row.Type, "OS": row.OS, "RAM": row.RAM, "CPU": row.CPU,
+                                     "GPU": row.GPU, "Storage": row.Storage}
+                                    for row in requirements if row.PlatformID == platform_id and row.Type in types),
+                                   key=lambda row: types.index(row["Type"])),
+        }
+    return {"game_id": game_id, "platforms": platforms}
 
 
 # Displays platforms, allows id=0 for redirecting
-@app.route('/game/', defaults={'id': None}, methods=['GET', 'POST'])
-@app.route('/game/<int:id>', methods=['GET', 'POST'])
+@bp.route('/game/', defaults={'id': None}, methods=['GET', 'POST'])
+@bp.route('/game/<int:id>', methods=['GET', 'POST'])
 def game(id):
     games = None
     if id is None:
         return redirect("/game/0")
 
-    # Query data via helper function
-    games = execute_query(models.Games, "SELECT", id=id)
-
     if id == 0:  # Template all if id is 0 else individual
-        return render_template('all_games.html', games=games)
+        # One page at a time, ordered by ID or alphabetically with ?sort=name
+        games = execute_query(models.Games, "SELECT", **listing_page_args())
+        return conditional.respond(conditional.listing_etag(games), None,
+                                   lambda: render_template('all_games.html', games=games))
     else:  # Rating is restricted to registered users only
         user_rating = None
         user_id = session.get("AccountID")  # Check if user is logged in
@@ -299,34 +496,45 @@ def game(id):
             user_rating = execute_query(models.Reviews, filters={"UserID": user_id, "GameID": id})
             if user_rating:  # Get rating based on current game and current user
                 user_rating = user_rating[0].Rating
+            # A rating still queued by the JSON API, in this worker or another one, counts as the user's rating
+            user_rating = rating_queue.writer.queued_rating(user_id, id, user_rating)
 
         # Check if user is admin
-        is_admin = 0
-        if "AccountID" in session:
-            account = execute_query(models.Accounts, operation="SELECT", filters={"AccountID": session["AccountID"]})
-            if account:
-                account = account[0]
-                is_admin = account.AccountIsAdmin
-
-        # Load platforms for platform-specific details
-        chosen_platform = request.form.get("platforms", "PC")
-        platform_id = {"PC": 1, "PlayStation": 2, "Xbox": 3}
-        platform_key = {"PC": ["Minimum", "Recommended"], "PlayStation": ["Normal"], "Xbox": ["Normal"]}
-        platform_detail = execute_query(models.GamePlatformDetails,
-                                        operation="SELECT",
-                                        filters={"GameID": id, "PlatformID": int(platform_id[chosen_platform])})
-        system_detail = execute_query(models.SystemRequirements,
-                                      operation="SELECT",
-                                      filters={"GameID": id, "Type": platform_key[chosen_platform],
-                                               "PlatformID": platform_id[chosen_platform]})
+        is_admin = auth.is_admin()
 
-        return render_template('individual_games.html', games=games, user_rating=user_rating, is_admin=is_admin,
-                               chosen_platform=chosen_platform, platform_detail=platform_detail, system_detail=system_detail)
+        # Load platforms for platform-specific details; the page switches between them in the browser, and the
+        # form post remains for browsers without JavaScript
+        chosen_platform = request.form.get("platforms", "PC")
+        if chosen_platform not in PLATFORM_IDS:
+            abort(404, description="Platform not found")
+
+        def load():
+            # Query data via helper function
+            games = execute_query(models.Games, "SELECT", id=id)
+            platform_data = platform_document(id)
+            chosen = platform_data["platforms"][chosen_platform]
+            context = {"games": games, "chosen_platform": chosen_platform, "platform_data": platform_data,
+                       "platform_detail": chosen["details"], "system_detail": chosen["requirements"]}
+            return context, [f"game:{id}", f"rating:{id}"]
+
+        # Validators from the game, its rating stats and the chosen platform's details, plus who is viewing
+        versions = tuple(conditional.game_versions(id, PLATFORM_IDS[chosen_platform]) or ())
+        etag = conditional.weak_etag("game", id, chosen_platform, versions, session.get("AccountUsername"),
+                                     user_rating, is_admin)
+
+        def render():
+            # Admins see edit controls, so only everyone else shares the cached page with their own rating filled in
+            if is_admin or not page_cache.cacheable():
+                return render_template('individual_games.html', user_rating=user_rating, is_admin=is_admin, **load()[0])
+            rating_widget = render_template('rating_widget.html', game_id=id, user_rating=user_rating) if user_id else ""
+            return page_cache.cached_page(("game", id, chosen_platform, versions), 'individual_games.html', load,
+                                          rating=rating_widget)
+        return conditional.respond(etag, None, render)
 
 
 # Displays platforms, allows id=0 for redirecting
-@app.route('/category/', defaults={'id': None})
-@app.route('/category/<int:id>')
+@bp.route('/category/', defaults={'id': None})
+@bp.route('/category/<int:id>')
 def category(id):
     categories = None
     if id is None:
@@ -334,15 +542,34 @@ def category(id):
 
     if id == 0:  # Template all if id is 0 else individual
         # Query data via helper function
-        categories = execute_query(models.Categories, "SELECT", id=0)
-        return render_template('all_categories.html', categories=categories)
+        categories = execute_query(models.Categories, "SELECT", id=0,
+                                   per_page=pagination.CATEGORIES_PER_PAGE,
+                                   page=request.args.get("page", type=int),
+                                   after=request.args.get("after"))
+        return conditional.respond(conditional.listing_etag(categories), None,
+                                   lambda: render_template('all_categories.html', categories=categories))
     else:
-        category = execute_query(models.Categories, "SELECT", id=id)
-        games = category[0].games  # Returns all games under specific category
-        return render_template('individual_categories.html', category=category[0], games=games)
-
-
-@app.route('/search', methods=["GET", "POST"])
+        # Same page for every visitor, so it is rendered once and served from the page cache
+        def load():
+            # Load the category and its games together (2 queries regardless of game count)
+            category = execute_query(models.Categories, "SELECT", id=id,
+                                     options=[selectinload(models.Categories.games)])
+            games = category[0].games  # Returns all games under specific category
+            tags = [f"category:{id}"] + [f"game:{game.GameID}" for game in games]
+            return {"category": category[0], "games": games}, tags
+
+        # UpdatedAt is bumped whenever the category's game list changes
+        version = conditional.entity_version(models.Categories, id)
+        etag = conditional.weak_etag("category", id, version, session.get("AccountUsername"))
+
+        def render():
+            if not page_cache.cacheable():
+                return render_template('individual_categories.html', **load()[0])
+            return page_cache.cached_page(("category", id, version), 'individual_categories.html', load)
+        return conditional.respond(etag, None, render)
+
+
+@bp.route('/search', methods=["GET", "POST"])
 def search():
     games = None
     query = request.args.get('query', '').strip()  # Obtain input
@@ -350,14 +577,61 @@ def search():
         exact_matches = execute_query(models.Games, filters={"GameName": query})
         if exact_matches:  # Redirect to game page if exact
             return redirect("game/" + str(exact_matches[0].GameID))
-        # Get all data containing that input
-        games = execute_query(models.Games, search_fields={"GameName": query})
+        # Ranked full-text search over names, descriptions, developers and categories, one page at a time
+        per_page = pagination.GAMES_PER_PAGE
+        page = max(request.args.get("page", 1, type=int), 1)
+        games = game_search.search_games(query, limit=per_page + 1, offset=(page - 1) * per_page)
+        games = pagination.paginate_list(games, per_page, page)
     else:  # Grab all if no input
-        games = execute_query(models.Games)
+        games = execute_query(models.Games, **listing_page_args())
     return render_template('all_games.html', games=games, query=query)
 
 
-@app.route('/rate_game/<int:id>', methods=["GET", "POST"])
+# Games matching any mix of categories, platforms, price and release date, with the count each other choice
+# would give; everything is answered from the in-memory facet bitsets except loading the page of games
+@bp.route('/browse')
+def browse():
+    filters = facets.requested_filters()
+    matches, counts = facets.index.current().browse(**filters)
+    per_page = pagination.GAMES_PER_PAGE
+    page = max(request.args.get("page", 1, type=int), 1)
+    game_ids = facets.members(matches, offset=(page - 1) * per_page, limit=per_page + 1)
+    games = execute_query(models.Games, filters={"GameID": game_ids}) if game_ids else []
+    games = pagination.paginate_list(sorted(games, key=lambda game: game.GameID), per_page, page)
+    return render_template('browse.html', games=games, counts=counts, filters=filters,
+                           total=matches.bit_count())
+
+
+# Page cache hit/miss counters
+@bp.route('/admin/cache')
+@auth.admin_required
+def cache_stats():
+    return jsonify(page_cache.cache.stats())
+
+
+# Password hashing pool load: queue depth, rejections and average hash time
+@bp.route('/admin/passwords')
+@auth.admin_required
+def password_stats():
+    return jsonify(passwords.pool.stats())
+
+
+# Rating writer load: queued, coalesced and written ratings
+@bp.route('/admin/ratings')
+@auth.admin_required
+def rating_queue_stats():
+    return jsonify(rating_queue.writer.stats())
+
+
+# Search-as-you-type completions, served from memory; a background thread keeps the index up to date
+@bp.route('/search/suggest')
+def search_suggest():
+    query = request.args.get('q', '')
+    limit = min(request.args.get('limit', suggest.SUGGEST_LIMIT, type=int), 20)
+    return jsonify(suggest.index.current().suggest(query, limit=max(limit, 1)))
+
+
+@bp.route('/rate_game/<int:id>', methods=["GET", "POST"])
 def rate_game(id):
     if request.method == "GET":
         abort(404, description="Direct access to this page is not allowed")
@@ -369,39 +643,81 @@ def rate_game(id):
     if id == 0:
         return redirect("/game/0")
 
+    # A missing game is a 404 rather than a failed insert, for the widget's form fallback too
+    if db.session.query(models.Games.GameID).filter_by(GameID=id).first() is None:
+        abort(404, description="Game not found")
+
     value = int(request.form.get("rating", 0))  # Grab rating
 
     # Changes rating if rating already exists
     existing = execute_query(models.Reviews, filters={"UserID": user_id, "GameID": id})
+    old_rating = existing[0].Rating if existing else None
 
+    # Review change and rating stats update share one transaction
     if value == 0:
         if existing:  # Deletes review if rating = 0
-            execute_query(models.Reviews, operation="DELETE", id=existing[0].ReviewID)
+            execute_query(models.Reviews, operation="DELETE", id=existing[0].ReviewID, commit=False)
     elif existing:  # Updates if rating exists
-        execute_query(models.Reviews, operation="UPDATE", id=existing[0].ReviewID, data={"Rating": value})
+        execute_query(models.Reviews, operation="UPDATE", id=existing[0].ReviewID, data={"Rating": value}, commit=False)
     else:  # Creates new rating for user and game
-        execute_query(models.Reviews, operation="INSERT", data={"UserID": user_id, "GameID": id, "Rating": value})
+        execute_query(models.Reviews, operation="INSERT", data={"UserID": user_id, "GameID": id, "Rating": value}, commit=False)
+
+    try:
+        ratings.apply_rating_change(id, old_rating, value or None)
+        db.session.commit()
+    except exc.SQLAlchemyError:
+        db.session.rollback()
+        abort(500, description="Database operation failed")
+
+    # Cached game pages show the rating summary
+    page_cache.cache.invalidate(f"rating:{id}")
+    rating_queue.writer.forget(user_id, id)
 
     # Redirects to current game page
     return redirect("/game/" + str(id))
 
 
-@app.route('/admin/game/add', methods=["GET", "POST"])
-def add_game():
-    # Registered users only
-    if "AccountID" not in session:
-        return redirect("/login")
-
-    # Grab user
-    user = execute_query(models.Accounts, operation="SELECT", filters={"AccountID": session["AccountID"]})
+# JSON endpoint behind the star widget: the rating is queued for the background writer, which coalesces
+# repeated clicks, and the response carries the game's aggregates with it applied. Requiring a JSON body
+# keeps plain cross-site form posts out, as browsers preflight JSON requests.
+@bp.route('/api/games/<int:id>/rating', methods=["POST"])
+def api_rate_game(id):
+    user = auth.current_user()
     if not user:
-        return redirect("/dashboard")
-    elif user:
-        user = user[0]
-        if not user.AccountIsAdmin:
-            # Admin access only
-            return redirect("/dashboard")
-
+        return jsonify(error="Log in to rate games"), 401
+
+    payload = request.get_json(silent=True)
+    value = payload.get("rating") if isinstance(payload, dict) else None
+    if type(value) is not int or not 0 <= value <= 5:
+        return jsonify(error="rating must be a whole number from 0 (clear) to 5"), 400
+
+    # Checked on the primary so a game a lagging replica hasn't seen yet still counts
+    with database.primary():
+        row = db.session.query(models.Games.GameID).filter_by(GameID=id).first()
+    if row is None:
+        return jsonify(error="Game not found"), 404
+
+    rating_queue.writer.submit(user.AccountID, id, value or None)
+    rating_queue.writer.remember(user.AccountID, id, value or None)
+    database.pin_reads(rating_queue.writer.flush_interval)
+    return jsonify(game_id=id, rating=value or None, **rating_queue.writer.projected_stats(id)), 202
+
+
+# Every platform's details and requirements for a game as one JSON document, revalidated with an ETag; it holds
+# nothing per user, so shared caches may keep it as well
+@bp.route('/api/games/<int:id>/platforms')
+def api_game_platforms(id):
+    versions = conditional.game_platform_versions(id)
+    if versions is None:
+        return jsonify(error="Game not found"), 404
+    etag = conditional.weak_etag("platforms", id, tuple(versions))
+    return conditional.respond(etag, conditional.newest(*versions), lambda: jsonify(platform_document(id)),
+                               public=True)
+
+
+@bp.route('/admin/game/add', methods=["GET", "POST"])
+@auth.admin_required
+def add_game():
     form = AdminGameForm()
     form.submit.label.text = "Add Game"
 
@@ -417,78 +733,42 @@ def add_game():
         if form.game_image.data and hasattr(form.game_image.data, "filename"):
             filename = secure_filename(form.game_image.data.filename)
             form.game_image.data.save(os.path.join("app", "static", "images", filename))
+            images.process_image(filename)
             image_filename = filename
 
-        # Insert game data
-        execute_query(models.Games, operation="INSERT", data={
-            "GameName": form.game_name.data,
-            "GameDescription": form.game_description.data,
-            "GameDeveloper": form.game_developer.data,
-            "GameImage": image_filename
-        })
-
-        # Grab ID of new game
-        new_game = execute_query(models.Games, operation="SELECT", filters={"GameName": form.game_name.data})
-        new_game_id = new_game[0].GameID
-
-        # Insert many-to-many relationship IDs
-        for category_id in form.categories.data:
-            execute_query(models.GameCategories, operation="INSERT", data={"GameID": new_game_id, "CategoryID": category_id})
-
-        for platform_id in form.platforms.data:
-            base_game_data = {"GameID": new_game_id, "PlatformID": platform_id}
-            execute_query(models.GamePlatforms, operation="INSERT", data=base_game_data)
-
-            # PC platform
-            if platform_id == 1:
-                # Get both minimum and recommended requirements
-                min_req_data = {"Type": "Minimum",
-                                "OS": form.min_pc_os.data or "N/A",
-                                "RAM": form.min_pc_ram.data or "N/A",
-                                "CPU": form.min_pc_cpu.data or "N/A",
-                                "GPU": form.min_pc_gpu.data or "N/A",
-                                "Storage": form.min_pc_storage.data or "N/A"
-                                }
-                rec_req_data = {"Type": "Recommended",
-                                "OS": form.rec_pc_os.data or "N/A",
-                                "RAM": form.rec_pc_ram.data or "N/A",
-                                "CPU": form.rec_pc_cpu.data or "N/A",
-                                "GPU": form.rec_pc_gpu.data or "N/A",
-                                "Storage": form.rec_pc_storage.data or "N/A"
-                                }
-
-                # Insert both types
-                execute_query(models.SystemRequirements, operation="INSERT", data=base_game_data | min_req_data)
-                execute_query(models.SystemRequirements, operation="INSERT", data=base_game_data | rec_req_data)
-            # Console platform
-            else:
-                # Get console data using ternary operations
-                normal_req_data = {"Type": "Normal",
-                                   "OS": (form.ps_os.data if platform_id == 2 else form.xb_os.data) or "N/A",
-                                   "RAM": "N/A",
-                                   "CPU": "N/A",
-                                   "GPU": "N/A",
-                                   "Storage": (form.ps_storage.data if platform_id == 2 else form.xb_storage.data) or "N/A"
-                                   }
-                execute_query(models.SystemRequirements, operation="INSERT", data=base_game_data | normal_req_data)
-
-            # Get raw data using ternary operations for PlatformID
-            raw_price = (form.pc_price.data if platform_id == 1 else
-                         form.ps_price.data if platform_id == 2 else
-                         form.xb_price.data)
-            raw_release_date = (form.pc_release_date.data if platform_id == 1 else
-                                form.ps_release_date.data if platform_id == 2 else
-                                form.xb_release_date.data)
-
-            # Load into dictionary of proper data type
-            price_data = {
-                "Price": float(raw_price) if raw_price not in [None, ""] else -1,
-                "ReleaseDate": raw_release_date.isoformat() if raw_release_date else "1900-01-01"
-            }
-            execute_query(models.GamePlatformDetails, operation="INSERT", data=base_game_data | price_data)
+        # Write the game and every row describing it in one transaction
+        with UnitOfWork() as work:
+            new_game_id = work.insert(models.Games, {
+                "GameName": form.game_name.data,
+                "GameDescription": form.game_description.data,
+                "GameDeveloper": form.game_developer.data,
+                "GameImage": image_filename
+            })
+
+            # Start its rating stats at zero so it appears when sorting by rating
+            work.insert(models.GameRatingStats, {"GameID": new_game_id})
+
+            # Insert many-to-many relationship IDs, requirements and prices
+            work.insert_many(models.GameCategories, [{"GameID": new_game_id, "CategoryID": category_id}
+                                                     for category_id in form.categories.data])
+            work.insert_many(models.GamePlatforms, [{"GameID": new_game_id, "PlatformID": platform_id}
+                                                    for platform_id in form.platforms.data])
+            work.insert_many(models.SystemRequirements, [row for platform_id in form.platforms.data
+                                                         for row in requirement_rows(form, new_game_id, platform_id)])
+            work.insert_many(models.GamePlatformDetails, [price_row(form, new_game_id, platform_id)
+                                                          for platform_id in form.platforms.data])
+
+            # Make the new game searchable, and give the category and platform pages listing it new versions
+            game_search.index_game(new_game_id, commit=False)
+            conditional.touch(models.Categories, form.categories.data, commit=False)
+            conditional.touch(models.Platforms, form.platforms.data, commit=False)
+
+        suggest.index.add_game(new_game_id, form.game_name.data, form.game_developer.data)
+        page_cache.cache.invalidate(*[f"category:{category_id}" for category_id in form.categories.data],
+                                    *[f"platform:{platform_id}" for platform_id in form.platforms.data])
 
         # Redirect to game upon adding
-        flash(f"Game {new_game[0].GameName} created successfully", "success")
+        flash(f"Game {form.game_name.data} created successfully", "success")
         return redirect("/game/" + str(new_game_id))
     else:
         print("Form errors:", form.errors)
@@ -496,27 +776,14 @@ def add_game():
     return render_template("admin.html", form=form, form_action="/admin/game/add", form_type="INSERT")
 
 
-@app.route('/admin/game/update/', defaults={'id': None}, methods=["GET", "POST"])
-@app.route('/admin/game/update/<int:id>', methods=["GET", "POST"])
+@bp.route('/admin/game/update/', defaults={'id': None}, methods=["GET", "POST"])
+@bp.route('/admin/game/update/<int:id>', methods=["GET", "POST"])
+@auth.admin_required
 def update_game(id):
-    # Registered users only
-    if "AccountID" not in session:
-        return redirect("/login")
-
     # Redirect users to show all games (ID 0 doesn't exist)
     if id == 0:
         return redirect("/game/0")
 
-    # Grab user
-    user = execute_query(models.Accounts, operation="SELECT", filters={"AccountID": session["AccountID"]})
-    if not user:
-        return redirect("/dashboard")
-    elif user:
-        user = user[0]
-        if not user.AccountIsAdmin:
-            # Admin access only
-            return redirect("/dashboard")
-
     # Check game existence
     game = execute_query(models.Games, operation="SELECT", id=id)
     if not game:
@@ -602,120 +869,60 @@ def update_game(id):
         if form.game_image.data and hasattr(form.game_image.data, "filename"):
             filename = secure_filename(form.game_image.data.filename)
             form.game_image.data.save(os.path.join("app", "static", "images", filename))
+            images.process_image(filename)
             image_filename = filename
         else:
             image_filename = game.GameImage
 
-        # Update existing game data
-        execute_query(models.Games, operation="UPDATE", id=id, data={
-            "GameName": form.game_name.data,
-            "GameDescription": form.game_description.data,
-            "GameDeveloper": form.game_developer.data,
-            "GameImage": image_filename
-        })
-
-        # Delete and reinsert M2M GameCategories table
-        execute_query(models.GameCategories, operation="DELETE", filters={"GameID": id})
-        for category_id in form.categories.data:
-            execute_query(models.GameCategories, operation="INSERT", data={"GameID": id, "CategoryID": category_id})
-
-        # Get old PlatformIDs and new PlatformIDs
-        current_platforms = execute_query(models.GamePlatforms, operation="SELECT", filters={"GameID": id})
-        current_platform_ids = [platform.PlatformID for platform in current_platforms]
+        # Old links decide which rows to delete and which listings change
+        old_category_ids = [category.CategoryID for category in execute_query(models.GameCategories, operation="SELECT", filters={"GameID": id})]
+        current_platform_ids = [platform.PlatformID for platform in execute_query(models.GamePlatforms, operation="SELECT", filters={"GameID": id})]
         new_platform_ids = form.platforms.data
-
-        # Remove all removed IDs from respective tables
-        remove_platforms = set(current_platform_ids) - set(new_platform_ids)
-        for platform_id in remove_platforms:
-            execute_query(models.GamePlatforms, operation="DELETE", filters={"GameID": id, "PlatformID": platform_id})
-            execute_query(models.SystemRequirements, operation="DELETE", filters={"GameID": id, "PlatformID": platform_id})
-            execute_query(models.GamePlatformDetails, operation="DELETE", filters={"GameID": id, "PlatformID": platform_id})
-
-        # Update data based on PlaformID
-        for platform_id in form.platforms.data:
-            base_game_data = {"GameID": id, "PlatformID": platform_id}
-
-            # Insert new PlatformID if doesn't exist in old
-            if platform_id not in current_platform_ids:
-                execute_query(models.GamePlatforms, operation="INSERT", data=base_game_data)
-
-            # PC platform
-            if platform_id == 1:
-                # Check if minimum requirements exist
-                min_req_exist = execute_query(models.SystemRequirements, operation="SELECT", filters={
-                    "GameID": id, "PlatformID": platform_id, "Type": "Minimum"})
-                min_req_data = {"Type": "Minimum",
-                                "OS": form.min_pc_os.data or "N/A",
-                                "RAM": form.min_pc_ram.data or "N/A",
-                                "CPU": form.min_pc_cpu.data or "N/A",
-                                "GPU": form.min_pc_gpu.data or "N/A",
-                                "Storage": form.min_pc_storage.data or "N/A"
-                                }
-
-                # Update if minimum requirements exist, otherwise insert
-                if min_req_exist:
-                    execute_query(models.SystemRequirements, operation="UPDATE", id=min_req_exist[0].RequirementsID, data=min_req_data)
-                else:
-                    execute_query(models.SystemRequirements, operation="INSERT", data=base_game_data | min_req_data)
-
-                # Ditto for recommended requirement existence
-                rec_req_exist = execute_query(models.SystemRequirements, operation="SELECT", filters={
-                    "GameID": id, "PlatformID": platform_id, "Type": "Recommended"})
-                rec_req_data = {"Type": "Recommended",
-                                "OS": form.rec_pc_os.data or "N/A",
-                                "RAM": form.rec_pc_ram.data or "N/A",
-                                "CPU": form.rec_pc_cpu.data or "N/A",
-                                "GPU": form.rec_pc_gpu.data or "N/A",
-                                "Storage": form.rec_pc_storage.data or "N/A"
-                                }
-
-                # Ditto for data update/insert
-                if rec_req_exist:
-                    execute_query(models.SystemRequirements, operation="UPDATE", id=rec_req_exist[0].RequirementsID, data=rec_req_data)
-                else:
-                    execute_query(models.SystemRequirements, operation="INSERT", data=base_game_data | rec_req_data)
-            # Console platforms
-            else:
-                # Check if normal requirements exist
-                normal_req_exist = execute_query(models.SystemRequirements, operation="SELECT", filters={
-                    "GameID": id, "PlatformID": platform_id, "Type": "Normal"})
-                normal_req_data = {"Type": "Normal",
-                                   "OS": (form.ps_os.data if platform_id == 2 else form.xb_os.data) or "N/A",
-                                   "RAM": "N/A",
-                                   "CPU": "N/A",
-                                   "GPU": "N/A",
-                                   "Storage": (form.ps_storage.data if platform_id == 2 else form.xb_storage.data) or "N/A"
-                                   }
-
-                # Update if exist, otherwise insert
-                if normal_req_exist:
-                    execute_query(models.SystemRequirements, operation="UPDATE", id=normal_req_exist[0].RequirementsID, data=normal_req_data)
-                else:
-                    execute_query(models.SystemRequirements, operation="INSERT", data=base_game_data | normal_req_data)
-
-            # Check if price details exist
-            price_detail_exist = execute_query(models.GamePlatformDetails, operation="SELECT", filters={
-                "GameID": id, "PlatformID": platform_id})
-
-            # Get raw data using ternary operations for PlatformID
-            raw_price = (form.pc_price.data if platform_id == 1 else
-                         form.ps_price.data if platform_id == 2 else
-                         form.xb_price.data)
-            raw_release_date = (form.pc_release_date.data if platform_id == 1 else
-                                form.ps_release_date.data if platform_id == 2 else
-                                form.xb_release_date.data)
-
-            # Load into dictionary of proper data type
-            price_data = {
-                "Price": float(raw_price) if raw_price not in [None, ""] else -1,
-                "ReleaseDate": raw_release_date.isoformat() if raw_release_date else "1900-01-01"
-            }
-
-            # Update if exist, otherwise insert
-            if price_detail_exist:
-                execute_query(models.GamePlatformDetails, operation="UPDATE", filters={"GameID": id, "PlatformID": platform_id}, data=price_data)
-            else:
-                execute_query(models.GamePlatformDetails, operation="INSERT", data=base_game_data | price_data)
+        remove_platforms = list(set(current_platform_ids) - set(new_platform_ids))
+
+        # Apply the whole edit as one transaction
+        with UnitOfWork() as work:
+            work.update(models.Games, {
+                "GameName": form.game_name.data,
+                "GameDescription": form.game_description.data,
+                "GameDeveloper": form.game_developer.data,
+                "GameImage": image_filename
+            }, GameID=id)
+
+            # Delete and reinsert M2M GameCategories table
+            work.delete(models.GameCategories, GameID=id)
+            work.insert_many(models.GameCategories, [{"GameID": id, "CategoryID": category_id}
+                                                     for category_id in form.categories.data])
+
+            # Remove all removed platforms from respective tables, then add the new ones
+            if remove_platforms:
+                for model in [models.GamePlatforms, models.SystemRequirements, models.GamePlatformDetails]:
+                    work.delete(model, GameID=id, PlatformID=remove_platforms)
+            work.insert_many(models.GamePlatforms, [{"GameID": id, "PlatformID": platform_id}
+                                                    for platform_id in new_platform_ids
+                                                    if platform_id not in current_platform_ids])
+
+            # Update requirements and prices that exist, insert the rest
+            work.upsert_many(models.SystemRequirements, [row for platform_id in new_platform_ids
+                                                         for row in requirement_rows(form, id, platform_id)],
+                             keys=["GameID", "PlatformID", "Type"])
+            work.upsert_many(models.GamePlatformDetails, [price_row(form, id, platform_id)
+                                                          for platform_id in new_platform_ids],
+                             keys=["GameID", "PlatformID"])
+
+            # Refresh the game's search entry, and give the game page (its details and requirements may be all
+            # that changed) and every listing that showed it before or shows it now new versions
+            game_search.index_game(id, commit=False)
+            conditional.touch(models.Games, [id], commit=False)
+            conditional.touch(models.Categories, set(old_category_ids) | set(form.categories.data), commit=False)
+            conditional.touch(models.Platforms, set(current_platform_ids) | set(new_platform_ids), commit=False)
+
+        suggest.index.update_game(id, form.game_name.data, form.game_developer.data)
+
+        # Drop the game page and every listing that showed it, plus listings it now joins
+        page_cache.cache.invalidate(f"game:{id}",
+                                    *[f"category:{category_id}" for category_id in form.categories.data],
+                                    *[f"platform:{platform_id}" for platform_id in form.platforms.data])
 
         # Redirect to game upon updating
         flash(f"Game {form.game_name.data} updated successfully", "success")
@@ -726,24 +933,22 @@ def update_game(id):
     return render_template("admin.html", form=form, form_action=f"/admin/game/update/{id}", form_type="UPDATE")
 
 
-@app.route("/admin/game/delete/<int:id>")
+@bp.route("/admin/game/delete/<int:id>")
+@auth.admin_required
 def delete_game(id):
     game = None
-    if "AccountID" not in session:
-        return redirect("/login")
-
     if id == 0:
         return redirect("/game/0")
 
-    user = execute_query(models.Accounts, operation="SELECT", filters={"AccountID": session["AccountID"]})
-    if not user:
-        return redirect("/dashboard")
-    elif user:
-        user = user[0]
-        if not user.AccountIsAdmin:
-            return redirect("/dashboard")
-
-    game = execute_query(models.Games, operation="SELECT", id=id)
-    execute_query(models.Games, operation="DELETE", id=game.GameID)
+    game = execute_query(models.Games, operation="SELECT", id=id)[0]
+    category_ids = [category.CategoryID for category in execute_query(models.GameCategories, operation="SELECT", filters={"GameID": id})]
+    platform_ids = [platform.PlatformID for platform in execute_query(models.GamePlatforms, operation="SELECT", filters={"GameID": id})]
+    with UnitOfWork():
+        execute_query(models.Games, operation="DELETE", id=game.GameID, commit=False)
+        game_search.remove_game(game.GameID, commit=False)
+        conditional.touch(models.Categories, category_ids, commit=False)
+        conditional.touch(models.Platforms, platform_ids, commit=False)
+    suggest.index.remove_game(game.GameID)
+    page_cache.cache.invalidate(f"game:{game.GameID}")
     flash("Game Deleted", "success")
     return redirect("/game/0")
@@ -0,0 +1,113 @@
+import re
+
+from sqlalchemy import text
+
+from app.extensions import db
+import app.database as database
+import app.models as models
+
+# FTS5 table mirroring the searchable text of every game, rowid = GameID
+SEARCH_TABLE = "GamesSearch"
+
+# BM25 column weights: GameName, GameDescription, GameDeveloper, Categories
+BM25_WEIGHTS = (10.0, 1.0, 4.0, 2.0)
+
+# Shared SELECT that flattens a game and its category names into one row
+INDEX_SOURCE = """
+    SELECT Games.GameID, Games.GameName, Games.GameDescription,
+           Games.GameDeveloper,
+           (SELECT group_concat(Categories.CategoryName, ' ')
+              FROM GameCategories
+              JOIN Categories
+                ON Categories.CategoryID = GameCategories.CategoryID
+             WHERE GameCategories.GameID = Games.GameID)
+      FROM Games
+"""
+
+
+def create_index():
+    # Prefix indexes on 2 and 3 characters keep short "eld*" lookups cheap
+    db.session.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+        "GameName, GameDescription, GameDeveloper, Categories, "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    ))
+
+
+def rebuild_index():
+    # Repopulate the whole index from the Games table
+    db.session.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    db.session.execute(text(
+        f"INSERT INTO {SEARCH_TABLE}"
+        "(rowid, GameName, GameDescription, GameDeveloper, Categories)"
+        + INDEX_SOURCE
+    ))
+    db.session.commit()
+
+
+def ensure_index():
+    # Create the index on first start and rebuild it if it drifted
+    database.require_sqlite(db.engine)
+    create_index()
+    indexed = db.session.execute(
+        text(f"SELECT count(*) FROM {SEARCH_TABLE}")).scalar()
+    total = db.session.execute(text("SELECT count(*) FROM Games")).scalar()
+    if indexed != total:
+        rebuild_index()
+    else:
+        db.session.commit()
+
+
+def index_game(game_id, commit=True):
+    # Replace a single game's entry after it was added or updated
+    db.session.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :id"),
+                       {"id": game_id})
+    db.session.execute(text(
+        f"INSERT INTO {SEARCH_TABLE}"
+        "(rowid, GameName, GameDescription, GameDeveloper, Categories)"
+        + INDEX_SOURCE + " WHERE Games.GameID = :id"
+    ), {"id": game_id})
+    if commit:
+        db.session.commit()
+
+
+def remove_game(game_id, commit=True):
+    db.session.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :id"),
+                       {"id": game_id})
+    if commit:
+        db.session.commit()
+
+
+def build_match(query):
+    # Every word must match, and the last word may be a prefix of a longer one
+    words = re.findall(r"\w+", query.lower())
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words[:-1]]
+    terms.append(f'"{words[-1]}"*')
+    return " ".join(terms)
+
+
+def search_game_ids(query, limit=None, offset=0):
+    match = build_match(query)
+    if match is None:
+        return []
+    weights = ", ".join(str(weight) for weight in BM25_WEIGHTS)
+    sql = (f"SELECT rowid FROM {SEARCH_TABLE}"
+           f" WHERE {SEARCH_TABLE} MATCH :match"
+           f" ORDER BY bm25({SEARCH_TABLE}, {weights})")
+    params = {"match": match}
+    if limit is not None:
+        sql += " LIMIT :limit OFFSET :offset"
+        params |= {"limit": limit, "offset": offset}
+    return [row[0] for row in db.session.execute(text(sql), params)]
+
+
+def search_games(query, limit=None, offset=0):
+    # Load the ranked games in one IN query, then restore the BM25 order
+    game_ids = search_game_ids(query, limit=limit, offset=offset)
+    if not game_ids:
+        return []
+    games = models.Games.query.filter(models.Games.GameID.in_(game_ids)).all()
+    rank = {game_id: position for position, game_id in enumerate(game_ids)}
+    return sorted(games, key=lambda game: rank[game.GameID])
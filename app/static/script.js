@@ -20,6 +20,139 @@ function delete_account() {
 function delete_game(id) {
     // Warning message asking for confirmation of game deletion
     if (confirm("Are you sure you want to delete this game? This action cannot be undone!")) {
-        window.location.href = "/admin/game/delete/${id}";
+        window.location.href = `/admin/game/delete/${id}`;
     }
+}
+
+let suggest_timer = null;
+function suggest_games(input) {
+    // Fill the search box's datalist with completions while the user types
+    clearTimeout(suggest_timer);
+    suggest_timer = setTimeout(() => {
+        const list = document.getElementById("search_suggestions");
+        const query = input.value.trim();
+        if (!query) {
+            list.innerHTML = "";
+            return;
+        }
+        fetch(`/search/suggest?q=${encodeURIComponent(query)}`)
+            .then(response => response.json())
+            .then(suggestions => {
+                list.innerHTML = "";
+                suggestions.forEach(suggestion => {
+                    const option = document.createElement("option");
+                    option.value = suggestion.label;
+                    list.appendChild(option);
+                });
+            });
+    }, 100);
+}
+
+function submit_rating(input) {
+    // Send the rating as JSON and redraw the summary in place, falling back to a normal form post
+    const form = input.form;
+    fetch(`/api/games/${form.dataset.gameId}/rating`, {
+        method: "POST",
+        headers: {"Content-Type": "application/json"},
+        body: JSON.stringify({rating: Number(input.value)}),
+    })
+        .then(response => {
+            if (!response.ok) {
+                throw new Error(response.statusText);
+            }
+            return response.json();
+        })
+        .then(show_rating_stats)
+        .catch(() => form.submit());
+}
+
+function show_rating_stats(stats) {
+    // Same markup as the rating summary in individual_games.html
+    const container = document.getElementById("rating_stats");
+    if (!container) {
+        return;
+    }
+    if (!stats.count) {
+        container.innerHTML = '<p class="rating_summary">No ratings yet</p>';
+        return;
+    }
+    const rows = stats.histogram
+        .map(([star, votes]) => `<tr><td>${star}&#9733;</td><td>${votes}</td></tr>`)
+        .join("");
+    container.innerHTML = `<p class="rating_summary">&#9733; ${stats.average.toFixed(1)} from ${stats.count} ` +
+        `rating${stats.count !== 1 ? "s" : ""}</p><table class="rating_histogram">${rows}</table>`;
+}
+
+function escape_html(text) {
+    const element = document.createElement("span");
+    element.textContent = text;
+    return element.innerHTML;
+}
+
+function show_platform(select) {
+    // Redraw the requirements and details tables from the JSON embedded in the game page, using the
+    // same markup as individual_games.html; without it, post the form as before
+    const data = document.getElementById("platform_data");
+    if (!data) {
+        select.form.submit();
+        return;
+    }
+    const platform = JSON.parse(data.textContent).platforms[select.value];
+    const empty = "<p>No data available yet</p>";
+
+    const requirements = platform.requirements;
+    let table = empty;
+    if (requirements.length) {
+        const headings = requirements.map(row => `<th>${escape_html(row.Type)}</th>`).join("");
+        const rows = ["OS", "RAM", "CPU", "GPU", "Storage"]
+            .filter(field => requirements[0][field] !== "N/A")
+            .map(field => `<tr><td>${field}</td>` +
+                requirements.map(row => `<td>${escape_html(row[field] ?? "None")}</td>`).join("") + "</tr>")
+            .join("");
+        table = `<table><tr><th>System Requirement</th>${headings}</tr>${rows}</table><br>`;
+    }
+    document.getElementById("system_requirements").innerHTML = table;
+
+    const details = platform.details.map(row => {
+        const price = typeof row.Price === "number" && row.Price >= 0 ? `$${row.Price.toFixed(2)}` : "N/A";
+        const release = row.ReleaseDate !== "1900-01-01" ? escape_html(row.ReleaseDate) : "TBA";
+        return "<table><tr><th>Label</th><th>Value</th></tr>" +
+            `<tr><td>Price (NZD)</td><td>${price}</td></tr>` +
+            `<tr><td>Release Date</td><td>${release}</td></tr></table>`;
+    }).join("");
+    document.getElementById("platform_details").innerHTML = details ? `<ul>${details}</ul>` : empty;
+}
+
+let facet_timer = null;
+function update_facets(form) {
+    // Redraw every facet count and the result total for the boxes ticked now, without reloading the games
+    clearTimeout(facet_timer);
+    facet_timer = setTimeout(() => {
+        const params = new URLSearchParams(new FormData(form));
+        [...params.keys()].forEach(key => {
+            if (!params.get(key)) {
+                params.delete(key);
+            }
+        });
+        params.set("fields", "GameID");
+        params.set("limit", "1");
+        fetch(`/api/v1/browse?${params}`)
+            .then(response => response.json())
+            .then(result => {
+                if (!result.facets) {
+                    return;
+                }
+                const keys = {categories: "id", platforms: "id", prices: null, years: "year"};
+                Object.entries(keys).forEach(([facet, key]) => {
+                    result.facets[facet].forEach((value, index) => {
+                        const count = form.querySelector(
+                            `.facet_count[data-facet="${facet}"][data-key="${key ? value[key] : index}"]`);
+                        if (count) {
+                            count.textContent = value.count;
+                        }
+                    });
+                });
+                document.getElementById("browse_total").textContent = `Show ${result.total} games`;
+            });
+    }, 100);
 }
\ No newline at end of file
@@ -0,0 +1,290 @@
+import bisect
+import os
+import re
+import threading
+import time
+import unicodedata
+from datetime import timedelta
+from urllib.parse import quote
+
+from sqlalchemy import func, select
+
+from app.extensions import db
+import app.generations as generations
+import app.models as models
+
+# Default number of completions returned per keystroke
+SUGGEST_LIMIT = 8
+
+# Upper bound on keys inspected per lookup so short prefixes stay cheap
+SCAN_LIMIT = 64
+
+# Display order when two completions are otherwise equal
+KIND_ORDER = {"game": 0, "category": 1, "developer": 2}
+
+# Changed games are read from this long before the newest edit already seen,
+# in case a slow transaction commits an older UpdatedAt after a newer one
+REFRESH_OVERLAP = timedelta(seconds=60)
+
+# More changed games than this and one full rebuild beats inserting each
+REBUILD_THRESHOLD = 1000
+
+# Seconds between background checks for writes made by processes outside
+# the server, e.g. `flask games import`; 0 turns the checks off
+DEFAULT_REFRESH_INTERVAL = 2.0
+
+
+def normalize(value):
+    # Lowercase and strip accents/punctuation so "Ragnarök" matches "ragnarok"
+    value = unicodedata.normalize("NFKD", value or "")
+    value = "".join(char for char in value if not unicodedata.combining(char))
+    return " ".join(re.findall(r"\w+", value.lower()))
+
+
+def name_keys(label):
+    # One key per word start, so "ring" also completes "Elden Ring"
+    words = normalize(label).split()
+    return [(" ".join(words[offset:]), offset) for offset in range(len(words))]
+
+
+def index_version():
+    # Newest game edit and newest game, plus the category and platform stamps
+    # every game add, edit, delete and import bumps; four index lookups
+    return tuple(db.session.execute(select(
+        select(func.max(models.Games.UpdatedAt)).scalar_subquery(),
+        select(func.max(models.Games.GameID)).scalar_subquery(),
+        select(func.max(models.Categories.UpdatedAt)).scalar_subquery(),
+        select(func.max(models.Platforms.UpdatedAt)).scalar_subquery(),
+    )).one())
+
+
+class SuggestIndex:
+    # Sorted (key, label, kind, url, word offset) tuples searched with bisect
+    def __init__(self):
+        self._keys = []
+        self._games = {}  # GameID -> (name, developer)
+        self._developers = {}  # Developer name -> number of games using it
+        self._categories = {}  # CategoryID -> name
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self.version = None  # index_version() the contents reflect
+        self.app = None
+        self.refresh_interval = DEFAULT_REFRESH_INTERVAL
+        self._thread = None
+        self._pid = None
+        # generations.current("catalogue") last caught up with
+        self._generation = None
+
+    def init_app(self, app):
+        self.app = app
+        self.refresh_interval = app.config.get("SUGGEST_REFRESH_INTERVAL",
+                                               DEFAULT_REFRESH_INTERVAL)
+
+    def _insert(self, label, kind, url):
+        for key, offset in name_keys(label):
+            bisect.insort(self._keys, (key, label, kind, url, offset))
+
+    @staticmethod
+    def _entries(label, kind, url):
+        return [(key, label, kind, url, offset)
+                for key, offset in name_keys(label)]
+
+    def _remove(self, label, kind, url):
+        for key, offset in name_keys(label):
+            entry = (key, label, kind, url, offset)
+            position = bisect.bisect_left(self._keys, entry)
+            if position < len(self._keys) and self._keys[position] == entry:
+                del self._keys[position]
+
+    def _add_developer(self, developer):
+        if not developer:
+            return
+        self._developers[developer] = self._developers.get(developer, 0) + 1
+        if self._developers[developer] == 1:
+            self._insert(developer, "developer", developer_url(developer))
+
+    def _remove_developer(self, developer):
+        if not developer or developer not in self._developers:
+            return
+        self._developers[developer] -= 1
+        if self._developers[developer] == 0:
+            del self._developers[developer]
+            self._remove(developer, "developer", developer_url(developer))
+
+    def build(self, version=None):
+        # Load every game and category name; later edits are incremental.
+        # The version is read first so writes made meanwhile are caught up.
+        self._generation = generations.current("catalogue")
+        version = version or index_version()
+        games = models.Games.query.with_entities(
+            models.Games.GameID, models.Games.GameName,
+            models.Games.GameDeveloper).all()
+        categories = models.Categories.query.with_entities(
+            models.Categories.CategoryID, models.Categories.CategoryName).all()
+        # Collect every key and sort once; insort per key is quadratic
+        keys, names, developers = [], {}, {}
+        for game_id, name, developer in games:
+            names[game_id] = (name, developer)
+            keys += self._entries(name, "game", f"/game/{game_id}")
+            if developer:
+                developers[developer] = developers.get(developer, 0) + 1
+        keys += [entry for developer in developers for entry in
+                 self._entries(developer, "developer",
+                               developer_url(developer))]
+        for category_id, name in categories:
+            keys += self._entries(name, "category", f"/category/{category_id}")
+        keys.sort()
+        with self._lock:
+            self._keys = keys
+            self._games = names
+            self._developers = developers
+            self._categories = dict(categories)
+            self.version = version
+
+    def current(self):
+        # Keystrokes are answered from memory alone. This process's own edits
+        # go in through add_game/update_game/remove_game, which also bump the
+        # shared catalogue generation: the first keystroke another worker
+        # serves after that catches up with one check(). A background thread
+        # catches up with processes outside the server every
+        # refresh_interval seconds.
+        self._start()
+        generation = generations.current("catalogue")
+        if generation != self._generation:
+            self._generation = generation
+            self.check()
+        return self
+
+    def _start(self):
+        # One refresher thread per process, started with the first lookup
+        if not self.refresh_interval or self.app is None or \
+                (self._thread is not None and self._pid == os.getpid()):
+            return
+        with self._refresh_lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, daemon=True,
+                                            name="suggest-refresh")
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.refresh_interval)
+            with self.app.app_context():
+                try:
+                    self.check()
+                except Exception:
+                    self.app.logger.exception("Suggest index refresh failed")
+                finally:
+                    db.session.remove()
+
+    def check(self):
+        # Catch up with the database; one small query when nothing changed
+        version = index_version()
+        if version != self.version:
+            with self._refresh_lock:
+                if version != self.version:
+                    self.refresh(version)
+
+    def refresh(self, version):
+        previous = self.version
+        if previous is None or previous[0] is None:
+            self.build(version)
+            return
+        changed = []
+        if version[0] != previous[0]:
+            changed = models.Games.query.with_entities(
+                models.Games.GameID, models.Games.GameName,
+                models.Games.GameDeveloper,
+            ).filter(models.Games.UpdatedAt >= previous[0] - REFRESH_OVERLAP
+                     ).all()
+            if len(changed) > REBUILD_THRESHOLD:
+                self.build(version)
+                return
+        game_ids, categories = None, None
+        if version[1:] != previous[1:]:
+            # Deletes and category renames only show in these stamps
+            game_ids = set(db.session.scalars(select(models.Games.GameID)))
+            categories = dict(models.Categories.query.with_entities(
+                models.Categories.CategoryID,
+                models.Categories.CategoryName).all())
+        with self._lock:
+            for game_id, name, developer in changed:
+                if self._games.get(game_id) != (name, developer):
+                    self._put_game(game_id, name, developer)
+            if game_ids is not None:
+                for game_id in set(self._games) - game_ids:
+                    self._remove_game(game_id)
+            if categories is not None:
+                for category_id, name in self._categories.items():
+                    if categories.get(category_id) != name:
+                        self._remove(name, "category",
+                                     f"/category/{category_id}")
+                for category_id, name in categories.items():
+                    if self._categories.get(category_id) != name:
+                        self._insert(name, "category",
+                                     f"/category/{category_id}")
+                self._categories = categories
+            self.version = version
+
+    def add_game(self, game_id, name, developer):
+        with self._lock:
+            self._put_game(game_id, name, developer)
+        generations.bump("catalogue")
+
+    def _put_game(self, game_id, name, developer):
+        self._remove_game(game_id)
+        self._games[game_id] = (name, developer)
+        self._insert(name, "game", f"/game/{game_id}")
+        self._add_developer(developer)
+
+    # Updating is a replace of the old name/developer pair
+    update_game = add_game
+
+    def remove_game(self, game_id):
+        with self._lock:
+            self._remove_game(game_id)
+        generations.bump("catalogue")
+
+    def _remove_game(self, game_id):
+        if game_id not in self._games:
+            return
+        name, developer = self._games.pop(game_id)
+        self._remove(name, "game", f"/game/{game_id}")
+        self._remove_developer(developer)
+
+    def suggest(self, prefix, limit=SUGGEST_LIMIT):
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        with self._lock:
+            position = bisect.bisect_left(self._keys, (prefix,))
+            matches = []
+            end = position + SCAN_LIMIT
+            for key, label, kind, url, offset in self._keys[position:end]:
+                if not key.startswith(prefix):
+                    break
+                # Whole-name matches rank above matches on a later word
+                matches.append((offset > 0, KIND_ORDER[kind], key,
+                                label, kind, url))
+
+        results = []
+        seen = set()
+        for *_, label, kind, url in sorted(matches):
+            if (label, kind) in seen:
+                continue
+            seen.add((label, kind))
+            results.append({"label": label, "type": kind, "url": url})
+            if len(results) == limit:
+                break
+        return results
+
+
+def developer_url(developer):
+    return "/search?query=" + quote(developer)
+
+
+# Process-wide index used by the /search/suggest endpoint, configured by
+# create_app()
+index = SuggestIndex()
@@ -0,0 +1,127 @@
+# Page readers running alongside a stream of rate_game writes, each in its
+# own process, on a copy of app/games.db. Compare the default WAL setup with
+# the old rollback journal:
+#   python benchmarks/concurrent_reads.py
+#   python benchmarks/concurrent_reads.py --journal-mode DELETE
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+READ_URLS = ["/game/{id}", "/game/0?sort=rating", "/platform/1", "/category/1"]
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def summary(name, samples, seconds):
+    milliseconds = [sample * 1000 for sample in samples]
+    return (f"{name:<7}{len(samples):>8}{len(samples) / seconds:>10.0f}"
+            f"{statistics.median(milliseconds) if milliseconds else 0:>10.1f}"
+            f"{percentile(milliseconds, 0.99):>10.1f}"
+            f"{max(milliseconds, default=0):>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--journal-mode", default="WAL",
+                        help="DELETE reproduces the old default setup")
+    args = parser.parse_args()
+
+    # Point the app at a scratch copy before it is imported
+    scratch = tempfile.mkdtemp()
+    shutil.copy(os.path.join(ROOT, "app", "games.db"), scratch)
+    os.environ["GAMES_SQLALCHEMY_DATABASE_URI"] = \
+        "sqlite:///" + os.path.join(scratch, "games.db")
+    os.environ["GAMES_PAGE_CACHE_SIZE"] = "0"  # Every read hits the database
+    if args.journal_mode.upper() != "WAL":
+        os.environ["GAMES_SQLITE_PRAGMAS"] = json.dumps(
+            {"journal_mode": args.journal_mode, "synchronous": "FULL"})
+
+    sys.path.insert(0, ROOT)
+    from app import create_app
+    from app.extensions import db
+    import app.models as models
+
+    app = create_app()
+    with app.app_context():
+        account = models.Accounts("benchmark", "x", 0)
+        db.session.add(account)
+        db.session.commit()
+        account_id = account.AccountID
+        game_ids = [game_id for (game_id,) in
+                    db.session.query(models.Games.GameID)]
+
+    def worker(role, deadline, results):
+        # Forked children must not share the parent's pooled connections
+        with app.app_context():
+            db.engine.dispose(close=False)
+        client = app.test_client()
+        if role == "writes":
+            with client.session_transaction() as session:
+                session["AccountID"] = account_id
+                session["AccountUsername"] = "benchmark"
+        samples, errors = [], []
+        while time.time() < deadline:
+            game_id = random.choice(game_ids)
+            started = time.perf_counter()
+            if role == "writes":
+                url = f"/rate_game/{game_id}"
+                status = client.post(url, data={
+                    "rating": random.randint(1, 5)}).status_code
+                ok = status == 302
+            else:
+                url = random.choice(READ_URLS).format(id=game_id)
+                status = client.get(url).status_code
+                ok = status == 200
+            samples.append(time.perf_counter() - started)
+            if not ok:
+                errors.append((url, status))
+        results.put((role, samples, errors))
+
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    deadline = time.time() + args.seconds
+    roles = ["reads"] * args.readers + ["writes"]
+    processes = [context.Process(target=worker,
+                                 args=(role, deadline, results))
+                 for role in roles]
+    for process in processes:
+        process.start()
+    samples = {"reads": [], "writes": []}
+    errors = []
+    for _ in processes:
+        role, role_samples, role_errors = results.get()
+        samples[role] += role_samples
+        errors += role_errors
+    for process in processes:
+        process.join()
+
+    with app.app_context():
+        mode = db.session.execute(db.text("PRAGMA journal_mode")).scalar()
+    print(f"journal_mode={mode}, {args.readers} readers, 1 writer, "
+          f"{args.seconds:.0f}s")
+    print(f"{'':<7}{'count':>8}{'per sec':>10}{'p50 ms':>10}{'p99 ms':>10}"
+          f"{'max ms':>10}")
+    print(summary("reads", samples["reads"], args.seconds))
+    print(summary("writes", samples["writes"], args.seconds))
+    if errors:
+        print(f"{len(errors)} failed requests, e.g. {errors[:3]}")
+    shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+# Latency, throughput and queries per request for the hot routes, on a
+# synthetic database seeded by benchmarks/seed.py, written as JSON so runs
+# from different commits can be compared:
+#   python benchmarks/hot_routes.py --scale 10k --output before.json
+#   python benchmarks/hot_routes.py --scale 10k --compare before.json
+# --http drives a real threaded HTTP server with concurrent clients instead
+# of calling the app through the Flask test client.
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARKS)
+sys.path.insert(0, BENCHMARKS)
+
+import seed  # noqa: E402
+
+# Changes larger than this fraction count as regressions in --compare
+DEFAULT_THRESHOLD = 0.2
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def scenarios(rng, counts):
+    # name -> function returning (method, path, form data) for one request
+    words = seed.WORDS
+    return {
+        "game_listing": lambda: ("GET", "/game/0", None),
+        "game_detail": lambda: (
+            "GET", f"/game/{rng.randint(1, counts['games'])}", None),
+        "search": lambda: (
+            "GET", "/search?" + urlencode({"query": rng.choice(words)}),
+            None),
+        "category": lambda: (
+            "GET", f"/category/{rng.randint(1, counts['categories'])}", None),
+        "platform": lambda: ("GET", f"/platform/{rng.randint(1, 3)}", None),
+        "rate_game": lambda: (
+            "POST", f"/rate_game/{rng.randint(1, counts['games'])}",
+            {"rating": str(rng.randint(1, 5))}),
+    }
+
+
+def summarize(samples, errors, seconds, statements):
+    milliseconds = [sample * 1000 for sample in samples]
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "requests_per_second": round(len(samples) / seconds, 1)
+        if seconds else 0.0,
+        "p50_ms": round(percentile(milliseconds, 0.50), 3),
+        "p95_ms": round(percentile(milliseconds, 0.95), 3),
+        "p99_ms": round(percentile(milliseconds, 0.99), 3),
+        "max_ms": round(max(milliseconds, default=0), 3),
+        "queries_per_request": round(statements / len(samples), 2)
+        if samples else 0.0,
+    }
+
+
+def expected(method, status):
+    # rate_game answers with a redirect back to the game
+    return status == (302 if method == "POST" else 200)
+
+
+def run_client(app, scenario, requests, warmup, account_id):
+    # Sequential requests through the test client, timed one by one
+    from app.query_counter import QueryCounter
+    from app.extensions import db
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["AccountID"] = account_id
+        session["AccountUsername"] = f"user{account_id}"
+    for _ in range(warmup):
+        method, path, data = scenario()
+        client.open(path, method=method, data=data)
+    with app.app_context():
+        engine = db.engine
+    samples, errors = [], 0
+    with QueryCounter(engine) as counter:
+        started = time.perf_counter()
+        for _ in range(requests):
+            method, path, data = scenario()
+            began = time.perf_counter()
+            response = client.open(path, method=method, data=data)
+            samples.append(time.perf_counter() - began)
+            errors += not expected(method, response.status_code)
+        elapsed = time.perf_counter() - started
+    return summarize(samples, errors, elapsed, counter.count)
+
+
+def serve(app):
+    # Threaded HTTP server on a free local port, stopped when the run ends
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class QuietHandler(WSGIRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-alive
+
+        def log_request(self, *args):
+            pass
+
+    server = make_server("127.0.0.1", 0, app, threaded=True,
+                         request_handler=QuietHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def run_http(app, port, scenario, requests, warmup, concurrency, cookie):
+    # concurrency clients, each on its own keep-alive connection, sharing
+    # the requests between them
+    from app.query_counter import QueryCounter
+    from app.extensions import db
+
+    lock = threading.Lock()
+    samples, errors = [], [0]
+    remaining = [requests]
+
+    def client(count_it):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    break
+                remaining[0] -= 1
+                method, path, data = scenario()
+            body = urlencode(data) if data else None
+            headers = {"Cookie": cookie}
+            if body:
+                headers["Content-Type"] = "application/x-www-form-urlencoded"
+            began = time.perf_counter()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+            except (http.client.HTTPException, OSError):
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port,
+                                                  timeout=30)
+                status = 0
+            elapsed = time.perf_counter() - began
+            if count_it:
+                with lock:
+                    samples.append(elapsed)
+                    errors[0] += not expected(method, status)
+        conn.close()
+
+    def run(count, count_it):
+        remaining[0] = count
+        threads = [threading.Thread(target=client, args=(count_it,))
+                   for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    run(warmup, False)
+    with app.app_context():
+        engine = db.engine
+    with QueryCounter(engine) as counter:
+        started = time.perf_counter()
+        run(requests, True)
+        elapsed = time.perf_counter() - started
+    return summarize(samples, errors[0], elapsed, counter.count)
+
+
+def session_cookie(app, account_id):
+    # A signed session cookie for the benchmark account, as a browser has
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["AccountID"] = account_id
+        session["AccountUsername"] = f"user{account_id}"
+    cookie = client.get_cookie(app.config.get("SESSION_COOKIE_NAME",
+                                              "session"))
+    return f"{cookie.key}={cookie.value}"
+
+
+def git_revision():
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=ROOT, capture_output=True, text=True).stdout.strip()
+        return revision + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    # Routes whose p95 latency or queries per request grew past threshold
+    regressions = []
+    print(f"{'route':<14}{'p95 ms':>10}{'was':>10}{'queries':>9}{'was':>7}")
+    for name, current in results["routes"].items():
+        before = baseline["routes"].get(name)
+        if before is None:
+            continue
+        print(f"{name:<14}{current['p95_ms']:>10.2f}{before['p95_ms']:>10.2f}"
+              f"{current['queries_per_request']:>9.2f}"
+              f"{before['queries_per_request']:>7.2f}")
+        if current["p95_ms"] > before["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {before['p95_ms']:.2f}ms -> "
+                               f"{current['p95_ms']:.2f}ms")
+        if current["queries_per_request"] > \
+                before["queries_per_request"] + 0.5:
+            regressions.append(
+                f"{name}: {before['queries_per_request']} -> "
+                f"{current['queries_per_request']} queries per request")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the hot routes on a synthetic database")
+    parser.add_argument("--scale", choices=seed.SCALES, default="1k")
+    parser.add_argument("--games", type=int,
+                        help="exact number of games, overriding --scale")
+    parser.add_argument("--seed", type=int, default=1,
+                        help="seeds both the data and the request mix")
+    parser.add_argument("--db", help="reuse (or create) this database file "
+                                     "instead of a temporary one")
+    parser.add_argument("--routes", default="all",
+                        help="comma-separated subset of: game_listing, "
+                             "game_detail, search, category, platform, "
+                             "rate_game")
+    parser.add_argument("--requests", type=int, default=200,
+                        help="timed requests per route")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--http", action="store_true",
+                        help="go through a local threaded HTTP server")
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="parallel HTTP clients with --http")
+    parser.add_argument("--page-cache", action="store_true",
+                        help="keep the rendered page cache on; off by "
+                             "default so every request reaches the database")
+    parser.add_argument("--output", help="write the JSON results here")
+    parser.add_argument("--compare", help="JSON results of an earlier run; "
+                                          "exit 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    games = args.games or seed.SCALES[args.scale]
+    scratch = None
+    path = os.path.abspath(args.db) if args.db else None
+    if path is None:
+        scratch = tempfile.mkdtemp()
+        path = os.path.join(scratch, "games.db")
+    if not os.path.exists(path):
+        print(f"Seeding {games} games into {path}", file=sys.stderr)
+        seed.seed(path, games, seed_value=args.seed)
+
+    sys.path.insert(0, ROOT)
+    from app import create_app
+    from app.extensions import db
+    import app.models as models
+
+    config = {"SQLALCHEMY_DATABASE_URI": "sqlite:///" + path}
+    if not args.page_cache:
+        config["PAGE_CACHE_SIZE"] = 0
+    app = create_app(config)
+    with app.app_context():
+        counts = {
+            "games": db.session.query(models.Games).count(),
+            "categories": db.session.query(models.Categories).count(),
+            "accounts": db.session.query(models.Accounts).count(),
+            "reviews": db.session.query(models.Reviews).count(),
+        }
+
+    rng = random.Random(args.seed)
+    available = scenarios(rng, counts)
+    names = list(available) if args.routes == "all" \
+        else [name.strip() for name in args.routes.split(",")]
+    unknown = set(names) - set(available)
+    if unknown:
+        parser.error(f"unknown routes: {', '.join(sorted(unknown))}")
+
+    server = serve(app) if args.http else None
+    cookie = session_cookie(app, 1)
+    routes = {}
+    for name in names:
+        if server:
+            routes[name] = run_http(app, server.server_port, available[name],
+                                    args.requests, args.warmup,
+                                    args.concurrency, cookie)
+        else:
+            routes[name] = run_client(app, available[name], args.requests,
+                                      args.warmup, 1)
+        print(f"{name:<14}{routes[name]['requests_per_second']:>9.1f}/s"
+              f"  p50 {routes[name]['p50_ms']:.2f}ms"
+              f"  p95 {routes[name]['p95_ms']:.2f}ms"
+              f"  p99 {routes[name]['p99_ms']:.2f}ms"
+              f"  {routes[name]['queries_per_request']} queries",
+              file=sys.stderr)
+    if server:
+        server.shutdown()
+
+    results = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "mode": "http" if args.http else "test_client",
+            "concurrency": args.concurrency if args.http else 1,
+            "page_cache": args.page_cache,
+            "seed": args.seed,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            **counts,
+        },
+        "routes": routes,
+    }
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+    if scratch:
+        import shutil
+        shutil.rmtree(scratch, ignore_errors=True)
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print("Regression:", regression, file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+# Builds a synthetic games.db at a chosen scale, with the same schema the app
+# creates, so benchmarks can run against 1k, 10k or 100k games:
+#   python benchmarks/seed.py --scale 10k --output /tmp/games-10k.db
+# The same --scale and --seed always produce the same rows.
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Games per scale; accounts and reviews follow from these
+SCALES = {"1k": 1000, "10k": 10000, "100k": 100000}
+
+# Rows written per executemany
+CHUNK_SIZE = 5000
+
+PLATFORMS = [(1, "PC", "pc_icon.png"), (2, "PlayStation", "ps_icon.png"),
+             (3, "Xbox", "xb_icon.png")]
+CATEGORIES = ["Action", "Adventure", "RPG", "Shooter", "Strategy", "Puzzle",
+              "Racing", "Sports", "Simulation", "Horror", "Platformer",
+              "Fighting", "Survival", "Sandbox", "Stealth", "MMO", "Indie",
+              "Roguelike", "Open World", "Co-op", "Anime", "Battle Royale",
+              "Card Game", "Music"]
+WORDS = ["shadow", "legend", "dragon", "star", "quest", "empire", "night",
+         "iron", "storm", "crystal", "galaxy", "kingdom", "rogue", "neon",
+         "frontier", "ember", "titan", "echo", "hollow", "drift", "phantom",
+         "saga", "rift", "forge", "wild", "arcane", "outlaw", "orbit",
+         "tempest", "vanguard", "ruin", "harbor", "circuit", "blade", "moon"]
+DEVELOPERS = ["Northwind Studios", "Pixel Foundry", "Red Lantern Games",
+              "Blue Harbor Interactive", "Ironclad Works", "Moonlit Software",
+              "Tall Pine Games", "Quartz Interactive", "Sable Studio",
+              "Brightside Entertainment"]
+RAM = ["2GB", "4GB", "6GB", "8GB", "12GB", "16GB", "32GB"]
+STORAGE = ["1GB", "10GB", "25GB", "50GB", "75GB", "100GB", "150GB"]
+CPUS = ["Intel Core i3-3210", "Intel Core i5-4690", "Intel i5-8400",
+        "Intel i7-4790K", "Intel i7-8700K", "AMD Ryzen 5 3600X",
+        "AMD Ryzen 7 5800X", "Intel i9-10900K"]
+GPUS = ["Intel HD 4000", "NVIDIA GTX 660", "NVIDIA GTX 970",
+        "NVIDIA GTX 1060", "NVIDIA RTX 2060", "NVIDIA RTX 2070",
+        "AMD RX 5700", "NVIDIA RTX 3080"]
+
+
+def chunks(rows):
+    for start in range(0, len(rows), CHUNK_SIZE):
+        yield rows[start:start + CHUNK_SIZE]
+
+
+def insert(conn, table, rows):
+    for chunk in chunks(rows):
+        conn.execute(table.insert(), chunk)
+
+
+def cover_images():
+    folder = os.path.join(ROOT, "app", "static", "images")
+    names = sorted(name for name in os.listdir(folder)
+                   if name.endswith((".jpg", ".png"))
+                   and not name.startswith(("bg.", "icon.")))
+    return names or ["icon.png"]
+
+
+def game_rows(rng, count, images):
+    rows = []
+    for game_id in range(1, count + 1):
+        words = rng.sample(WORDS, 3)
+        rows.append({
+            "GameID": game_id,
+            "GameName": f"{words[0].title()} {words[1].title()} {game_id}",
+            "GameDescription": " ".join(rng.choices(WORDS, k=20)),
+            "GameDeveloper": rng.choice(DEVELOPERS),
+            "GameImage": rng.choice(images),
+        })
+    return rows
+
+
+def release_date(rng):
+    return (date(2005, 1, 1) + timedelta(days=rng.randrange(20 * 365))) \
+        .isoformat()
+
+
+def seed(path, games, accounts=None, reviews_per_game=5, seed_value=1):
+    # Create a fresh database at path and fill it; returns row counts
+    if os.path.exists(path):
+        os.remove(path)
+    os.environ["GAMES_SQLALCHEMY_DATABASE_URI"] = "sqlite:///" + path
+    sys.path.insert(0, ROOT)
+    from app import create_app
+    from app.extensions import db
+    import app.models as models
+    import app.hardware as hardware
+    import app.passwords as passwords
+    import app.ratings as ratings
+    import app.search as game_search
+
+    rng = random.Random(seed_value)
+    accounts = accounts or max(games // 10, 10)
+    app = create_app()
+    counts = {}
+    with app.app_context():
+        conn = db.session.connection()
+        now = models.utcnow()
+        insert(conn, models.Platforms.__table__, [
+            {"PlatformID": platform_id, "PlatformName": name,
+             "PlatformDescription": f"{name} games", "PlatformImage": image,
+             "UpdatedAt": now} for platform_id, name, image in PLATFORMS])
+        images = cover_images()
+        insert(conn, models.Categories.__table__, [
+            {"CategoryID": category_id, "CategoryName": name,
+             "CategoryDescription": f"{name} games",
+             "CategoryImage": rng.choice(images), "UpdatedAt": now}
+            for category_id, name in enumerate(CATEGORIES, 1)])
+        insert(conn, models.Games.__table__,
+               [row | {"UpdatedAt": now}
+                for row in game_rows(rng, games, images)])
+
+        links, platforms, details, requirements = [], [], [], []
+        for game_id in range(1, games + 1):
+            for category_id in rng.sample(range(1, len(CATEGORIES) + 1),
+                                          rng.randint(1, 4)):
+                links.append({"GameID": game_id, "CategoryID": category_id})
+            for platform_id in sorted(rng.sample([1, 2, 3],
+                                                 rng.randint(1, 3))):
+                platforms.append({"GameID": game_id,
+                                  "PlatformID": platform_id})
+                details.append({
+                    "GameID": game_id, "PlatformID": platform_id,
+                    "Price": rng.choice([0, 9.99, 19.99, 39.99, 59.99,
+                                         89.99, 119.99]),
+                    "ReleaseDate": release_date(rng), "UpdatedAt": now})
+                if platform_id == 1:
+                    tier = rng.randrange(len(CPUS) - 2)
+                    for offset, kind in enumerate(["Minimum",
+                                                   "Recommended"]):
+                        requirements.append({
+                            "GameID": game_id, "PlatformID": 1, "Type": kind,
+                            "OS": "Windows 10",
+                            "RAM": RAM[min(tier + offset, len(RAM) - 1)],
+                            "CPU": CPUS[tier + offset * 2],
+                            "GPU": GPUS[tier + offset * 2],
+                            "Storage": rng.choice(STORAGE)})
+                else:
+                    requirements.append({
+                        "GameID": game_id, "PlatformID": platform_id,
+                        "Type": "Normal", "OS": "N/A", "RAM": "N/A",
+                        "CPU": "N/A", "GPU": "N/A",
+                        "Storage": rng.choice(STORAGE)})
+        insert(conn, models.GameCategories.__table__, links)
+        insert(conn, models.GamePlatforms.__table__, platforms)
+        insert(conn, models.GamePlatformDetails.__table__, details)
+        insert(conn, models.SystemRequirements.__table__,
+               hardware.with_parsed(requirements))
+
+        # One cheap hash shared by every account; benchmarks log in by
+        # setting the session, not through bcrypt
+        hashed = passwords.generate("benchmark", 4)
+        insert(conn, models.Accounts.__table__, [
+            {"AccountID": account_id, "AccountUsername": f"user{account_id}",
+             "AccountPassword": hashed, "AccountIsAdmin": 0}
+            for account_id in range(1, accounts + 1)])
+        reviews = {}
+        for _ in range(games * reviews_per_game):
+            key = (rng.randint(1, accounts), rng.randint(1, games))
+            reviews[key] = rng.randint(1, 5)
+        insert(conn, models.Reviews.__table__, [
+            {"UserID": user_id, "GameID": game_id, "Rating": rating}
+            for (user_id, game_id), rating in sorted(reviews.items())])
+        ratings.rebuild_rating_stats()
+        db.session.commit()
+        game_search.rebuild_index()
+
+        counts = {"games": games, "accounts": accounts,
+                  "reviews": len(reviews), "categories": len(CATEGORIES),
+                  "game_categories": len(links),
+                  "game_platforms": len(platforms),
+                  "requirements": len(requirements)}
+        db.session.execute(db.text("PRAGMA wal_checkpoint(TRUNCATE)"))
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Create a synthetic games.db for benchmarks")
+    parser.add_argument("--scale", choices=SCALES, default="1k")
+    parser.add_argument("--games", type=int,
+                        help="exact number of games, overriding --scale")
+    parser.add_argument("--accounts", type=int,
+                        help="defaults to one per ten games")
+    parser.add_argument("--reviews-per-game", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", required=True)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    counts = seed(os.path.abspath(args.output),
+                  args.games or SCALES[args.scale], args.accounts,
+                  args.reviews_per_game, args.seed)
+    print(f"Seeded {args.output} in {time.perf_counter() - started:.1f}s: "
+          + ", ".join(f"{count} {name}" for name, count in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
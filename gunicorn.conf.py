@@ -0,0 +1,60 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+# gunicorn -c gunicorn.conf.py; every setting can be overridden with a GAMES_
+# environment variable
+wsgi_app = "wsgi:app"
+bind = os.environ.get("GAMES_BIND", "0.0.0.0:8000")
+
+# One worker process per core, each with a few threads to overlap database
+# and disk waits; page rendering is CPU-bound Python, so the processes are
+# what use the cores.
+#
+# Each worker keeps its own in-memory state, and all of it follows writes
+# served by the others:
+#   - page cache keys, the facet index and the hardware scores are checked
+#     against UpdatedAt stamps or table versions, so the next request after
+#     an edit looks up a new page or rebuilds
+#   - the account cache and the suggest index watch counters shared by the
+#     workers (app/generations.py, inherited from the preloaded master), so
+#     a deleted account or an edited game is seen on the next request;
+#     writes outside the server reach them within ACCOUNT_CACHE_TTL and
+#     SUGGEST_REFRESH_INTERVAL
+#   - ratings queued by the JSON API also ride in the user's session, so
+#     their own pages show them whichever worker answers
+workers = int(os.environ.get("GAMES_WORKERS", multiprocessing.cpu_count()))
+
+# Workers write their request metrics here so /metrics, answered by any one
+# of them, reports the whole server; a fresh directory per server run
+metrics_dir = None
+if "GAMES_METRICS_DIR" not in os.environ:
+    metrics_dir = tempfile.mkdtemp(prefix="games-metrics-")
+    os.environ["GAMES_METRICS_DIR"] = metrics_dir
+threads = int(os.environ.get("GAMES_THREADS", 4))
+worker_class = "gthread"
+
+# Seconds an idle keep-alive connection stays open; set it above the load
+# balancer's idle timeout when one sits in front
+keepalive = int(os.environ.get("GAMES_KEEPALIVE", 5))
+timeout = int(os.environ.get("GAMES_TIMEOUT", 30))
+graceful_timeout = timeout
+
+# Build the app once in the master: migrations and index builds run a single
+# time, and every worker shares the session secret key and the generation
+# counters
+preload_app = True
+
+
+def on_exit(server):
+    if metrics_dir:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+
+
+def post_fork(server, worker):
+    # Forked workers must open their own database connections
+    from app.extensions import db
+    with server.app.wsgi().app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
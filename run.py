@@ -1 +1,20 @@
-from app import app  # noqa
+from app import create_app
+
+try:
+    from waitress import serve
+except ImportError:  # Waitress is optional; Flask's server is for development
+    serve = None
+
+# Serves the site with a multi-threaded server. Waitress runs on every
+# platform; on Linux hosts use gunicorn with gunicorn.conf.py for one process
+# per core. Set GAMES_HOST, GAMES_PORT, GAMES_THREADS and GAMES_KEEPALIVE.
+if __name__ == "__main__":
+    app = create_app()
+    host = app.config.get("HOST", "127.0.0.1")
+    port = int(app.config.get("PORT", 5000))
+    if serve is not None:
+        serve(app, host=host, port=port,
+              threads=int(app.config.get("THREADS", 8)),
+              channel_timeout=int(app.config.get("KEEPALIVE", 5)))
+    else:
+        app.run(host=host, port=port, threaded=True)
@@ -0,0 +1,57 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import create_app  # noqa: E402
+import app.rating_queue as rating_queue  # noqa: E402
+
+# The games.db shipped with the repo predates every migration, so a copy of
+# it exercises the whole upgrade path as well as giving the tests real data
+SHIPPED_DATABASE = os.path.join(ROOT, "app", "games.db")
+
+# Accounts in the shipped database
+ADMIN_ID = 4
+USER_ID = 6
+
+
+def make_app(path, **config):
+    # Page and account caches are process-wide and keyed on values every copy
+    # of the database shares, so they are off to keep tests apart
+    return create_app({
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///" + path,
+        "SECRET_KEY": "test",
+        "TESTING": True,
+        "WTF_CSRF_ENABLED": False,
+        "PAGE_CACHE_SIZE": 0,
+        "ACCOUNT_CACHE_TTL": 0,
+        "RATING_FLUSH_INTERVAL": 0,
+        # Tests call suggest.index.check() rather than wait for the thread
+        "SUGGEST_REFRESH_INTERVAL": 0,
+        **config,
+    })
+
+
+@pytest.fixture
+def app(tmp_path):
+    path = str(tmp_path / "games.db")
+    shutil.copy(SHIPPED_DATABASE, path)
+    app = make_app(path)
+    yield app
+    # Nothing queued by one test may be written into the next one's database
+    rating_queue.writer.flush_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def log_in(client, account_id):
+    with client.session_transaction() as session:
+        session["AccountID"] = account_id
+        session["AccountUsername"] = f"account{account_id}"
@@ -0,0 +1,87 @@
+import gzip
+import json
+
+import pytest
+
+import app.api as api
+
+
+def test_game_listing(client):
+    body = client.get("/api/v1/games?limit=3").get_json()
+    assert len(body["data"]) == 3
+    assert body["next_cursor"] and "after=" in body["next"]
+    assert {"GameID", "GameName", "GameDeveloper"} <= set(body["data"][0])
+
+
+def test_fields_always_include_the_primary_key(client):
+    body = client.get("/api/v1/games?fields=GameName&limit=2").get_json()
+    assert [set(game) for game in body["data"]] == \
+        [{"GameID", "GameName"}] * 2
+
+
+def test_includes(client):
+    game = client.get("/api/v1/games/1?include=platforms,categories,rating"
+                      ).get_json()["data"]
+    assert game["platforms"] and "PlatformName" in game["platforms"][0]
+    assert "CategoryName" in game["categories"][0]
+    assert set(game["rating"]) == {"RatingAverage", "RatingCount"}
+
+
+def test_limit_is_clamped(client):
+    body = client.get(f"/api/v1/games?limit={api.MAX_LIMIT + 50}").get_json()
+    assert len(body["data"]) <= api.MAX_LIMIT
+    assert len(client.get("/api/v1/games?limit=0").get_json()["data"]) == 1
+
+
+def test_platforms_and_categories(client):
+    platforms = client.get("/api/v1/platforms?include=games").get_json()
+    assert platforms["data"][0]["games"]
+    category = client.get("/api/v1/categories/1").get_json()["data"]
+    assert category["CategoryID"] == 1
+
+
+def test_search(client):
+    body = client.get("/api/v1/search?q=the&limit=2&fields=GameName"
+                      ).get_json()
+    assert len(body["data"]) == 2 and body["next_cursor"] == "2"
+    after = client.get(f"/api/v1/search?q=the&limit=2&fields=GameName"
+                       f"&after={body['next_cursor']}").get_json()
+    assert len(after["data"]) == 2
+    assert not {game["GameID"] for game in body["data"]} & \
+        {game["GameID"] for game in after["data"]}
+
+
+def test_large_responses_are_gzipped(client):
+    response = client.get("/api/v1/games?limit=50",
+                          headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    body = json.loads(gzip.decompress(response.data))
+    assert len(body["data"]) > 1
+
+
+@pytest.mark.parametrize("url, status", [
+    ("/api/v1/games?fields=Nope", 400),
+    ("/api/v1/games?include=nope", 400),
+    ("/api/v1/games?sort=nope", 400),
+    ("/api/v1/games?after=junk", 400),
+    ("/api/v1/games?sort=name&after=no-id", 400),
+    ("/api/v1/games?sort=rating&after=high:1", 400),
+    ("/api/v1/search?q=the&after=junk", 400),
+    ("/api/v1/search?q=the&after=-1", 400),
+    ("/api/v1/browse?after=1.5", 400),
+    ("/api/v1/search", 400),
+    ("/api/v1/games/99999", 404),
+    ("/api/v1/nope", 404),
+    ("/api/nope", 404),
+])
+def test_errors_are_json(client, url, status):
+    response = client.get(url)
+    assert response.status_code == status
+    assert response.is_json and response.get_json()["error"]
+
+
+def test_html_listing_rejects_a_malformed_cursor(client):
+    response = client.get("/platform/0?after=junk")
+    assert response.status_code == 400
+    assert not response.is_json
@@ -0,0 +1,74 @@
+import gzip
+import os
+
+import pytest
+
+import app.assets as assets
+
+
+def fingerprint(app, filename):
+    with app.app_context():
+        return assets.digest(filename)
+
+
+@pytest.fixture
+def static_dir(app, tmp_path, monkeypatch):
+    # A scratch static folder, so stale siblings can be made safely; the
+    # build id it computes is put back afterwards
+    monkeypatch.setattr(assets, "build_id", assets.build_id)
+    folder = tmp_path / "static"
+    folder.mkdir()
+    (folder / "extra.css").write_text("body { color: red; }\n" * 50)
+    app.static_folder = str(folder)
+    with app.app_context():
+        assets.build(str(folder))
+    return folder
+
+
+def test_pages_link_fingerprinted_files(app, client):
+    page = client.get("/game/0").text
+    assert f"style.css?v={fingerprint(app, 'style.css')}" in page
+    assert f"script.js?v={fingerprint(app, 'script.js')}" in page
+
+
+def test_only_the_current_hash_is_immutable(app, client):
+    current = fingerprint(app, "style.css")
+    response = client.get(f"/static/style.css?v={current}")
+    assert response.cache_control.max_age == assets.IMMUTABLE_MAX_AGE
+    assert response.cache_control.immutable
+    for url in ("/static/style.css?v=0123456789", "/static/style.css"):
+        response = client.get(url)
+        assert response.status_code == 200
+        assert not response.cache_control.immutable
+        assert response.cache_control.max_age != assets.IMMUTABLE_MAX_AGE
+
+
+def test_gzip_sibling_is_served_when_accepted(app, client):
+    with open(os.path.join(app.static_folder, "style.css"), "rb") as file:
+        source = file.read()
+    response = client.get("/static/style.css",
+                          headers={"Accept-Encoding": "gzip, deflate"})
+    assert response.content_encoding == "gzip"
+    assert "Accept-Encoding" in response.vary
+    assert gzip.decompress(response.data) == source
+
+    response = client.get("/static/style.css")
+    assert response.content_encoding is None
+    assert "Accept-Encoding" in response.vary
+    assert response.data == source
+
+
+def test_edited_file_gets_a_new_url_and_skips_its_stale_sibling(
+        app, client, static_dir):
+    assert (static_dir / "extra.css.gz").exists()
+    before = fingerprint(app, "extra.css")
+    source = static_dir / "extra.css"
+    source.write_text("body { color: blue; }\n")
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert fingerprint(app, "extra.css") != before
+
+    response = client.get("/static/extra.css",
+                          headers={"Accept-Encoding": "gzip"})
+    assert response.content_encoding is None
+    assert response.text == "body { color: blue; }\n"
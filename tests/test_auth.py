@@ -0,0 +1,71 @@
+import shutil
+
+import pytest
+
+from conftest import ADMIN_ID, SHIPPED_DATABASE, USER_ID, log_in, make_app
+
+from app.query_counter import count_request_queries
+import app.auth as auth
+
+ACCOUNTS = (ADMIN_ID, USER_ID, 7)
+
+
+def account_lookups(counter):
+    return [statement for statement in counter.statements
+            if 'FROM "Accounts"' in statement]
+
+
+@pytest.fixture
+def cached_client(tmp_path):
+    path = str(tmp_path / "games.db")
+    shutil.copy(SHIPPED_DATABASE, path)
+    app = make_app(path, ACCOUNT_CACHE_TTL=60, ACCOUNT_CACHE_SIZE=2)
+    yield app.test_client()
+    # The cache is process-wide; this copy's accounts must not leak out
+    for account_id in ACCOUNTS:
+        auth.invalidate_account(account_id)
+
+
+@pytest.mark.parametrize("url", ["/game/1", "/dashboard", "/admin",
+                                 "/admin/game/update/1"])
+def test_account_is_loaded_once_per_request(client, url):
+    log_in(client, ADMIN_ID)
+    response, counter = count_request_queries(client, url)
+    assert response.status_code in (200, 302)  # Admins' dashboard is /admin
+    assert len(account_lookups(counter)) == 1
+
+
+@pytest.mark.parametrize("url", ["/admin", "/admin/game/add",
+                                 "/admin/game/delete/1", "/admin/cache"])
+def test_admin_required(client, url):
+    assert client.get(url).headers["Location"] == "/login"
+    log_in(client, USER_ID)
+    assert client.get(url).headers["Location"] == "/dashboard"
+
+
+def test_cached_account_skips_the_lookup(cached_client):
+    log_in(cached_client, USER_ID)
+    cached_client.get("/dashboard")
+    response, counter = count_request_queries(cached_client, "/dashboard")
+    assert response.status_code == 200
+    assert account_lookups(counter) == []
+
+
+def test_least_recently_used_account_is_dropped(cached_client):
+    for account_id in (USER_ID, 7, ADMIN_ID):  # One more than the cache holds
+        log_in(cached_client, account_id)
+        cached_client.get("/dashboard")
+    log_in(cached_client, USER_ID)
+    _, counter = count_request_queries(cached_client, "/dashboard")
+    assert len(account_lookups(counter)) == 1
+    log_in(cached_client, ADMIN_ID)
+    _, counter = count_request_queries(cached_client, "/dashboard")
+    assert account_lookups(counter) == []
+
+
+def test_deleting_an_account_drops_it_from_the_cache(cached_client):
+    log_in(cached_client, USER_ID)
+    assert cached_client.get("/dashboard").status_code == 200
+    cached_client.get("/delete")
+    log_in(cached_client, USER_ID)  # A stale session cookie
+    assert cached_client.get("/dashboard").headers["Location"] == "/login"
@@ -0,0 +1,48 @@
+from sqlalchemy import event, func, select
+
+from app.extensions import db
+import app.catalogue as catalogue
+import app.models as models
+
+
+def record(name):
+    return {"GameName": name, "Categories": ["Action"],
+            "Platforms": [{"Platform": "PlayStation", "Price": 10,
+                           "ReleaseDate": "2024-05-01"}]}
+
+
+def feed(*names):
+    return [(line, record(name), None)
+            for line, name in enumerate(names, start=1)]
+
+
+def games_named(name):
+    return db.session.scalar(select(func.count()).where(
+        func.lower(models.Games.GameName) == name.lower()))
+
+
+def test_existing_and_repeated_names_are_skipped(app):
+    with app.app_context():
+        report = catalogue.import_records(
+            feed("APEX LEGENDS", "Brand New", "brand new", "Second Game",
+                 "BRAND NEW"), batch_size=2)
+        assert report["imported"] == 2 and report["skipped"] == 3
+        assert games_named("Apex Legends") == 1
+        assert games_named("Brand New") == 1
+        assert games_named("Second Game") == 1
+
+
+def test_duplicates_are_checked_per_batch(app):
+    # One IN query per batch rather than every stored name up front
+    with app.app_context():
+        statements = []
+        event.listen(db.engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args:
+                     statements.append(statement))
+        catalogue.import_records(feed(*[f"Import {n}" for n in range(5)]),
+                                 batch_size=2)
+        name_checks = [statement for statement in statements
+                       if 'WHERE lower("Games"."GameName") IN' in statement]
+        assert len(name_checks) == 3
+        assert not any(statement.startswith('SELECT "Games"."GameName"')
+                       for statement in statements)
@@ -0,0 +1,52 @@
+import pytest
+
+from conftest import ADMIN_ID, USER_ID, log_in
+
+PER_VIEWER_PAGES = ["/game/1", "/platform/1", "/category/1", "/game/0",
+                    "/platform/0", "/category/0"]
+
+
+@pytest.mark.parametrize("url", PER_VIEWER_PAGES)
+def test_revalidates_on_the_etag(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "private, no-cache"
+    etag = response.headers["ETag"]
+    again = client.get(url, headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.headers["ETag"] == etag
+
+
+@pytest.mark.parametrize("url", PER_VIEWER_PAGES)
+def test_per_viewer_pages_have_no_last_modified(client, url):
+    # A date cannot tell viewers apart, so If-Modified-Since alone never
+    # gets a 304 for a page rendered for someone else
+    assert "Last-Modified" not in client.get(url).headers
+    response = client.get(url, headers={
+        "If-Modified-Since": "Fri, 01 Jan 2100 00:00:00 GMT"})
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("account_id", [USER_ID, ADMIN_ID])
+def test_logging_in_changes_the_game_page_etag(client, account_id):
+    etag = client.get("/game/1").headers["ETag"]
+    log_in(client, account_id)
+    response = client.get("/game/1", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_rating_changes_the_game_page_etag(client):
+    log_in(client, USER_ID)
+    etag = client.get("/game/1").headers["ETag"]
+    client.post("/rate_game/1", data={"rating": "3"})
+    response = client.get("/game/1", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+
+
+def test_shared_documents_keep_last_modified(client):
+    response = client.get("/api/games/1/platforms")
+    assert response.headers["Cache-Control"] == "public, no-cache"
+    last_modified = response.headers["Last-Modified"]
+    again = client.get("/api/games/1/platforms",
+                       headers={"If-Modified-Since": last_modified})
+    assert again.status_code == 304
@@ -0,0 +1,89 @@
+import logging
+import os
+import shutil
+
+import pytest
+
+from conftest import ADMIN_ID, SHIPPED_DATABASE, USER_ID, log_in, make_app
+
+import app.diagnostics as diagnostics
+
+
+@pytest.fixture
+def make(tmp_path):
+    def make(**config):
+        path = str(tmp_path / "games.db")
+        shutil.copy(SHIPPED_DATABASE, path)
+        return make_app(path, PROFILE_DIR=str(tmp_path / "profiles"),
+                        **config)
+    handlers = list(diagnostics.logger.handlers)
+    yield make
+    # The logger is process-wide; drop any SLOW_QUERY_LOG file handler
+    for handler in diagnostics.logger.handlers[len(handlers):]:
+        diagnostics.logger.removeHandler(handler)
+        handler.close()
+
+
+def slow_queries(caplog):
+    return [record.getMessage() for record in caplog.records
+            if record.name == diagnostics.logger.name]
+
+
+def test_slow_calls_are_logged_with_sql_and_plan(make, caplog):
+    client = make(SLOW_QUERY_SECONDS=0).test_client()
+    with caplog.at_level(logging.WARNING, diagnostics.logger.name):
+        assert client.get("/game/17").status_code == 200
+    messages = slow_queries(caplog)
+    # One entry per execute_query call the page makes
+    assert [message.split("\n")[0].split(": ", 1)[1] for message in
+            messages] == [
+        "Games.SELECT id=17 during GET /game/17",
+        "GamePlatformDetails.SELECT filters={'GameID': 17} "
+        "during GET /game/17",
+        "SystemRequirements.SELECT filters={'GameID': 17} "
+        "during GET /game/17"]
+    games = messages[0]
+    assert 'WHERE "Games"."GameID" = 17' in games  # Parameters inlined
+    assert "SEARCH Games USING INTEGER PRIMARY KEY" in games
+
+
+@pytest.mark.parametrize("config", [{}, {"SLOW_QUERY_SECONDS": 60}])
+def test_fast_or_unset_logs_nothing(make, caplog, config):
+    client = make(**config).test_client()
+    with caplog.at_level(logging.WARNING, diagnostics.logger.name):
+        client.get("/game/17")
+    assert slow_queries(caplog) == []
+
+
+def test_slow_query_log_file(make, tmp_path):
+    path = tmp_path / "slow.log"
+    app = make(SLOW_QUERY_SECONDS=0, SLOW_QUERY_LOG=str(path))
+    app.test_client().get("/platform/1")
+    log = path.read_text()
+    assert "Slow query" in log and "Platforms.SELECT id=1" in log
+    # The platform's games are loaded within the same call
+    assert 'WHERE "GamePlatforms"."PlatformID" IN (1)' in log
+
+
+def test_bound_sql_inlines_parameters():
+    assert diagnostics.bound_sql("SELECT ? WHERE a = ?", (1, "x")) == \
+        "SELECT 1 WHERE a = 'x'"
+    assert diagnostics.bound_sql("INSERT VALUES (?)", [(5,), (6,)]) == \
+        "INSERT VALUES (5)"
+
+
+def test_profiling_is_for_admins_only(make, tmp_path):
+    client = make().test_client()
+    log_in(client, USER_ID)
+    response = client.get("/game/17?__profile=1")
+    assert response.status_code == 200
+    assert "X-Profile" not in response.headers
+    assert not os.path.exists(tmp_path / "profiles")
+
+    log_in(client, ADMIN_ID)
+    response = client.get("/game/17?__profile=1")
+    assert response.status_code == 200
+    name = response.headers["X-Profile"]
+    assert "games.game" in name
+    assert os.path.getsize(tmp_path / "profiles" / name) > 0
+    assert "X-Profile" not in client.get("/game/17").headers
@@ -0,0 +1,104 @@
+from sqlalchemy import select
+
+from app.extensions import db
+import app.conditional as conditional
+import app.facets as facets
+import app.models as models
+
+
+def games_in_category(*category_ids):
+    return set(db.session.scalars(
+        select(models.GameCategories.GameID)
+        .where(models.GameCategories.CategoryID.in_(category_ids))))
+
+
+def games_on_platform(platform_id, low=None, high=None):
+    # Linked to the platform and, with a range, priced within it there
+    details = models.GamePlatformDetails
+    query = select(models.GamePlatforms.GameID).where(
+        models.GamePlatforms.PlatformID == platform_id)
+    if low is not None or high is not None:
+        query = query.join(details, (details.GameID ==
+                                     models.GamePlatforms.GameID)
+                           & (details.PlatformID == platform_id)).where(
+            details.Price.between(low, high))
+    return set(db.session.scalars(query))
+
+
+def test_bitset_round_trip():
+    bits = facets.bitset([1, 5, 8, 64, 200])
+    assert bits.bit_count() == 5
+    assert facets.members(bits) == [1, 5, 8, 64, 200]
+    assert facets.members(bits, offset=1, limit=2) == [5, 8]
+    assert facets.members(bits, offset=5) == []
+    assert facets.bitset([]) == 0
+
+
+def test_categories_are_alternatives(app):
+    with app.app_context():
+        snapshot = facets.index.current()
+        matches, _ = snapshot.browse(category_ids=[1, 2])
+        assert set(facets.members(matches)) == games_in_category(1, 2)
+
+
+def test_facets_narrow_each_other(app):
+    with app.app_context():
+        matches, _ = facets.index.current().browse(category_ids=[1],
+                                                   platform_ids=[1])
+        assert set(facets.members(matches)) == \
+            games_in_category(1) & games_on_platform(1)
+
+
+def test_price_range_on_a_platform(app):
+    with app.app_context():
+        matches, _ = facets.index.current().browse(platform_ids=[1],
+                                                   price=(0, 30))
+        assert set(facets.members(matches)) == games_on_platform(1, 0, 30)
+
+
+def test_counts_ignore_their_own_facet(app):
+    # Each category's count is what choosing it would give, whichever
+    # categories are already chosen
+    with app.app_context():
+        _, counts = facets.index.current().browse(category_ids=[1],
+                                                  platform_ids=[1])
+        on_pc = games_on_platform(1)
+        for category in counts["categories"]:
+            assert category["count"] == \
+                len(games_in_category(category["id"]) & on_pc)
+
+
+def test_index_follows_writes(app):
+    with app.app_context():
+        before = facets.index.current()
+        game_id = db.session.scalars(
+            select(models.Games.GameID)
+            .where(models.Games.GameID.not_in(games_in_category(1)))).first()
+        db.session.add(models.GameCategories(GameID=game_id, CategoryID=1))
+        conditional.touch(models.Categories, [1])
+        after = facets.index.current()
+        assert after is not before
+        matches, _ = after.browse(category_ids=[1])
+        assert game_id in facets.members(matches)
+        assert facets.index.current() is after  # No rebuild without writes
+
+
+def test_browse_api(client):
+    body = client.get("/api/v1/browse?category=1&platform=1&limit=5"
+                      "&fields=GameName").get_json()
+    assert body["total"] >= len(body["data"])
+    assert len(body["data"]) <= 5
+    assert {"categories", "platforms", "prices", "years"} <= \
+        set(body["facets"])
+
+
+def test_browse_rejects_bad_filters(client):
+    for query in ["category=x", "min_price=-5", "released_from=2020-1"]:
+        response = client.get(f"/api/v1/browse?{query}")
+        assert response.status_code == 400
+        assert "error" in response.get_json()
+
+
+def test_browse_page(client):
+    assert client.get("/browse?category=1&min_price=0&max_price=60") \
+        .status_code == 200
@@ -0,0 +1,130 @@
+import pytest
+
+from app.extensions import db
+import app.hardware as hardware
+import app.models as models
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("16GB", 16384),
+    (" 8 gb ", 8192),
+    ("1.5GB", 1536),
+    ("500MB", 500),
+    ("2TB", 2097152),
+    ("N/A", None),
+    ("", None),
+    (None, None),
+    ("lots", None),
+])
+def test_parse_size_mb(text, expected):
+    assert hardware.parse_size_mb(text) == expected
+
+
+@pytest.mark.parametrize("kind, text, expected", [
+    ("CPU", "Intel Core i7-9700K", 14500),
+    ("CPU", "i7 9700K", 14500),
+    ("CPU", "Intel Core i5 or equivalent", 2700),  # Family scores as oldest
+    ("CPU", "AMD Ryzen 5 3600X", 17800),
+    ("GPU", "NVIDIA GeForce RTX 2070 Super", 18000),
+    ("GPU", "GeForce RTX 2070", 16000),
+    ("GPU", "GTX 1660 Ti", 11800),
+    ("CPU", "Pentium G4560", None),
+    ("GPU", "N/A", None),
+])
+def test_score(app, kind, text, expected):
+    with app.app_context():
+        assert hardware.score(kind, text) == expected
+
+
+def test_unknown_parts_parse_to_none(app):
+    with app.app_context():
+        columns = hardware.parsed_columns({
+            "RAM": "N/A", "Storage": "50GB", "CPU": "Pentium G4560",
+            "GPU": "RTX 3060"})
+    assert columns == {"RAMMB": None, "StorageMB": 51200, "CPUScore": None,
+                       "GPUScore": 17000}
+
+
+def add_requirements(app, **columns):
+    # A PC game whose Minimum and Recommended rows have the given columns
+    with app.app_context():
+        game = models.Games(GameName="Requirements test")
+        db.session.add(game)
+        db.session.flush()
+        for requirement_type in ("Minimum", "Recommended"):
+            db.session.add(models.SystemRequirements(
+                GameID=game.GameID, PlatformID=1, Type=requirement_type,
+                **columns))
+        db.session.commit()
+        return game.GameID
+
+
+def test_requirements_within_the_spec_match(app):
+    game_id = add_requirements(app, RAMMB=4096, StorageMB=1024,
+                               CPUScore=1000, GPUScore=100)
+    with app.app_context():
+        matches, unknown = hardware.compatible_games(
+            ram_mb=8192, storage_mb=10240, cpu_score=5000, gpu_score=5000)
+    assert game_id in matches["Minimum"] and game_id in matches["Recommended"]
+    assert game_id not in unknown["Minimum"]
+
+
+def test_requirements_beyond_the_spec_do_not_match(app):
+    game_id = add_requirements(app, RAMMB=65536, StorageMB=1024,
+                               CPUScore=1000, GPUScore=100)
+    with app.app_context():
+        matches, unknown = hardware.compatible_games(ram_mb=8192)
+    assert game_id not in matches["Minimum"]
+    assert game_id not in unknown["Minimum"]
+
+
+def test_unparsed_requirements_are_unknown_not_met(app):
+    game_id = add_requirements(app, RAMMB=4096, StorageMB=1024,
+                               CPUScore=None, GPUScore=100)
+    with app.app_context():
+        matches, unknown = hardware.compatible_games(ram_mb=8192,
+                                                     cpu_score=1)
+        assert game_id not in matches["Minimum"]
+        assert game_id in unknown["Minimum"]
+
+        # Parts of the spec left out are not checked
+        matches, unknown = hardware.compatible_games(ram_mb=8192)
+        assert game_id in matches["Minimum"]
+
+
+def test_rescore_reports_unmatched_names(app):
+    with app.app_context():
+        db.session.add(models.SystemRequirements(
+            GameID=1, PlatformID=1, Type="Normal", CPU="Pentium G4560",
+            GPU="N/A"))
+        db.session.flush()
+        unmatched = hardware.rescore(db.session.connection())
+        assert "CPU: Pentium G4560" in unmatched
+        assert not any(name.endswith(": N/A") for name in unmatched)
+
+
+def test_compatibility_api(client):
+    body = client.get("/api/v1/compatibility?ram=64GB&cpu=i9-13900K"
+                      "&gpu=RTX 4090&storage=2TB&fields=GameName").get_json()
+    assert body["minimum"] and body["recommended"]
+    assert set(body["unknown"]) == {"minimum", "recommended"}
+    listed = {game["GameID"] for game in body["minimum"]}
+    assert not listed & set(body["unknown"]["minimum"])
+
+
+def test_compatibility_api_skips_deleted_games(client, monkeypatch):
+    def compatible_games(**spec):
+        return ({"Minimum": [1, 99999], "Recommended": [99999]},
+                {"Minimum": [], "Recommended": []})
+
+    monkeypatch.setattr(hardware, "compatible_games", compatible_games)
+    body = client.get("/api/v1/compatibility?ram=8GB").get_json()
+    assert [game["GameID"] for game in body["minimum"]] == [1]
+    assert body["recommended"] == []
+
+
+@pytest.mark.parametrize("query", ["", "ram=lots", "cpu=Abacus"])
+def test_compatibility_api_rejects_bad_specs(client, query):
+    response = client.get(f"/api/v1/compatibility?{query}")
+    assert response.status_code == 400
+    assert "error" in response.get_json()
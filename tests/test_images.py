@@ -0,0 +1,77 @@
+import os
+
+import pytest
+from PIL import Image
+
+from app.extensions import db
+import app.images as images
+import app.models as models
+
+
+@pytest.fixture
+def image_dirs(tmp_path, monkeypatch):
+    # Sources, derivatives and manifest in a scratch folder, not app/static
+    derived = tmp_path / "derived"
+    monkeypatch.setattr(images, "IMAGES_DIR", str(tmp_path))
+    monkeypatch.setattr(images, "DERIVED_DIR", str(derived))
+    monkeypatch.setattr(images, "manifest",
+                        images.Manifest(str(derived / "manifest.json")))
+    return tmp_path
+
+
+def save_cover(folder, name, size=(800, 400), colour=(200, 40, 40, 128)):
+    Image.new("RGBA", size, colour).save(folder / name)
+
+
+def test_target_widths_never_upscale():
+    assert images.target_widths(1000) == [150, 300, 600]
+    assert images.target_widths(400) == [150, 300, 400]
+    assert images.target_widths(100) == [100]
+
+
+def test_covers_get_webp_and_jpeg_widths(image_dirs):
+    save_cover(image_dirs, "cover.png")
+    entry = images.process_image("cover.png")
+    for fmt in ("webp", "jpeg"):
+        assert sorted(entry[fmt], key=int) == ["150", "300", "600"]
+        for width, name in entry[fmt].items():
+            assert entry["hash"] in name
+            with Image.open(image_dirs / "derived" / name) as derived:
+                assert derived.size == (int(width), int(width) // 2)
+    assert images.variant("cover.png", "jpeg", 250).endswith("-300.jpg")
+    assert images.variant("cover.png", "webp", 5000).endswith("-600.webp")
+
+
+def test_reupload_gets_new_names_and_drops_old_files(image_dirs):
+    save_cover(image_dirs, "cover.png")
+    first = images.process_image("cover.png")
+    assert images.process_image("cover.png") == first  # Unchanged: skipped
+    save_cover(image_dirs, "cover.png", colour=(10, 200, 10, 255))
+    second = images.process_image("cover.png")
+    assert second["hash"] != first["hash"]
+    assert not os.path.exists(image_dirs / "derived" / first["webp"]["300"])
+    assert os.path.exists(image_dirs / "derived" / second["webp"]["300"])
+
+
+def test_unreadable_images_are_skipped(app, image_dirs):
+    (image_dirs / "broken.jpg").write_bytes(b"not an image")
+    save_cover(image_dirs, "fine.png")
+    assert images.process_image("broken.jpg") is None
+    assert images.process_image("missing.jpg") is None
+
+    result = app.test_cli_runner().invoke(args=["images", "backfill"])
+    assert result.exit_code == 0
+    assert "broken.jpg: skipped" in result.output
+    assert "fine.png: 150, 300, 600" in result.output
+
+
+def test_grid_serves_lazy_responsive_covers(app, client, image_dirs):
+    save_cover(image_dirs, "cover.png")
+    entry = images.process_image("cover.png")
+    with app.app_context():
+        db.session.get(models.Games, 1).GameImage = "cover.png"
+        db.session.commit()
+    page = client.get("/game/0").text
+    assert f"images/derived/{entry['webp']['150']} 150w" in page
+    assert f"images/derived/{entry['jpeg']['600']} 600w" in page
+    assert 'loading="lazy"' in page
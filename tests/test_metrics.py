@@ -0,0 +1,97 @@
+import shutil
+
+import pytest
+from flask import g
+from sqlalchemy.exc import OperationalError
+
+from conftest import ADMIN_ID, SHIPPED_DATABASE, USER_ID, log_in, make_app
+
+from app.extensions import db
+import app.metrics as metrics
+
+GAME_REQUESTS = ('games_requests_total{endpoint="games.game",method="GET",'
+                 'status="200"}')
+
+
+def sample(text, series):
+    # Value of one series in a scrape, 0 before it is first reported
+    for line in text.splitlines():
+        if line.startswith(series + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0
+
+
+@pytest.fixture
+def make(tmp_path):
+    # Apps with their own config; the collector is process-wide, so its
+    # shared directory is unset again afterwards
+    def make(**config):
+        path = str(tmp_path / "games.db")
+        shutil.copy(SHIPPED_DATABASE, path)
+        return make_app(path, **config)
+    yield make
+    metrics.collector.directory = None
+
+
+def test_scrapes_need_the_token_or_an_admin(make):
+    client = make(METRICS_TOKEN="s3cret").test_client()
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={
+        "Authorization": "Bearer wrong"}).status_code == 401
+    assert client.get("/metrics", headers={
+        "Authorization": "Bearer s3cret"}).status_code == 200
+    log_in(client, USER_ID)
+    assert client.get("/metrics").status_code == 401
+    log_in(client, ADMIN_ID)
+    assert client.get("/metrics").status_code == 200
+
+    client = make(METRICS_PUBLIC=True).test_client()
+    assert client.get("/metrics").status_code == 200
+
+
+def test_requests_are_counted_with_their_queries(make):
+    client = make(METRICS_PUBLIC=True).test_client()
+    before = client.get("/metrics").text
+    client.get("/game/17")
+    after = client.get("/metrics").text
+    assert sample(after, GAME_REQUESTS) == sample(before, GAME_REQUESTS) + 1
+    # Statements are labelled with the execute_query call that sent them
+    series = ('games_sql_duration_seconds_count{endpoint="games.game",'
+              'query="Games.SELECT"}')
+    assert sample(after, series) == sample(before, series) + 1
+
+
+def test_workers_sharing_a_directory_report_the_sum(tmp_path):
+    workers = [metrics.RequestMetrics() for _ in range(2)]
+    for worker in workers:
+        worker.directory = str(tmp_path)
+        timing = metrics.RequestTiming()
+        timing.statement_seconds.append(("Games.SELECT", 0.002))
+        worker.observe_request(timing, "games.game", "GET", 200, 1000)
+    for worker in workers:  # Either worker may answer the scrape
+        text = worker.render()
+        assert sample(text, GAME_REQUESTS) == 2
+        assert sample(text, 'games_response_bytes_sum'
+                            '{endpoint="games.game"}') == 2000
+
+
+def test_failed_statement_is_not_timed(app):
+    with app.test_request_context():
+        g.request_timing = timing = metrics.RequestTiming()
+        connection = db.session.connection()
+        with pytest.raises(OperationalError):
+            connection.exec_driver_sql("SELECT * FROM NoSuchTable")
+        assert not connection.info.get("statement_started")
+        db.session.rollback()
+        db.session.connection().exec_driver_sql("SELECT 1")
+        assert timing.statement_count == 1
+
+
+def test_server_timing_header_is_opt_in(make):
+    client = make().test_client()
+    assert "Server-Timing" not in client.get("/game/17").headers
+    client = make(METRICS_SERVER_TIMING=True).test_client()
+    header = client.get("/game/17").headers["Server-Timing"]
+    assert header.startswith("app;dur=")
+    assert 'desc="4 statements"' in header
+    assert 'desc="Games.SELECT x1"' in header
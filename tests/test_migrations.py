@@ -0,0 +1,31 @@
+from conftest import make_app
+
+from app.extensions import db
+import app.migrations as migrations
+
+
+def test_upgrade_reaches_latest_version(app):
+    with app.app_context(), db.engine.connect() as conn:
+        assert migrations.current_version(conn) == \
+            migrations.latest_version()
+
+
+def test_upgrade_is_idempotent(app):
+    with app.app_context():
+        assert migrations.upgrade() == []
+
+
+def test_indexed_queries_use_their_indexes(app):
+    # Every hot lookup is answered through its index, never a full scan
+    with app.app_context():
+        assert migrations.verify_indexes() == []
+
+
+def test_new_database_gets_every_index(tmp_path):
+    # Created straight from the models rather than migrated
+    app = make_app(str(tmp_path / "new.db"))
+    with app.app_context():
+        assert migrations.verify_indexes() == []
+        with db.engine.connect() as conn:
+            assert migrations.current_version(conn) == \
+                migrations.latest_version()
@@ -0,0 +1,42 @@
+import shutil
+
+import pytest
+
+from conftest import SHIPPED_DATABASE, make_app
+
+import app.assets as assets
+import app.images as images
+import app.page_cache as page_cache
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = str(tmp_path / "games.db")
+    shutil.copy(SHIPPED_DATABASE, path)
+    app = make_app(path, PAGE_CACHE_SIZE=16)
+    page_cache.cache.clear()
+    yield app.test_client()
+    page_cache.cache.clear()
+
+
+def misses(client, url):
+    before = page_cache.cache.stats()["misses"]
+    assert client.get(url).status_code == 200
+    return page_cache.cache.stats()["misses"] - before
+
+
+def test_pages_are_rendered_once(client):
+    assert misses(client, "/platform/1") == 1
+    assert misses(client, "/platform/1") == 0
+
+
+def test_new_asset_build_renders_again(client, monkeypatch):
+    misses(client, "/category/1")
+    monkeypatch.setattr(assets, "build_id", "rebuilt")
+    assert misses(client, "/category/1") == 1
+
+
+def test_new_image_derivatives_render_again(client, monkeypatch):
+    misses(client, "/game/1")
+    monkeypatch.setattr(images.manifest, "version", lambda: -1)
+    assert misses(client, "/game/1") == 1
@@ -0,0 +1,75 @@
+import pytest
+
+from app.extensions import db
+import app.models as models
+import app.pagination as pagination
+
+
+def walk(client, url):
+    # Follow next_cursor to the end, returning every record seen in order
+    seen = []
+    separator = "&" if "?" in url else "?"
+    response = client.get(url).get_json()
+    while True:
+        seen += response["data"]
+        if response["next_cursor"] is None:
+            return seen
+        response = client.get(f"{url}{separator}after="
+                              f"{response['next_cursor']}").get_json()
+
+
+@pytest.mark.parametrize("sort", ["id", "name", "rating"])
+def test_cursor_walk_returns_every_game_once(app, client, sort):
+    with app.app_context():
+        total = db.session.query(models.Games).count()
+    games = walk(client, f"/api/v1/games?sort={sort}&limit=7&fields=GameName")
+    ids = [game["GameID"] for game in games]
+    assert len(ids) == total
+    assert len(set(ids)) == total
+
+
+def test_cursor_walk_keeps_the_sort_order(client):
+    games = walk(client, "/api/v1/games?sort=name&limit=5&fields=GameName")
+    keys = [(game["GameName"], game["GameID"]) for game in games]
+    assert keys == sorted(keys)
+
+
+def test_cursor_pages_match_offset_pages(app):
+    with app.test_request_context():
+        query = models.Games.query
+        first = pagination.paginate_query(query, models.Games.GameID, 10)
+        second = pagination.paginate_query(query, models.Games.GameID, 10,
+                                           after=str(first.next_cursor))
+        offset = pagination.paginate_query(query, models.Games.GameID, 10,
+                                           page=2)
+        assert [game.GameID for game in second] == \
+            [game.GameID for game in offset]
+        assert second.page is None and offset.page == 2
+
+
+def test_last_page_has_no_next_cursor(app):
+    with app.test_request_context():
+        total = db.session.query(models.Games).count()
+        page = pagination.paginate_query(models.Games.query,
+                                         models.Games.GameID, total)
+        assert len(page) == total
+        assert not page.has_next and page.next_cursor is None
+
+
+def test_parse_cursor():
+    assert pagination.parse_cursor("12", models.Games.GameID, None) == 12
+    assert pagination.parse_cursor("Doom:3", models.Games.GameName,
+                                   models.Games.GameID) == ("Doom", 3)
+    # Names may contain the separator; the id is after the last one
+    assert pagination.parse_cursor("Doom: Eternal:3", models.Games.GameName,
+                                   models.Games.GameID) == ("Doom: Eternal", 3)
+    assert pagination.parse_cursor("x", models.Games.GameID, None) is None
+    assert pagination.parse_cursor("Doom", models.Games.GameName,
+                                   models.Games.GameID) is None
+
+
+def test_html_listing_pages(client):
+    first = client.get("/game/0")
+    assert first.status_code == 200
+    assert b"after=" in first.data or b"page=2" in first.data
+    assert client.get("/game/0?page=2").status_code == 200
@@ -0,0 +1,124 @@
+import os
+import shutil
+import threading
+
+import pytest
+
+from conftest import ADMIN_ID, SHIPPED_DATABASE, USER_ID, log_in, make_app
+
+from app.extensions import db
+import app.models as models
+import app.passwords as passwords
+
+
+@pytest.fixture
+def app(tmp_path):
+    # The cheapest bcrypt cost keeps hashing fast; tests pick the workers
+    path = str(tmp_path / "games.db")
+    shutil.copy(SHIPPED_DATABASE, path)
+    app = make_app(path, BCRYPT_LOG_ROUNDS=4)
+    yield app
+    passwords.pool.configure(app.config)
+
+
+def configure(app, **config):
+    app.config.update(config)
+    passwords.pool.configure(app.config)
+
+
+def test_hashing_runs_in_the_pool_processes(app):
+    configure(app, PASSWORD_WORKERS=2)
+    assert passwords.pool.run(os.getpid) != os.getpid()
+
+    hashed = passwords.hash_password("correct horse")
+    assert passwords.cost(hashed) == 4
+    assert passwords.check_password(hashed, "correct horse")
+    assert not passwords.check_password(hashed, "wrong horse")
+    assert not passwords.check_password("not a hash", "correct horse")
+    assert passwords.pool.stats()["completed"] == 5
+
+
+def test_passwords_past_72_bytes_are_cut_consistently(app):
+    configure(app, PASSWORD_WORKERS=0)
+    hashed = passwords.hash_password("x" * 72 + "ignored")
+    assert passwords.check_password(hashed, "x" * 72 + "also ignored")
+
+
+def test_login_rehashes_when_the_cost_changes(app, client):
+    configure(app, PASSWORD_WORKERS=0)
+    with app.app_context():
+        account = db.session.get(models.Accounts, USER_ID)
+        account.AccountPassword = passwords.generate("hunter22", 4)
+        db.session.commit()
+
+    configure(app, BCRYPT_LOG_ROUNDS=5)
+    response = client.post("/login", data={"username": "test",
+                                           "password": "hunter22"})
+    assert response.status_code == 302
+    with app.app_context():
+        stored = db.session.get(models.Accounts, USER_ID).AccountPassword
+    assert passwords.cost(stored) == 5
+    assert passwords.verify(stored, "hunter22")
+
+
+class Blocked:
+    # Hashes that hold their place in the queue until released
+    def __init__(self, pool, count):
+        self.release = threading.Event()
+        self.started = threading.Semaphore(0)
+        self.threads = [threading.Thread(target=pool.run, args=(self.hold,))
+                        for _ in range(count)]
+        for thread in self.threads:
+            thread.start()
+        for _ in range(count):
+            assert self.started.acquire(timeout=5)
+
+    def hold(self):
+        self.started.release()
+        self.release.wait(5)
+
+    def finish(self):
+        self.release.set()
+        for thread in self.threads:
+            thread.join()
+
+
+def test_a_full_queue_is_a_503(app, client):
+    configure(app, PASSWORD_WORKERS=0, PASSWORD_QUEUE_SIZE=1,
+              PASSWORD_QUEUE_TIMEOUT=0.05)
+    blocked = Blocked(passwords.pool, 1)
+    try:
+        response = client.post("/login", data={"username": "test",
+                                               "password": "anything"})
+    finally:
+        blocked.finish()
+    assert response.status_code == 503
+    assert passwords.pool.stats()["rejected"] == 1
+
+    # A place frees up once the running hash finishes
+    response = client.post("/login", data={"username": "test",
+                                           "password": "anything"})
+    assert response.status_code == 200
+
+
+def test_queue_depth_stats(app, client):
+    configure(app, PASSWORD_WORKERS=0, PASSWORD_QUEUE_SIZE=4)
+    log_in(client, ADMIN_ID)
+    blocked = Blocked(passwords.pool, 3)
+    try:
+        stats = client.get("/admin/passwords").get_json()
+    finally:
+        blocked.finish()
+    # Without worker processes one hash runs at a time, the rest wait
+    assert stats["in_flight"] == 3 and stats["waiting"] == 2
+    assert stats["queue_size"] == 4 and stats["rounds"] == 4
+
+    stats = passwords.pool.stats()
+    assert stats["in_flight"] == 0 and stats["peak_in_flight"] == 3
+    assert stats["completed"] == 3 and stats["average_seconds"] > 0
+
+
+def test_password_stats_are_for_admins(client):
+    assert client.get("/admin/passwords").status_code != 200
+    log_in(client, USER_ID)
+    assert client.get("/admin/passwords").status_code != 200
@@ -0,0 +1,50 @@
+import json
+import re
+
+from app.query_counter import count_request_queries
+import app.routes as routes
+
+
+def embedded_platforms(page):
+    match = re.search(r'<script type="application/json" id="platform_data">'
+                      r'(.*?)</script>', page, re.S)
+    return json.loads(match.group(1))
+
+
+def test_game_page_embeds_every_platform(client):
+    page = client.get("/game/17").text
+    document = embedded_platforms(page)
+    assert set(document["platforms"]) == set(routes.PLATFORM_IDS)
+    assert document["platforms"]["Xbox"]["requirements"][0]["OS"] == \
+        "Xbox Series X|S"
+    # Switching platforms in the browser shows what the API would send
+    assert document == client.get("/api/games/17/platforms").get_json()
+
+
+def test_platform_document_loads_in_two_queries(client):
+    response, counter = count_request_queries(client,
+                                              "/api/games/17/platforms")
+    pc = response.get_json()["platforms"]["PC"]
+    assert pc["details"] == [{"Price": 89.99, "ReleaseDate": "2022-02-25"}]
+    assert [row["Type"] for row in pc["requirements"]] == \
+        ["Minimum", "Recommended"]
+    # One validator query, then details and requirements for all platforms
+    assert counter.count == 3
+
+
+def test_platform_document_revalidates(client):
+    response = client.get("/api/games/17/platforms")
+    assert response.cache_control.public
+    again = client.get("/api/games/17/platforms",
+                       headers={"If-None-Match": response.headers["ETag"]})
+    assert again.status_code == 304
+    assert client.get("/api/games/9999/platforms").status_code == 404
+
+
+def test_form_post_still_picks_a_platform(client):
+    response = client.post("/game/17", data={"platforms": "PlayStation"})
+    assert response.status_code == 200
+    assert '<option value="PlayStation" selected>' in response.text
+    assert '<option value="PC" >' in response.text
+    assert client.post("/game/17",
+                       data={"platforms": "Amiga"}).status_code == 404
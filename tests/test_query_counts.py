@@ -0,0 +1,46 @@
+import pytest
+
+from conftest import USER_ID, log_in
+
+from app.query_counter import count_request_queries
+
+# Most SQL statements each page may send once warm; a lazy load per row
+# would push these up with the number of rows shown
+QUERY_BUDGETS = [
+    ("/game/0", 1),
+    ("/game/0?page=2", 1),
+    ("/game/0?sort=rating", 1),
+    ("/game/1", 4),
+    ("/category/0", 1),
+    ("/category/1", 3),
+    ("/platform/0", 1),
+    ("/platform/1", 3),
+    ("/search?query=the", 3),
+    ("/api/v1/games?include=platforms,categories,rating", 4),
+    ("/api/v1/games/1?include=platforms", 2),
+    ("/api/v1/browse?category=1", 2),
+]
+
+
+@pytest.mark.parametrize("url, budget", QUERY_BUDGETS)
+def test_page_stays_within_query_budget(client, url, budget):
+    client.get(url)  # Builds the in-memory indexes the page uses
+    response, counter = count_request_queries(client, url)
+    assert response.status_code == 200
+    assert counter.count <= budget, counter.statements
+
+
+def test_logged_in_game_page_stays_within_query_budget(client):
+    # Adds the account and the user's own rating
+    log_in(client, USER_ID)
+    client.get("/game/1")
+    response, counter = count_request_queries(client, "/game/1")
+    assert response.status_code == 200
+    assert counter.count <= 6, counter.statements
+
+
+def test_includes_cost_the_same_for_any_page_size(client):
+    url = "/api/v1/games?include=platforms,categories,rating&limit="
+    _, one = count_request_queries(client, url + "1")
+    _, many = count_request_queries(client, url + "40")
+    assert one.count == many.count
@@ -0,0 +1,131 @@
+import threading
+
+import pytest
+
+from conftest import ADMIN_ID, USER_ID, log_in
+
+from app.extensions import db
+import app.models as models
+import app.rating_queue as rating_queue
+
+
+@pytest.fixture
+def writer(app):
+    # The background thread would race the assertions, so tests flush by hand
+    writer = rating_queue.writer
+    writer.flush_interval = 60
+    return writer
+
+
+def stored_rating(app, user_id, game_id):
+    with app.app_context():
+        return db.session.query(models.Reviews.Rating).filter_by(
+            UserID=user_id, GameID=game_id).scalar()
+
+
+def rating_stats(app, game_id):
+    with app.app_context():
+        stats = db.session.get(models.GameRatingStats, game_id)
+        return [getattr(stats, f"Rating{star}") for star in range(1, 6)]
+
+
+def review_counts(app, game_id):
+    with app.app_context():
+        ratings = [rating for rating, in db.session.query(
+            models.Reviews.Rating).filter_by(GameID=game_id)]
+        return [ratings.count(star) for star in range(1, 6)]
+
+
+def test_repeated_ratings_collapse_into_one_write(app, client, writer):
+    log_in(client, USER_ID)
+    before = writer.stats()
+    for value in (2, 5, 4):
+        response = client.post("/api/games/2/rating", json={"rating": value})
+        assert response.status_code == 202
+    assert response.get_json()["rating"] == 4
+    assert stored_rating(app, USER_ID, 2) is None
+
+    writer.flush_all()
+    after = writer.stats()
+    assert stored_rating(app, USER_ID, 2) == 4
+    assert after["coalesced"] - before["coalesced"] == 2
+    assert after["written"] - before["written"] == 1
+    assert rating_stats(app, 2) == review_counts(app, 2)
+
+
+def test_response_counts_the_queued_rating(app, client, writer):
+    log_in(client, USER_ID)
+    before = sum(rating_stats(app, 3))
+    body = client.post("/api/games/3/rating", json={"rating": 5}).get_json()
+    assert body["count"] == before + 1
+    assert dict(body["histogram"])[5] >= 1
+
+    # Clearing it before it is written takes it back out
+    body = client.post("/api/games/3/rating", json={"rating": 0}).get_json()
+    assert body["count"] == before
+    writer.flush_all()
+    assert stored_rating(app, USER_ID, 3) is None
+
+
+def test_game_page_shows_a_queued_rating(client, writer):
+    log_in(client, USER_ID)
+    client.post("/api/games/4/rating", json={"rating": 3})
+    with client.application.app_context():
+        assert writer.pending_rating(USER_ID, 4) == 3
+    assert client.get("/game/4").status_code == 200
+
+
+def test_projection_matches_the_database_after_concurrent_ratings(app, writer):
+    # Several users clicking at once while batches are written must never
+    # show a negative count, and end with the stats matching the reviews
+    writer.flush_interval = 0
+    problems = []
+
+    def rate(account_id):
+        client = app.test_client()
+        log_in(client, account_id)
+        for value in (1, 5, 0, 3, 2, 4) * 3:
+            response = client.post("/api/games/5/rating",
+                                   json={"rating": value})
+            histogram = dict(response.get_json()["histogram"])
+            if min(histogram.values()) < 0:
+                problems.append(histogram)
+
+    threads = [threading.Thread(target=rate, args=(account_id,))
+               for account_id in (ADMIN_ID, USER_ID, 7)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    writer.flush_all()
+    assert problems == []
+    assert rating_stats(app, 5) == review_counts(app, 5)
+    with app.app_context():
+        projected = writer.projected_stats(5)
+    assert [count for _, count in reversed(projected["histogram"])] == \
+        review_counts(app, 5)
+
+
+def test_rating_needs_a_login(client):
+    response = client.post("/api/games/2/rating", json={"rating": 3})
+    assert response.status_code == 401
+
+
+@pytest.mark.parametrize("payload", [{"rating": 6}, {"rating": "3"}, {}, []])
+def test_rating_must_be_a_whole_number_from_0_to_5(client, payload):
+    log_in(client, USER_ID)
+    response = client.post("/api/games/2/rating", json=payload)
+    assert response.status_code == 400
+
+
+def test_missing_game_is_a_404_and_is_not_queued(client, writer):
+    log_in(client, USER_ID)
+    pending = writer.stats()["pending"]
+    response = client.post("/api/games/99999/rating", json={"rating": 3})
+    assert response.status_code == 404
+    assert response.get_json() == {"error": "Game not found"}
+    assert writer.stats()["pending"] == pending
+
+    # The widget's form fallback as well
+    response = client.post("/rate_game/99999", data={"rating": "3"})
+    assert response.status_code == 404
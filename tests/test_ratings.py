@@ -0,0 +1,65 @@
+from sqlalchemy import select, update
+
+from conftest import ADMIN_ID, USER_ID, log_in
+
+from app.extensions import db
+from app.query_counter import count_request_queries
+import app.models as models
+import app.ratings as ratings
+
+
+def stats_row(app, game_id):
+    with app.app_context():
+        stats = db.session.get(models.GameRatingStats, game_id)
+        return (stats.RatingSum, stats.RatingCount, stats.RatingAverage,
+                [getattr(stats, f"Rating{star}") for star in ratings.STARS])
+
+
+def from_reviews(app, game_id):
+    # The same figures computed from scratch
+    with app.app_context():
+        values = db.session.scalars(select(models.Reviews.Rating)
+                                    .filter_by(GameID=game_id)).all()
+    return (sum(values), len(values),
+            sum(values) / len(values) if values else 0,
+            [values.count(star) for star in ratings.STARS])
+
+
+def test_rating_form_updates_stats_in_step(app, client):
+    log_in(client, USER_ID)
+    for value in ("5", "2", "0", "4"):  # Insert, update, delete, insert
+        client.post("/rate_game/6", data={"rating": value})
+        assert stats_row(app, 6) == from_reviews(app, 6)
+
+
+def test_deleting_an_account_takes_its_votes_out(app, client):
+    log_in(client, ADMIN_ID)
+    client.post("/rate_game/6", data={"rating": "1"})
+    client.get("/delete")
+    assert stats_row(app, 6) == from_reviews(app, 6)
+
+
+def test_rebuild_command_recomputes_everything(app):
+    with app.app_context():
+        db.session.execute(update(models.GameRatingStats).values(
+            RatingSum=999, RatingCount=1, Rating1=7))
+        db.session.commit()
+    result = app.test_cli_runner().invoke(args=["ratings", "rebuild"])
+    assert result.exit_code == 0 and "Rebuilt rating stats" in result.output
+    with app.app_context():
+        game_ids = db.session.scalars(select(models.Games.GameID)).all()
+    for game_id in game_ids:
+        assert stats_row(app, game_id) == from_reviews(app, game_id)
+
+
+def test_grid_sorts_by_average_without_reading_reviews(app, client):
+    response, counter = count_request_queries(client, "/game/0?sort=rating")
+    assert response.status_code == 200
+    assert not any('"Reviews"' in statement or "Reviews." in statement
+                   for statement in counter.statements)
+    with app.app_context():
+        best = db.session.scalar(
+            select(models.Games.GameName).join(models.GameRatingStats)
+            .order_by(models.GameRatingStats.RatingAverage.desc(),
+                      models.Games.GameID.desc()).limit(1))
+    assert best in response.text
@@ -0,0 +1,115 @@
+import shutil
+
+import pytest
+from sqlalchemy import event, select
+
+from conftest import ADMIN_ID, SHIPPED_DATABASE, USER_ID, log_in, make_app
+
+from app.extensions import db
+import app.database as database
+import app.models as models
+import app.rating_queue as rating_queue
+
+WRITES = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+def make_replicated_app(tmp_path, **config):
+    # Two SQLite files stand in for the primary and its replica, and every
+    # statement is recorded against the engine that ran it
+    primary = str(tmp_path / "primary.db")
+    replica = str(tmp_path / "replica.db")
+    shutil.copy(SHIPPED_DATABASE, primary)
+    app = make_app(primary, DATABASE_REPLICA_URI="sqlite:///" + replica,
+                   **config)
+    app.statements = {"primary": [], "replica": []}
+    with app.app_context():
+        database.sync_replica(db.engine, db.engines[database.REPLICA])
+        for name, engine in [("primary", db.engine),
+                             ("replica", db.engines[database.REPLICA])]:
+            event.listen(engine, "before_cursor_execute",
+                         lambda conn, cursor, statement, *args, name=name:
+                         app.statements[name].append(statement))
+    return app
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = make_replicated_app(tmp_path)
+    yield app
+    rating_queue.writer.flush_all()
+
+
+def run(app, send):
+    # Statements each engine ran while handling the request
+    for statements in app.statements.values():
+        statements.clear()
+    response = send()
+    assert response.status_code < 400
+    return {name: list(statements)
+            for name, statements in app.statements.items()}
+
+
+def writes(statements):
+    return [statement for statement in statements
+            if statement.lstrip().upper().startswith(WRITES)]
+
+
+def test_anonymous_reads_go_to_the_replica(app, client):
+    ran = run(app, lambda: client.get("/game/1"))
+    assert ran["replica"] and not ran["primary"]
+
+
+def test_reads_stay_on_the_primary_after_rating(app, client):
+    log_in(client, USER_ID)
+    ran = run(app, lambda: client.post("/rate_game/2", data={"rating": "4"}))
+    assert writes(ran["primary"]) and not ran["replica"]
+
+    ran = run(app, lambda: client.get("/game/2"))
+    assert ran["primary"] and not ran["replica"]
+
+    # Other users are not pinned by someone else's write
+    ran = run(app, lambda: app.test_client().get("/game/2"))
+    assert ran["replica"] and not ran["primary"]
+
+
+def test_reads_stay_on_the_primary_after_a_queued_rating(app, client):
+    log_in(client, USER_ID)
+    client.post("/api/games/3/rating", json={"rating": 5})
+    rating_queue.writer.flush_all()
+    ran = run(app, lambda: client.get("/game/3"))
+    assert ran["primary"] and not ran["replica"]
+
+
+def test_reads_return_to_the_replica_after_the_sticky_window(tmp_path):
+    app = make_replicated_app(tmp_path, DATABASE_STICKY_SECONDS=0)
+    client = app.test_client()
+    log_in(client, USER_ID)
+    client.post("/rate_game/2", data={"rating": "4"})
+    ran = run(app, lambda: client.get("/game/2"))
+    assert ran["replica"] and not ran["primary"]
+
+
+def test_session_reads_its_own_commit_from_the_primary(app):
+    with app.app_context():
+        db.session.scalar(select(models.Games.GameName).filter_by(GameID=1))
+        assert app.statements["replica"]
+
+        game = db.session.get(models.Games, 1)
+        game.GameName = "Renamed on the primary"
+        db.session.commit()
+        app.statements["replica"].clear()
+        name = db.session.scalar(
+            select(models.Games.GameName).filter_by(GameID=1))
+        assert name == "Renamed on the primary"
+        assert not app.statements["replica"]
+
+
+def test_writes_never_reach_the_replica(app, client):
+    log_in(client, ADMIN_ID)
+    for value in ("5", "0", "2"):
+        client.post("/rate_game/4", data={"rating": value})
+    client.post("/api/games/4/rating", json={"rating": 1})
+    rating_queue.writer.flush_all()
+    client.get("/game/4")
+    assert writes(app.statements["primary"])
+    assert not writes(app.statements["replica"])
@@ -0,0 +1,73 @@
+from conftest import ADMIN_ID, log_in
+
+from app.extensions import db
+from app.query_counter import count_request_queries
+import app.models as models
+import app.search as game_search
+
+
+def found(app, query):
+    with app.app_context():
+        return game_search.search_game_ids(query)
+
+
+def test_matches_names_developers_descriptions_and_categories(app):
+    assert found(app, "Elden Ring")[0] == 17
+    assert set(found(app, "hoyoverse")) == {5, 7, 43}
+    assert {8, 30} <= set(found(app, "feudal japan"))
+    assert {9, 10} <= set(found(app, "loot"))
+
+
+def test_last_word_matches_as_a_prefix(app):
+    assert 17 in found(app, "eld")
+    assert 9 in found(app, "grand the")
+    assert found(app, "xyzzy") == []
+    assert found(app, "!!!") == []
+
+
+def test_name_matches_rank_first(app):
+    # "Fantasy" is also a category and in other descriptions
+    results = found(app, "fantasy")
+    assert results[0] == 25 and len(results) > 1
+
+
+def test_index_follows_admin_writes(app, client):
+    with app.app_context():
+        game = db.session.get(models.Games, 2)
+        game.GameName = "Blockworld"
+        game.GameDescription = "A sandbox of blocks"
+        game_search.index_game(2)
+    assert found(app, "blockworld") == [2]
+    assert 2 not in found(app, "minecraft")
+
+    log_in(client, ADMIN_ID)
+    client.get("/admin/game/delete/2")
+    assert found(app, "blockworld") == []
+
+
+def test_search_page_pages_through_ranked_results(client):
+    response = client.get("/search?query=action")
+    assert response.status_code == 200
+    assert "Devil May Cry 5" in response.text
+    # An exact name goes straight to the game
+    response = client.get("/search?query=Elden Ring")
+    assert response.status_code == 302
+    assert response.headers["Location"].endswith("game/17")
+
+
+def test_search_queries_do_not_grow_with_the_catalogue(app, client):
+    _, before = count_request_queries(client, "/search?query=action")
+    with app.app_context():
+        for number in range(30):
+            game = models.Games(GameName=f"Action Title {number}",
+                                GameDescription="An action game")
+            db.session.add(game)
+            db.session.flush()
+            game_search.index_game(game.GameID, commit=False)
+        db.session.commit()
+    response, after = count_request_queries(client, "/search?query=action")
+    assert "Action Title" in response.text
+    assert after.count == before.count
+    assert any(" MATCH " in statement for statement in after.statements)
+    # The exact-name check is the only LIKE; no '%query%' scan of Games
+    assert sum("LIKE" in statement for statement in after.statements) == 1
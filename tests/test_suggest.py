@@ -0,0 +1,71 @@
+import sqlite3
+
+from conftest import ADMIN_ID, log_in
+
+from app.query_counter import count_request_queries
+import app.suggest as suggest
+
+
+def labels(client, query):
+    return [item["label"] for item in
+            client.get(f"/search/suggest?q={query}").get_json()]
+
+
+def test_keystrokes_never_query_the_database(client):
+    client.get("/search/suggest?q=e")
+    for prefix in ["e", "el", "eld", "zzz"]:
+        response, counter = count_request_queries(
+            client, f"/search/suggest?q={prefix}")
+        assert response.status_code == 200
+        assert counter.count == 0, counter.statements
+
+
+def test_completes_any_word_and_ignores_accents(app, client):
+    with app.app_context():
+        suggest.index.add_game(99001, "Ragnarök Odyssey", "Studio Nord")
+    assert "Ragnarök Odyssey" in labels(client, "ragnarok")
+    assert "Ragnarök Odyssey" in labels(client, "odys")
+    assert "Studio Nord" in labels(client, "studio")
+
+
+def test_whole_name_matches_rank_first(app, client):
+    with app.app_context():
+        suggest.index.add_game(99001, "Zelda Tales", None)
+        suggest.index.add_game(99002, "Legend of Zelda", None)
+    assert labels(client, "zelda")[:2] == ["Zelda Tales", "Legend of Zelda"]
+
+
+def test_limit(client):
+    assert len(client.get("/search/suggest?q=a&limit=2").get_json()) <= 2
+    assert client.get("/search/suggest?q=").get_json() == []
+
+
+def test_own_edits_show_at_once(app, client):
+    log_in(client, ADMIN_ID)
+    with app.app_context():
+        name = suggest.index._games[1][0]
+
+    def urls():
+        return [item["url"] for item in
+                client.get(f"/search/suggest?q={name}").get_json()]
+
+    assert "/game/1" in urls()
+    client.get("/admin/game/delete/1")
+    assert "/game/1" not in urls()
+
+
+def test_check_catches_up_with_other_processes(app, client):
+    # Another process renames a game and adds one; this one only learns of
+    # it from the refresher's check, never from a keystroke
+    path = app.config["SQLALCHEMY_DATABASE_URI"][len("sqlite:///"):]
+    other = sqlite3.connect(path)
+    other.execute("UPDATE Games SET GameName = 'Quuxbound',"
+                  " UpdatedAt = '2999-01-01 00:00:00' WHERE GameID = 2")
+    other.execute("INSERT INTO Games (GameName, UpdatedAt)"
+                  " VALUES ('Quuxfall', '2999-01-01 00:00:00')")
+    other.commit()
+    other.close()
+    assert labels(client, "quux") == []
+    with app.app_context():
+        suggest.index.check()
+    assert sorted(labels(client, "quux")) == ["Quuxbound", "Quuxfall"]
@@ -0,0 +1,78 @@
+import pytest
+from werkzeug.exceptions import InternalServerError
+
+from conftest import ADMIN_ID, log_in
+
+from app.extensions import db
+from app.routes import UnitOfWork
+import app.models as models
+
+
+def category_names():
+    db.session.rollback()  # Read what is committed, not what is pending
+    return {name for name, in db.session.query(models.Categories.CategoryName)}
+
+
+def test_commits_when_the_block_succeeds(app):
+    with app.test_request_context():
+        with UnitOfWork() as work:
+            work.insert(models.Categories, {"CategoryName": "Roguelike"})
+        assert "Roguelike" in category_names()
+
+
+def test_rolls_back_and_reraises_other_errors(app):
+    with app.test_request_context():
+        with pytest.raises(ValueError):
+            with UnitOfWork() as work:
+                work.insert(models.Categories, {"CategoryName": "Roguelike"})
+                raise ValueError
+        assert "Roguelike" not in category_names()
+
+
+def test_database_errors_roll_back_everything_as_a_500(app):
+    with app.test_request_context():
+        with pytest.raises(InternalServerError):
+            with UnitOfWork() as work:
+                work.insert(models.Categories, {"CategoryName": "Roguelike"})
+                work.insert(models.Categories, {"CategoryName": None})
+        assert "Roguelike" not in category_names()
+
+
+def test_insert_many_returns_keys_in_row_order(app):
+    with app.test_request_context():
+        with UnitOfWork() as work:
+            ids = work.insert_many(models.Categories, [
+                {"CategoryName": "First"}, {"CategoryName": "Second"}],
+                returning=True)
+        names = dict(db.session.query(models.Categories.CategoryID,
+                                      models.Categories.CategoryName))
+        assert [names[id] for id in ids] == ["First", "Second"]
+
+
+def test_upsert_many_updates_rows_sharing_the_keys(app):
+    requirements = models.SystemRequirements
+    with app.test_request_context():
+        row = db.session.query(requirements).filter_by(
+            PlatformID=1, Type="Minimum").first()
+        with UnitOfWork() as work:
+            work.upsert_many(requirements, [{
+                "GameID": row.GameID, "PlatformID": 1, "Type": "Minimum",
+                "RAM": "64GB"}], keys=["GameID", "PlatformID", "Type"])
+        db.session.expire_all()
+        rows = db.session.query(requirements).filter_by(
+            GameID=row.GameID, PlatformID=1, Type="Minimum").all()
+        assert [stored.RAM for stored in rows] == ["64GB"]
+
+
+def test_deleting_a_game_removes_its_rows(client, app):
+    tables = [models.Games, models.GameCategories, models.GamePlatforms,
+              models.SystemRequirements, models.GamePlatformDetails]
+    with app.app_context():
+        assert all(db.session.query(model).filter_by(GameID=1).count()
+                   for model in tables)
+    log_in(client, ADMIN_ID)
+    response = client.get("/admin/game/delete/1")
+    assert response.status_code == 302
+    with app.app_context():
+        for model in tables:
+            assert db.session.query(model).filter_by(GameID=1).count() == 0
@@ -0,0 +1,125 @@
+import multiprocessing
+import shutil
+
+import pytest
+from sqlalchemy import select
+
+from conftest import SHIPPED_DATABASE, USER_ID, log_in, make_app
+
+from app.extensions import db
+import app.auth as auth
+import app.conditional as conditional
+import app.facets as facets
+import app.models as models
+import app.rating_queue as rating_queue
+import app.suggest as suggest
+
+if "fork" not in multiprocessing.get_all_start_methods():
+    pytest.skip("needs forked processes", allow_module_level=True)
+
+fork = multiprocessing.get_context("fork")
+
+
+@pytest.fixture
+def app(tmp_path):
+    # Caches on, as in production, so only the shared counters and the
+    # session can tell a worker about another one's writes
+    path = str(tmp_path / "games.db")
+    shutil.copy(SHIPPED_DATABASE, path)
+    app = make_app(path, ACCOUNT_CACHE_TTL=60)
+    yield app
+    rating_queue.writer.flush_all()
+    # The account cache is process-wide, and this copy's accounts are gone
+    auth.invalidate_account(USER_ID)
+
+
+def in_another_worker(app, work):
+    # Runs work() in a process forked from this one, as gunicorn forks its
+    # workers from the preloaded master, and returns what it sent back
+    receiver, sender = fork.Pipe(duplex=False)
+
+    def run():
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose(close=False)
+        sender.send(work())
+
+    process = fork.Process(target=run)
+    process.start()
+    sender.close()
+    try:
+        assert receiver.poll(30), "worker process failed"
+        return receiver.recv()
+    finally:
+        process.join()
+
+
+def test_deleted_account_is_logged_out_in_every_worker(app, client):
+    log_in(client, USER_ID)
+    assert client.get("/dashboard").status_code == 200  # Now cached here
+
+    def delete_account():
+        other = app.test_client()
+        log_in(other, USER_ID)
+        return other.get("/delete").status_code
+
+    assert in_another_worker(app, delete_account) == 302
+    response = client.get("/dashboard")
+    assert response.status_code == 302
+    assert response.headers["Location"] == "/login"
+
+
+def test_game_added_in_another_worker_is_suggested(app, client):
+    assert client.get("/search/suggest?q=zanzibar").get_json() == []
+
+    def add_game():
+        with app.app_context():
+            game = models.Games(GameName="Zanzibar Express",
+                                GameDeveloper="Test")
+            db.session.add(game)
+            db.session.commit()
+            suggest.index.add_game(game.GameID, game.GameName,
+                                   game.GameDeveloper)
+            return game.GameID
+
+    game_id = in_another_worker(app, add_game)
+    suggestions = client.get("/search/suggest?q=zanzibar").get_json()
+    assert [suggestion["url"] for suggestion in suggestions] == \
+        [f"/game/{game_id}"]
+
+
+def test_facets_follow_another_workers_edit(app):
+    with app.app_context():
+        before = facets.members(facets.index.current().browse(
+            category_ids=[1])[0])
+
+    def add_to_category():
+        with app.app_context():
+            game_id = db.session.scalar(select(models.Games.GameID).where(
+                models.Games.GameID.not_in(before)))
+            db.session.add(models.GameCategories(GameID=game_id,
+                                                 CategoryID=1))
+            conditional.touch(models.Categories, [1])
+            return game_id
+
+    game_id = in_another_worker(app, add_to_category)
+    with app.app_context():
+        matches, _ = facets.index.current().browse(category_ids=[1])
+    assert game_id in facets.members(matches)
+
+
+def test_rating_queued_in_another_worker_shows_here(app, client):
+    def rate():
+        # Never written: the forked worker exits with it still queued
+        rating_queue.writer.flush_interval = 60
+        other = app.test_client()
+        log_in(other, USER_ID)
+        response = other.post("/api/games/2/rating", json={"rating": 4})
+        assert response.status_code == 202
+        return other.get_cookie("session").value
+
+    client.set_cookie("session", in_another_worker(app, rate))
+    with app.app_context():
+        assert db.session.scalar(select(models.Reviews.Rating).filter_by(
+            UserID=USER_ID, GameID=2)) is None
+    assert 'id="star4" checked' in client.get("/game/2").text
@@ -0,0 +1,5 @@
+from app import create_app
+
+# WSGI entry point for production servers, e.g. `gunicorn wsgi:app`
+# (settings in gunicorn.conf.py) or `waitress-serve wsgi:app`
+app = create_app()